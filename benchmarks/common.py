@@ -0,0 +1,50 @@
+"""Helpers shared by the benchmark scripts: run a uvicorn worker, summarize latencies"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server(port, workdir, env=None):
+    """Start server.main:app on `port` with `workdir` as cwd (so ./sql_app.db is local to it)"""
+    proc_env = dict(os.environ, PYTHONPATH=ROOT)
+    # Every benchmark client shares one IP
+    proc_env.setdefault("RATE_LIMIT_ENABLED", "0")
+    proc_env.update(env or {})
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=proc_env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+def stop_server(proc):
+    # SIGTERM lets uvicorn run the shutdown hooks (e.g. draining buffered writes)
+    proc.terminate()
+    proc.wait()
+
+def register(base_url, prefix="bench"):
+    email = f"{prefix}_{int(time.time() * 1000)}@example.com"
+    httpx.post(f"{base_url}/auth/register", json={"email": email, "password": "bench-pass"})
+    token = httpx.post(f"{base_url}/auth/login", data={"username": email, "password": "bench-pass"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+    }
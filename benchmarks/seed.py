@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+"""Seed a database with synthetic data for benchmarks.
+
+Creates `--users` users (all with password PASSWORD) and about `--rows` rows
+in each large table: expenses and survey responses get `rows`, job
+applications and supply items `rows // 4`, spread evenly over the users.
+Another `rows // 10` candidate users each get a career profile, opted in to
+and indexed for career search. Expense descriptions, application notes and item names draw
+on small vocabularies, so full-text search sees realistic hit counts. Rows go
+in with multi-row INSERTs in chunks; the expense rollups, survey analytics
+and application funnel counters are rebuilt at the end so they match. The
+search index fills through its triggers as the rows go in.
+
+    python benchmarks/seed.py --rows 100000 --database-url sqlite:///./bench.db
+
+DATABASE_URL must be set before the server package is imported, so the
+functions here import it lazily.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = "bench-pass"
+CHUNK_SIZE = 10000
+
+QUESTIONS = [
+    {"id": "q1", "type": "rating", "label": "Overall", "required": True},
+    {"id": "q2", "type": "multiple_choice", "label": "Pick", "options": ["a", "b", "c"]},
+    {"id": "q3", "type": "checkbox", "label": "Any", "options": ["x", "y", "z"]},
+    {"id": "q4", "type": "text", "label": "Comments"},
+]
+CATEGORIES = ["Food", "Transport", "Housing", "Utilities", "Health", "Fun", "Salary"]
+APPLICATION_STATUSES = ["Applied", "Interviewing", "Offer", "Rejected"]
+SUPPLY_STATUSES = ["TO_BUY", "IN_STOCK"]
+SKILLS = [
+    "Python", "FastAPI", "PostgreSQL", "React", "TypeScript", "Go", "Kubernetes", "AWS",
+    "Java", "Spring", "SQL", "Docker", "Rust", "C++", "pandas", "Machine Learning",
+]
+ROLES = ["Backend engineer", "Frontend developer", "Data scientist", "DevOps engineer", "Full-stack developer"]
+# Varied words for the full-text search benchmarks
+PURCHASES = [
+    "coffee", "groceries", "rent", "taxi", "pharmacy", "bakery", "cinema", "books", "fuel", "insurance",
+    "gym", "lunch", "dinner", "hardware", "electronics", "garden", "pet food", "toys", "train ticket", "hotel",
+]
+APPLICATION_NOTES = [
+    "Referral from a former colleague", "Phone screen scheduled", "Take-home assignment sent",
+    "Remote friendly, Python and PostgreSQL", "Recruiter reached out on LinkedIn", None,
+]
+SUPPLIES = ["soap", "coffee filters", "batteries", "light bulbs", "rice", "olive oil", "toothpaste", "paper towels", "dish soap", "tape"]
+
+
+def user_email(i: int) -> str:
+    return f"bench{i}@example.com"
+
+
+def _insert_chunks(db, model, rows):
+    from sqlalchemy import insert
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+    db.commit()
+
+
+def _spread(total: int, user_ids: list):
+    """Yield (index, user_id) for `total` rows dealt round-robin over the users"""
+    for i in range(total):
+        yield i, user_ids[i % len(user_ids)]
+
+
+def _seed_profiles(db, rng, count: int, hashed: str):
+    """Candidate users with career profiles, plus their skill links and vectors"""
+    from server import models, career_search
+    first = (db.query(models.User.id).order_by(models.User.id.desc()).limit(1).scalar() or 0) + 1
+    _insert_chunks(db, models.User, [
+        {"email": f"candidate{first + i}@example.com", "hashed_password": hashed, "full_name": f"Candidate {i}", "is_active": True}
+        for i in range(count)
+    ])
+    candidate_ids = [u for (u,) in db.query(models.User.id).filter(models.User.id >= first).order_by(models.User.id)]
+    profiles = []
+    for user_id in candidate_ids:
+        role = rng.choice(ROLES)
+        skills = rng.sample(SKILLS, rng.randint(2, 6))
+        profiles.append({
+            "user_id": user_id,
+            "headline": f"{rng.choice(['Junior', 'Senior', 'Lead'])} {role}",
+            "skills": skills,
+            "experience": [{
+                "company": f"Company {rng.randint(0, 500)}",
+                "role": role,
+                "description": f"Built services with {' and '.join(rng.sample(skills, min(2, len(skills))))}",
+            }],
+            "education": [],
+            "searchable": True,
+        })
+    _insert_chunks(db, models.CareerProfile, profiles)
+
+    existing = {name for (name,) in db.query(models.Skill.name)}
+    _insert_chunks(db, models.Skill, [
+        {"name": name} for name in {career_search.normalize_skill(s) for s in SKILLS} - existing
+    ])
+    skill_ids = dict(db.query(models.Skill.name, models.Skill.id))
+    rows = db.query(models.CareerProfile).filter(models.CareerProfile.user_id >= first).all()
+    _insert_chunks(db, models.CareerProfileSkill, (
+        {"profile_id": profile.id, "skill_id": skill_ids[career_search.normalize_skill(skill)]}
+        for profile in rows for skill in profile.skills
+    ))
+    _insert_chunks(db, models.CareerProfileEmbedding, (
+        {"profile_id": profile.id, "embedding": career_search.embed(career_search.profile_text(profile), profile.skills)}
+        for profile in rows
+    ))
+
+
+def seed(rows: int, users: int = 10, seed_value: int = 0) -> dict:
+    """Seed the database behind DATABASE_URL; returns ids the benchmarks need"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from server import models, database, rollups, analytics, hashing, migrate, pipeline
+
+    rng = random.Random(seed_value)
+    migrate.upgrade(backfill=False)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    with database.SessionLocal() as db:
+        existing = {name for (name,) in db.query(models.Category.name)}
+        _insert_chunks(db, models.Category, [{"name": name} for name in CATEGORIES if name not in existing])
+        category_ids = [c for (c,) in db.query(models.Category.id)]
+
+        # One hash for everyone: argon2 per user would dominate seeding time
+        hashed = hashing.pwd_context.hash(PASSWORD)
+        first_user = (db.query(models.User.id).order_by(models.User.id.desc()).limit(1).scalar() or 0) + 1
+        _insert_chunks(db, models.User, [
+            {"email": user_email(first_user + i), "hashed_password": hashed, "full_name": f"Bench {i}", "is_active": True}
+            for i in range(users)
+        ])
+        user_ids = [
+            u for (u,) in db.query(models.User.id).filter(models.User.id >= first_user).order_by(models.User.id)
+        ]
+
+        _insert_chunks(db, models.Expense, (
+            {
+                "user_id": user_id,
+                "category_id": rng.choice(category_ids),
+                "amount": rng.randint(100, 50000),
+                "description": f"{rng.choice(PURCHASES)} {i}",
+                "date": now - timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60)),
+                "is_income": rng.random() < 0.1,
+            }
+            for i, user_id in _spread(rows, user_ids)
+        ))
+
+        _insert_chunks(db, models.Survey, [
+            {"owner_id": user_id, "title": f"Survey {user_id}", "questions": QUESTIONS, "is_active": True, "version": 1}
+            for user_id in user_ids
+        ])
+        survey_ids = [s for (s,) in db.query(models.Survey.id).filter(models.Survey.owner_id.in_(user_ids))]
+        _insert_chunks(db, models.Response, (
+            {
+                "survey_id": survey_ids[i % len(survey_ids)],
+                "answers": {
+                    "q1": rng.randint(1, 5),
+                    "q2": rng.choice("abc"),
+                    "q3": rng.sample(["x", "y", "z"], rng.randint(0, 3)),
+                    "q4": "ok",
+                },
+                "created_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+            }
+            for i in range(rows)
+        ))
+
+        _insert_chunks(db, models.JobApplication, (
+            {
+                "user_id": user_id,
+                "company": f"Company {i % 500}",
+                "position": "Engineer",
+                "status": rng.choice(APPLICATION_STATUSES),
+                "notes": rng.choice(APPLICATION_NOTES),
+                "applied_date": now - timedelta(days=rng.randint(0, 365)),
+            }
+            for i, user_id in _spread(rows // 4, user_ids)
+        ))
+        _insert_chunks(db, models.SupplyItem, (
+            {
+                "user_id": user_id,
+                "name": f"{rng.choice(SUPPLIES)} {i}",
+                "category": rng.choice(["Food", "Hygiene", "Tools"]),
+                "status": rng.choice(SUPPLY_STATUSES),
+                "quantity": str(rng.randint(1, 5)),
+            }
+            for i, user_id in _spread(rows // 4, user_ids)
+        ))
+
+        _seed_profiles(db, rng, rows // 10, hashed)
+        application_id = (
+            db.query(models.JobApplication.id).filter(models.JobApplication.user_id == user_ids[0]).limit(1).scalar()
+        )
+
+        for user_id in user_ids:
+            rollups.rebuild_expense_rollups(db, user_id)
+        for survey_id in survey_ids:
+            analytics.rebuild(db, survey_id)
+        pipeline.rebuild(db)
+
+    return {
+        "users": [user_email(first_user + i) for i in range(users)],
+        "user_ids": user_ids,
+        "survey_ids": survey_ids,
+        "category_ids": category_ids,
+        "application_id": application_id,
+        "rows": rows,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic benchmark data")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per large table (1k to 1M)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=None, help="defaults to DATABASE_URL / ./sql_app.db")
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    result = seed(args.rows, args.users, args.seed)
+    print(f"Seeded {args.rows} rows per table for {args.users} users in {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""Measure how fast a worker starts: import time and uvicorn cold start.
+
+Each measurement runs in a fresh interpreter, the way a new worker or a
+--reload cycle starts. It reports:
+- the slowest modules under `python -X importtime -c "import server.main"`
+- the median wall time of that import
+- the time from launching uvicorn to the first successful GET /health. The
+  first launch runs the migrations; the median of the later ones is the
+  steady-state cold start.
+
+suite.py includes these numbers in its report and baseline comparison.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import ROOT
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import server.main; print(time.perf_counter() - t)"
+
+
+def _env(env: dict) -> dict:
+    proc_env = dict(os.environ, PYTHONPATH=ROOT, RATE_LIMIT_ENABLED="0")
+    proc_env.update(env)
+    return proc_env
+
+
+def import_profile(env: dict, workdir: str, top: int = 15) -> dict:
+    """Total import time of server.main and the `top` slowest modules by self time"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server.main"],
+        cwd=workdir, env=_env(env), capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            modules.append((name.strip(), int(own) / 1000, int(cumulative) / 1000))
+    main = next((m for m in modules if m[0] == "server.main"), None)
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        "total_ms": round(main[2], 1) if main else None,
+        "slowest": [{"module": name, "self_ms": round(own, 1), "cumulative_ms": round(cum, 1)} for name, own, cum in slowest],
+    }
+
+
+def import_seconds(env: dict, workdir: str, runs: int) -> float:
+    """Median wall time of `import server.main` in a fresh interpreter"""
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], cwd=workdir, env=_env(env), capture_output=True, text=True, check=True,
+        )
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def cold_start_seconds(env: dict, workdir: str, port: int, timeout: float = 60) -> float:
+    """Seconds from launching a uvicorn worker until /health answers"""
+    # One client for all polls: building one per attempt costs more than the poll interval
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=_env(env),
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get("/health").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            raise RuntimeError("server did not start")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def measure(env: dict, workdir: str, port: int, runs: int = 5, top: int = 15) -> dict:
+    first = cold_start_seconds(env, workdir, port)
+    warm = [cold_start_seconds(env, workdir, port) for _ in range(max(runs - 1, 1))]
+    return {
+        "import_ms": round(import_seconds(env, workdir, runs) * 1000, 1),
+        "cold_start_first_ms": round(first * 1000, 1),
+        "cold_start_ms": round(statistics.median(warm) * 1000, 1),
+        "import_profile": import_profile(env, workdir, top),
+    }
+
+
+def report(result: dict):
+    print(
+        f"import server.main {result['import_ms']:.0f} ms  cold start {result['cold_start_ms']:.0f} ms "
+        f"(first, with migrations: {result['cold_start_first_ms']:.0f} ms)"
+    )
+    for module in result["import_profile"]["slowest"]:
+        print(f"  {module['self_ms']:8.1f} ms self {module['cumulative_ms']:9.1f} ms total  {module['module']}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print startup changes; return the measurements that regressed beyond `tolerance`"""
+    regressions = []
+    for key in ("import_ms", "cold_start_ms"):
+        before, after = baseline.get(key), current.get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(key)
+        print(f"{'startup.' + key:<32} {change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--database-url", default=None, help="defaults to a throwaway SQLite file")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {"DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'startup.db')}"}
+        result = measure(env, workdir, args.port, args.runs, args.top)
+    report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+"""Benchmark every router against a seeded database and compare with a baseline.
+
+Seeds a throwaway SQLite database (or --database-url) with seed.py at the
+given scale, then drives each endpoint with concurrent clients. The "asgi"
+driver runs the app in-process through httpx's ASGI transport; the "http"
+driver starts a uvicorn worker and measures over real sockets. For each
+endpoint it reports throughput, p50/p95/p99 latency, errors and the resident
+memory of the process serving requests. It also measures worker startup
+(startup.py): the import time of server.main, its slowest modules and the
+uvicorn cold start. Everything is written to a JSON file. Given --baseline,
+it prints the change against an earlier run and can fail on regressions.
+
+    python benchmarks/suite.py --rows 10000 --driver asgi --output baseline.json
+    python benchmarks/suite.py --rows 10000 --driver asgi --baseline baseline.json --fail-on-regression
+    python benchmarks/suite.py --rows 1000000 --driver http --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from common import ROOT, start_server, stop_server, summarize
+import seed as seeding
+import startup
+
+
+def scenarios(ids: dict, requests: int) -> list:
+    """(name, method, path, body(i), auth, request count) for every endpoint driven.
+
+    auth is False, True (rotate over the logged-in users) or "owner" (the first
+    user, who owns the first survey).
+    """
+    survey_id = ids["survey_ids"][0]
+    category_id = ids["category_ids"][0]
+    few = max(requests // 10, 10)
+    return [
+        ("auth.login", "POST", "/auth/login", None, False, max(requests // 20, 5)),
+        ("auth.me", "GET", "/auth/me", None, True, requests),
+        ("portal.stats", "GET", "/portal/stats", None, True, requests),
+        ("accounting.categories", "GET", "/accounting/categories", None, False, requests),
+        ("accounting.expenses", "GET", "/accounting/expenses?limit=50", None, True, requests),
+        ("accounting.expenses_range", "GET", "/accounting/expenses?limit=50&from=2025-01-01T00:00:00", None, True, requests),
+        ("accounting.summary", "GET", "/accounting/summary", None, True, requests),
+        ("accounting.summary_by_category", "GET", "/accounting/summary?by_category=true", None, True, requests),
+        ("accounting.create_expense", "POST", "/accounting/expenses", lambda i: {
+            "amount": 12.5, "description": f"bench {i}", "date": "2026-01-01T00:00:00",
+            "category_id": category_id, "is_income": False,
+        }, True, requests),
+        ("supply.items", "GET", "/supply/items", None, True, few),
+        ("supply.create_item", "POST", "/supply/items", lambda i: {"name": f"bench {i}", "status": "TO_BUY"}, True, requests),
+        ("supply.grouped", "GET", "/supply/items/grouped?per_status=20", None, True, requests),
+        ("supply.to_buy", "GET", "/supply/items/to-buy?limit=50", None, True, requests),
+        ("supply.create_batch", "POST", "/supply/items/batch", lambda i: {
+            "items": [{"name": f"bench {i}.{n}", "status": "TO_BUY"} for n in range(40)],
+        }, True, few),
+        ("supply.update_batch", "PATCH", "/supply/items/batch", lambda i: {
+            "ids": list(range(40 * i + 1, 40 * i + 41)), "status": ("IN_STOCK", "TO_BUY")[i % 2],
+        }, True, requests),
+        ("career.applications", "GET", "/career/applications", None, True, few),
+        ("career.create_application", "POST", "/career/applications", lambda i: {
+            "company": f"Bench {i}", "position": "Engineer", "status": "Applied",
+        }, True, requests),
+        ("career.stats", "GET", "/career/applications/stats", None, True, requests),
+        ("career.search", "GET", "/career/search?q=senior%20backend%20python", None, True, requests),
+        ("career.search_skills", "GET", "/career/search?skills=python&skills=docker", None, True, requests),
+        ("career.match", "GET", f"/career/applications/{ids['application_id']}/match", None, "owner", requests),
+        ("search.common", "GET", "/search?q=coffee", None, True, requests),
+        ("search.prefix", "GET", "/search?q=gro", None, True, requests),
+        ("search.phrase", "GET", "/search?q=phone%20screen&kinds=application", None, True, requests),
+        ("search.rare", "GET", "/search?q=company%20123", None, True, requests),
+        ("survey.list", "GET", "/surveys/", None, True, requests),
+        ("survey.get", "GET", f"/surveys/{survey_id}", None, False, requests),
+        ("survey.submit", "POST", f"/surveys/{survey_id}/responses", lambda i: {
+            "answers": {"q1": i % 5 + 1, "q2": "abc"[i % 3], "q3": ["x"], "q4": "ok"},
+        }, False, requests),
+        ("survey.analytics", "GET", f"/surveys/{survey_id}/analytics", None, "owner", requests),
+        ("survey.export", "GET", f"/surveys/{survey_id}/responses/export?format=ndjson", None, "owner", max(requests // 50, 3)),
+    ]
+
+
+def rss_mb(pid=None) -> dict:
+    """Current and peak resident memory of `pid` (default: this process)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return {
+            "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+        }
+    except (OSError, KeyError):
+        # Not Linux: only this process's peak is available
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_mb": None, "peak_rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+
+
+@asynccontextmanager
+async def asgi_driver(concurrency: int):
+    from server.main import app
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=concurrency)
+    # Runs the startup/shutdown hooks (ingest flusher, hashing pool)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=120) as client:
+            yield client, None
+
+
+@asynccontextmanager
+async def http_driver(concurrency: int, port: int, workdir: str, env: dict):
+    proc = start_server(port, workdir, env)
+    try:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+            yield client, proc.pid
+    finally:
+        stop_server(proc)
+
+
+async def login(client, email: str) -> dict:
+    r = await client.post("/auth/login", data={"username": email, "password": seeding.PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def run_scenario(client, scenario, users: list, headers: list, concurrency: int) -> dict:
+    name, method, path, body, needs_auth, total = scenario
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(n):
+        nonlocal errors
+        for i in counter:
+            kwargs = {}
+            if needs_auth == "owner":
+                kwargs["headers"] = headers[0]
+            elif needs_auth:
+                kwargs["headers"] = headers[(n + i) % len(headers)]
+            if name == "auth.login":
+                kwargs["data"] = {"username": users[i % len(users)], "password": seeding.PASSWORD}
+            elif body is not None:
+                kwargs["json"] = body(i)
+            start = time.perf_counter()
+            r = await client.request(method, path, **kwargs)
+            await r.aread()
+            latencies.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(min(concurrency, total))))
+    result = summarize(latencies, time.perf_counter() - start)
+    result.update(requests=total, errors=errors)
+    return result
+
+
+async def run(driver, ids: dict, args) -> dict:
+    results = {}
+    async with driver as (client, pid):
+        users = ids["users"][: max(1, min(len(ids["users"]), args.concurrency))]
+        headers = [await login(client, email) for email in users]
+        for scenario in scenarios(ids, args.requests):
+            if args.only and not any(scenario[0].startswith(prefix) for prefix in args.only):
+                continue
+            result = await run_scenario(client, scenario, users, headers, args.concurrency)
+            result.update(rss_mb(pid))
+            results[scenario[0]] = {key: round(value, 3) if isinstance(value, float) else value for key, value in result.items()}
+            print(
+                f"{scenario[0]:<32} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:7.1f}  "
+                f"p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}"
+            )
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print per-endpoint changes; return the names that regressed beyond `tolerance`"""
+    regressions = []
+    print(f"\n{'endpoint':<32} {'req/s':>10} {'p99':>10}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        rps_change = (result["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        p99_change = (result["p99_ms"] - before["p99_ms"]) / before["p99_ms"] if before["p99_ms"] else 0.0
+        regressed = rps_change < -tolerance or p99_change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32} {rps_change:>+9.1%} {p99_change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="rows per large table (1k to 1M)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--driver", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--database-url", default=None, help="defaults to a throwaway SQLite file")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--only", nargs="*", help="endpoint name prefixes to run, e.g. accounting survey.get")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=None, help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed fractional slowdown")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true", help="do not measure import time and cold start")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            # Every client shares one address; limits and budgets would skew the numbers
+            "RATE_LIMIT_ENABLED": "0",
+            "QUERY_BUDGET_MODE": "off",
+        }
+        os.environ.update(env)
+        sys.path.insert(0, ROOT)
+        ids = seeding.seed(args.rows, args.users)
+        print(f"Seeded {args.rows} rows per table in {ids['seconds']}s ({args.driver} driver)")
+
+        startup_result = None
+        if not args.skip_startup:
+            startup_result = startup.measure(env, workdir, args.port + 1)
+            startup.report(startup_result)
+
+        if args.driver == "asgi":
+            driver = asgi_driver(args.concurrency)
+        else:
+            driver = http_driver(args.concurrency, args.port, workdir, env)
+        results = asyncio.run(run(driver, ids, args))
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "driver": args.driver,
+            "database": "postgresql" if args.database_url and args.database_url.startswith("postgres") else "sqlite",
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "startup": startup_result,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("rows") != args.rows or baseline["meta"].get("driver") != args.driver:
+            print("warning: baseline was recorded with a different scale or driver")
+        regressions = compare(report, baseline, args.tolerance)
+        if startup_result and baseline.get("startup"):
+            regressions += startup.compare(startup_result, baseline["startup"], args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(f"{len(regressions)} measurements regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
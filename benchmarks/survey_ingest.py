@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Survey submission throughput: one commit per submission vs group commits.
+
+"before" runs with SURVEY_INGEST_BATCH_SIZE=1, so every submission gets its
+own INSERT and commit as the old handler did; "after" uses the batched
+defaults (or --batch-size / --flush-ms). Reports accepted submissions/sec, p50/p99
+latency, and checks that every accepted response was written once the server
+has drained its queue on shutdown.
+
+    python benchmarks/survey_ingest.py --submissions 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import sqlite3
+import os
+import tempfile
+import time
+
+import httpx
+
+from common import register, start_server, stop_server, summarize
+
+QUESTIONS = [
+    {"id": "q1", "type": "rating", "label": "Overall", "required": True},
+    {"id": "q2", "type": "multiple_choice", "label": "Pick", "options": ["a", "b", "c"]},
+    {"id": "q3", "type": "checkbox", "label": "Any", "options": ["x", "y", "z"]},
+    {"id": "q4", "type": "text", "label": "Comments"},
+]
+
+async def drive(base_url, survey_id, total, concurrency):
+    latencies = []
+    counter = iter(range(total))
+
+    async def worker(client):
+        for i in counter:
+            answers = {"q1": i % 5 + 1, "q2": "abc"[i % 3], "q3": ["x", "z"][: i % 3], "q4": "ok"}
+            start = time.perf_counter()
+            r = await client.post(f"/surveys/{survey_id}/responses", json={"answers": answers})
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--flush-ms", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    runs = {
+        "before": {"SURVEY_INGEST_BATCH_SIZE": "1", "SURVEY_INGEST_FLUSH_MS": "0"},
+        "after": {"SURVEY_INGEST_BATCH_SIZE": str(args.batch_size), "SURVEY_INGEST_FLUSH_MS": str(args.flush_ms)},
+    }
+    for name, env in runs.items():
+        with tempfile.TemporaryDirectory() as workdir:
+            proc = start_server(args.port, workdir, env)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                headers = register(base_url)
+                survey = httpx.post(f"{base_url}/surveys/", headers=headers,
+                                    json={"title": "bench", "questions": QUESTIONS}).json()
+                result = asyncio.run(drive(base_url, survey["id"], args.submissions, args.concurrency))
+            finally:
+                stop_server(proc)
+            with sqlite3.connect(os.path.join(workdir, "sql_app.db")) as conn:
+                written = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        print(f"{name:>6}: {result['rps']:8.1f} submissions/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"p99 {result['p99_ms']:7.1f} ms  written {written}/{args.submissions}")
+
+if __name__ == "__main__":
+    main()
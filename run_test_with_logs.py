@@ -1,9 +1,13 @@
 #!/usr/bin/env python
 """Start backend server and capture all output"""
+import os
 import subprocess
 import sys
 import time
 
+# Repository root, so the script works from any checkout and working directory
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
 print("Starting FastAPI server...")
 print("=" * 80)
 
@@ -13,7 +17,7 @@ process = subprocess.Popen(
     stdout=subprocess.PIPE,
     stderr=subprocess.STDOUT,
     text=True,
-    cwd=r"C:\Users\ThinkPad\git-cbx"
+    cwd=ROOT
 )
 
 # Wait a moment for server to start
@@ -29,7 +33,7 @@ test_process = subprocess.Popen(
     stdout=subprocess.PIPE,
     stderr=subprocess.STDOUT,
     text=True,
-    cwd=r"C:\Users\ThinkPad\git-cbx"
+    cwd=ROOT
 )
 
 # Collect server output while test runs
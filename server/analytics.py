@@ -0,0 +1,196 @@
+"""Incremental survey analytics.
+
+Every accepted response adds to per-question counters (survey_answer_stats) and
+a per-day response count (survey_daily_counts) in the same transaction, so
+GET /surveys/{id}/analytics reads O(questions x buckets) rows no matter how
+many responses exist.
+
+Backfill or repair with:
+
+    python -m server.analytics rebuild [--survey-id ID]
+"""
+import argparse
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models, database, migrate
+
+CHOICE_TYPES = {"multiple_choice", "checkbox"}
+REBUILD_FETCH_SIZE = 1000
+
+
+def _is_blank(value) -> bool:
+    return value is None or value == "" or value == []
+
+
+def _rating(value) -> Optional[float]:
+    """The rating as a finite number, or None; nan and inf would poison the mean"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _rating_bucket(value) -> Optional[str]:
+    number = _rating(value)
+    if number is None:
+        return None
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def tally(questions: list, answers: dict, counts: Counter):
+    """Add one response's contribution to `counts`, keyed by (question_id, bucket)"""
+    for question in questions or []:
+        value = answers.get(question["id"])
+        if _is_blank(value):
+            continue
+        kind = question.get("type")
+        if kind in CHOICE_TYPES:
+            for choice in value if isinstance(value, list) else [value]:
+                counts[(question["id"], str(choice))] += 1
+        elif kind == "rating":
+            bucket = _rating_bucket(value)
+            if bucket is not None:
+                counts[(question["id"], bucket)] += 1
+        else:
+            counts[(question["id"], "")] += 1
+
+
+def apply_counts(db: Session, survey_id: int, counts: Counter, days: Counter):
+    for (question_id, bucket), count in counts.items():
+        database.increment(
+            db,
+            models.SurveyAnswerStat,
+            {"survey_id": survey_id, "question_id": question_id, "bucket": bucket},
+            count=count,
+        )
+    for day, count in days.items():
+        database.increment(db, models.SurveyDailyCount, {"survey_id": survey_id, "day": day}, count=count)
+
+
+def record_responses(
+    db: Session,
+    survey_id: int,
+    questions: list,
+    answer_sets: Iterable[dict],
+    received_at: Optional[datetime] = None,
+):
+    """Fold newly written responses into the survey's counters (caller commits)"""
+    day = (received_at or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+    counts = Counter()
+    total = 0
+    for answers in answer_sets:
+        tally(questions, answers or {}, counts)
+        total += 1
+    if total:
+        apply_counts(db, survey_id, counts, Counter({day: total}))
+
+
+def survey_analytics(db: Session, survey: models.Survey) -> dict:
+    stats = {}
+    for question_id, bucket, count in db.execute(
+        select(models.SurveyAnswerStat.question_id, models.SurveyAnswerStat.bucket, models.SurveyAnswerStat.count)
+        .where(models.SurveyAnswerStat.survey_id == survey.id)
+    ):
+        stats.setdefault(question_id, {})[bucket] = count
+
+    timeline = [
+        {"date": day, "count": count}
+        for day, count in db.execute(
+            select(models.SurveyDailyCount.day, models.SurveyDailyCount.count)
+            .where(models.SurveyDailyCount.survey_id == survey.id)
+            .order_by(models.SurveyDailyCount.day)
+        )
+    ]
+
+    questions = []
+    for question in survey.questions or []:
+        buckets = stats.get(question["id"], {})
+        kind = question.get("type")
+        entry = {"id": question["id"], "label": question.get("label"), "type": kind}
+        if kind in CHOICE_TYPES:
+            options = list(question.get("options") or [])
+            options += sorted(b for b in buckets if b not in options)
+            entry["counts"] = {option: buckets.get(option, 0) for option in options}
+            if kind == "multiple_choice":
+                # Checkbox respondents pick several options, so only single choice sums
+                entry["answered"] = sum(buckets.values())
+        elif kind == "rating":
+            # Buckets tallied before non-finite ratings were refused are left out
+            ratings = {bucket: n for bucket, n in buckets.items() if _rating(bucket) is not None}
+            answered = sum(ratings.values())
+            entry["answered"] = answered
+            entry["histogram"] = dict(sorted(ratings.items(), key=lambda item: float(item[0])))
+            entry["mean"] = (
+                round(sum(float(b) * n for b, n in ratings.items()) / answered, 3) if answered else None
+            )
+        else:
+            entry["answered"] = buckets.get("", 0)
+        questions.append(entry)
+
+    return {
+        "survey_id": survey.id,
+        "responses": sum(point["count"] for point in timeline),
+        "questions": questions,
+        "timeline": timeline,
+    }
+
+
+def rebuild_survey(db: Session, survey: models.Survey):
+    """Recompute one survey's counters from its stored responses"""
+    db.query(models.SurveyAnswerStat).filter(models.SurveyAnswerStat.survey_id == survey.id).delete(synchronize_session=False)
+    db.query(models.SurveyDailyCount).filter(models.SurveyDailyCount.survey_id == survey.id).delete(synchronize_session=False)
+
+    counts, days = Counter(), Counter()
+    query = (
+        select(models.Response.answers, models.Response.created_at)
+        .where(models.Response.survey_id == survey.id)
+        .execution_options(yield_per=REBUILD_FETCH_SIZE)
+    )
+    for answers, created_at in db.execute(query):
+        tally(survey.questions, answers or {}, counts)
+        days[(created_at or datetime.now(timezone.utc)).strftime("%Y-%m-%d")] += 1
+    apply_counts(db, survey.id, counts, days)
+    db.commit()
+
+
+def rebuild(db: Session, survey_id: Optional[int] = None) -> int:
+    query = db.query(models.Survey)
+    if survey_id is not None:
+        query = query.filter(models.Survey.id == survey_id)
+    surveys = query.all()
+    for survey in surveys:
+        rebuild_survey(db, survey)
+    return len(surveys)
+
+
+def backfill_if_empty(db: Session):
+    """Populate counters for databases that predate the analytics tables"""
+    has_stats = db.query(models.SurveyDailyCount.id).first() is not None
+    if not has_stats and db.query(models.Response.id).first() is not None:
+        rebuild(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain survey analytics counters")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--survey-id", type=int, default=None)
+    args = parser.parse_args()
+
+    migrate.upgrade(backfill=False)
+    db = database.SessionLocal()
+    try:
+        rebuilt = rebuild(db, args.survey_id)
+    finally:
+        db.close()
+    print(f"Rebuilt analytics for {rebuilt} surveys")
+
+
+if __name__ == "__main__":
+    main()
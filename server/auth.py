@@ -1,29 +1,119 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+import hashlib
+import logging
 import os
+import secrets
+import time
+from . import models, database, hashing
+from .cache import ExpiringMap, TTLCache
+
+logger = logging.getLogger(__name__)
 
 # Secret key should be in env, using default for dev
 SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_key_change_this_in_prod")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 300
+# Access tokens are short-lived and validated locally; clients renew them with
+# a rotating refresh token instead of logging in (and running argon2) again
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+
+# Resolved identities keyed by user id (or by token subject for tokens issued
+# before the "uid" claim existed). Short TTL so deactivation is picked up.
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+identity_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL_SECONDS)
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Decoded claims keyed by sha256(token), kept until the token's "exp", so the
+# signature is checked once per token per process. Revoked tokens go on a
+# deny-list until they would have expired anyway; revoking all of a user's
+# tokens records a cutoff that rejects anything issued ("iat") before it.
+# The deny-lists are never evicted early (only tokens revoked within the last
+# access token lifetime are held), unlike the verified cache, whose misses
+# just cost a signature check. Both lists are per process: with several
+# workers a revoked token is still accepted by workers that did not handle
+# the revocation.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+verified_tokens = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=None)
+revoked_tokens = ExpiringMap()
+revoked_before = ExpiringMap()
 
+# Request handlers hash through hashing.service; these helpers are for scripts
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing.get_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hashing.get_context().hash(password)
+
+_PHONE_SEPARATORS = str.maketrans("", "", " -().")
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email else email
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Drop formatting characters, keeping digits and a leading +"""
+    if not phone:
+        return phone
+    return phone.strip().translate(_PHONE_SEPARATORS) or phone.strip()
+
+def _candidates(value: str, normalize) -> list:
+    # Emails are all normalized since migration 0010, except case-only
+    # collisions; phones stored before normalization keep their spelling
+    return list({value, normalize(value)})
+
+def find_user_by_identifier(db: Session, identifier: str):
+    """Resolve an email or phone to a user with one query over both unique indexes"""
+    identifier = identifier.strip()
+    emails = _candidates(identifier, normalize_email)
+    phones = _candidates(identifier, normalize_phone)
+    users = db.query(models.User).filter(
+        or_(models.User.email.in_(emails), models.User.phone.in_(phones))
+    ).limit(2).all()
+    if len(users) > 1:
+        # One user's email is another's phone; go by what the identifier looks like
+        if "@" in identifier:
+            users = [u for u in users if u.email in emails]
+        else:
+            users = [u for u in users if u.phone in phones]
+        # Accounts that differ only in case (left alone by migration 0010): the exact spelling wins
+        users.sort(key=lambda u: identifier not in (u.email, u.phone))
+    return users[0] if users else None
+
+def find_identifier_conflict(db: Session, email: Optional[str], phone: Optional[str], exclude_id: Optional[int] = None) -> Optional[str]:
+    """Return "Email" or "Phone" if another user already holds it, in one query"""
+    clauses = []
+    if email:
+        clauses.append(models.User.email.in_(_candidates(email, normalize_email)))
+    if phone:
+        clauses.append(models.User.phone.in_(_candidates(phone, normalize_phone)))
+    if not clauses:
+        return None
+    query = db.query(models.User.email, models.User.phone).filter(or_(*clauses))
+    if exclude_id is not None:
+        query = query.filter(models.User.id != exclude_id)
+    for existing_email, existing_phone in query.limit(2):
+        if email and existing_email and normalize_email(existing_email) == normalize_email(email):
+            return "Email"
+        if phone and existing_phone and normalize_phone(existing_phone) == normalize_phone(phone):
+            return "Phone"
+    return None
+
+def token_claims_for(user) -> dict:
+    """Claims embedded in access tokens so requests can be authorized without a users lookup"""
+    return {"sub": user.email or user.phone, "uid": user.id}
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt # Pulls in cryptography; loaded on first use to keep startup fast
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti keeps tokens issued in the same second distinct, so one can be revoked alone
+    to_encode.update({"exp": expire, "iat": int(time.time()), "jti": secrets.token_hex(8)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -31,6 +121,44 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def decode_token(token: str) -> dict:
+    """Return the token's claims, verifying the signature only on a cache miss"""
+    digest = token_digest(token)
+    if digest in revoked_tokens:
+        raise JWTError("Token has been revoked")
+    payload = verified_tokens.get(digest)
+    if payload is None:
+        from jose import jwt
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            verified_tokens.set(digest, payload, ttl=remaining)
+    cutoff = revoked_before.get(payload.get("uid"))
+    if cutoff is not None and payload.get("iat", 0) < cutoff:
+        raise JWTError("Token has been revoked")
+    return payload
+
+def revoke_token(token: str) -> None:
+    """Deny a single token (logout) until it expires"""
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        return
+    digest = token_digest(token)
+    verified_tokens.invalidate(digest)
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        revoked_tokens.set(digest, True, ttl=remaining)
+
+def revoke_user_tokens(user_id: int) -> None:
+    """Deny every token issued to a user up to now (password change)"""
+    # iat has one-second resolution; tokens issued later in this second survive.
+    # Every token issued before now has expired once one lifetime has passed.
+    revoked_before.set(user_id, int(time.time()), ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,11 +166,141 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError as e:
-        print(f"JWT decode error: {e}")
+        logger.info("Rejected bearer token: %s", e)
         raise credentials_exception
-    return {"email": username}
+    return {"email": username, "id": payload.get("uid")}
+
+def identity_key(current_user: dict):
+    return current_user["id"] if current_user["id"] is not None else current_user["email"]
+
+def cache_identity(key, user) -> dict:
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    identity = {
+        "id": user.id,
+        "email": user.email,
+        "phone": user.phone,
+        "is_active": user.is_active,
+    }
+    identity_cache.set(key, identity)
+    return identity
+
+def get_current_active_user(
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Resolve the caller to {id, email, phone, is_active}.
+
+    Served from the identity cache when possible; on a miss the user is loaded
+    by primary key (or by subject for legacy tokens without a "uid" claim).
+    """
+    key = identity_key(current_user)
+    identity = identity_cache.get(key)
+    if identity is None:
+        if current_user["id"] is not None:
+            user = db.get(models.User, current_user["id"])
+        else:
+            # The subject may predate email normalization
+            user = find_user_by_identifier(db, key)
+        identity = cache_identity(key, user)
+    return identity
+
+def invalidate_identity(user) -> None:
+    """Drop every cached identity entry for a user after their record changes"""
+    for key in (user.id, user.email, user.phone):
+        if key is not None:
+            identity_cache.invalidate(key)
+
+def _refresh_error():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def issue_tokens(db: Session, user, family_id: Optional[str] = None) -> dict:
+    """Create an access token and a refresh token and commit the latter.
+
+    A new login starts a new refresh family; rotation keeps the family so a
+    replayed token can revoke everything derived from the same login.
+    """
+    now = datetime.utcnow()
+    if family_id is None:
+        family_id = secrets.token_hex(16)
+        # New login: drop this user's expired tokens so the table stays small
+        db.query(models.RefreshToken).filter(
+            models.RefreshToken.user_id == user.id,
+            models.RefreshToken.expires_at <= now,
+        ).delete(synchronize_session=False)
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        user_id=user.id,
+        family_id=family_id,
+        token_hash=token_digest(refresh_token),
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    # Claims are read before commit expires the user, saving a reload
+    access_token = create_access_token(
+        data=token_claims_for(user),
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    db.commit()
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> dict:
+    """Exchange a refresh token for a new token pair; each refresh token works once"""
+    now = datetime.utcnow()
+    stored = db.query(models.RefreshToken).filter(
+        models.RefreshToken.token_hash == token_digest(refresh_token)
+    ).first()
+    if stored is None or stored.revoked_at is not None or stored.expires_at <= now:
+        raise _refresh_error()
+    # Conditional update so two concurrent refreshes cannot both rotate it
+    claimed = db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.id == stored.id, models.RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    ).rowcount
+    if not claimed:
+        # A rotated token came back: assume it leaked and end the whole family
+        revoke_refresh_tokens(db, family_id=stored.family_id)
+        db.commit()
+        raise _refresh_error()
+    user = db.get(models.User, stored.user_id)
+    if user is None or not user.is_active:
+        db.rollback()
+        raise _refresh_error()
+    return issue_tokens(db, user, family_id=stored.family_id)
+
+def revoke_refresh_tokens(db: Session, family_id: Optional[str] = None, user_id: Optional[int] = None) -> None:
+    """Revoke one refresh family or all of a user's refresh tokens (caller commits)"""
+    query = update(models.RefreshToken).where(models.RefreshToken.revoked_at.is_(None))
+    if family_id is not None:
+        query = query.where(models.RefreshToken.family_id == family_id)
+    if user_id is not None:
+        query = query.where(models.RefreshToken.user_id == user_id)
+    db.execute(query.values(revoked_at=datetime.utcnow()))
+
+def revoke_refresh_token_family(db: Session, refresh_token: str, user_id: int) -> None:
+    """Revoke the family a refresh token belongs to (logout)"""
+    stored = db.query(models.RefreshToken).filter(
+        models.RefreshToken.token_hash == token_digest(refresh_token),
+        models.RefreshToken.user_id == user_id,
+    ).first()
+    if stored is not None:
+        revoke_refresh_tokens(db, family_id=stored.family_id)
+        db.commit()
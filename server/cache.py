@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+import heapq
+import time
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry expiry.
+
+    Entries are evicted least-recently-used first once ``maxsize`` is reached,
+    and lazily dropped when read after their deadline. Safe to share between
+    the threadpool workers that run sync route handlers.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ExpiringMap:
+    """In-process map whose entries live exactly until their own deadline.
+
+    Unlike TTLCache nothing is evicted early, so it suits deny-lists, where
+    forgetting an entry would let a revoked token back in. Its size is the
+    number of entries still live; expired ones are purged as others are added.
+    """
+
+    def __init__(self):
+        self._data: "dict[Hashable, tuple]" = {}
+        self._deadlines: list = [] # heap of (expires_at, key)
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            self._data[key] = (value, now + ttl)
+            heapq.heappush(self._deadlines, (now + ttl, key))
+
+    def _purge(self, now: float) -> None:
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, key = heapq.heappop(self._deadlines)
+            entry = self._data.get(key)
+            # A key set again since has a later deadline of its own
+            if entry is not None and entry[1] <= now:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._deadlines.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
@@ -0,0 +1,260 @@
+"""Career profile search.
+
+Skills are normalized into `skills` and linked to profiles through
+`career_profile_skills`, so "who lists X" is an index lookup. Each profile also
+gets a term vector of its headline, skills and experience
+(`career_profile_embeddings`). It is computed locally: words, word pairs and
+whole skills are hashed into EMBEDDING_DIM signed buckets with sublinear term
+frequency and L2 normalization, so no model or vocabulary has to be kept.
+On PostgreSQL the vectors live in a pgvector column and are ranked by cosine
+distance through its HNSW index; SQLite ranks them with an exact scan.
+
+Only profiles whose owners set `searchable` are indexed, and a match shows
+just their headline and skills. The career handlers reindex a profile in the
+same transaction as its update.
+Backfill or repair with:
+
+    python -m server.career_search rebuild
+"""
+import argparse
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Iterable, Optional
+from sqlalchemy import JSON, Float, cast, delete, func, insert, select, type_coerce
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models, database, migrate
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+SKILL_WEIGHT = 2.0 # A listed skill weighs about as much as a word used three times
+FETCH_SIZE = 500
+
+_TOKEN = re.compile(r"[\w+#.]+")
+_STOPWORDS = frozenset(
+    "a an and as at be by for from i in is it of on or our the to we with you your".split()
+)
+
+
+def normalize_skill(name) -> str:
+    return " ".join(str(name).lower().split())[:100] if name else ""
+
+
+def tokenize(text: str) -> list:
+    # Keeps c++, c#, node.js; drops sentence punctuation around them
+    words = (word.strip(".") for word in _TOKEN.findall((text or "").lower()))
+    return [word for word in words if word and word not in _STOPWORDS]
+
+
+def _bucket(feature: str):
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % models.EMBEDDING_DIM, 1.0 if h >> 63 else -1.0
+
+
+def embed(text: str, skills: Iterable[str] = ()) -> Optional[list]:
+    """Unit-length hashed term vector, or None when there is nothing to index"""
+    words = tokenize(text)
+    counts = Counter(words)
+    counts.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    keys = {normalize_skill(skill) for skill in skills} - {""}
+    for key in keys:
+        # Also as plain words, so free-text queries find listed skills
+        counts.update(tokenize(key))
+    weights = {feature: 1 + math.log(count) for feature, count in counts.items()}
+    for key in keys:
+        weights[f"skill:{key}"] = SKILL_WEIGHT
+
+    vector = [0.0] * models.EMBEDDING_DIM
+    for feature, weight in weights.items():
+        bucket, sign = _bucket(feature)
+        vector[bucket] += sign * weight
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else None
+
+
+def profile_text(profile: models.CareerProfile) -> str:
+    parts = [profile.headline or ""]
+    for entry in profile.experience or []:
+        if isinstance(entry, dict):
+            parts.extend(str(value) for value in entry.values() if isinstance(value, str))
+    return "\n".join(parts)
+
+
+def _skill_ids(db: Session, names: set) -> list:
+    if not names:
+        return []
+    existing = dict(db.execute(select(models.Skill.name, models.Skill.id).where(models.Skill.name.in_(names))).all())
+    for name in names - existing.keys():
+        try:
+            # Savepoint: another profile may add the same skill first
+            with db.begin_nested():
+                db.execute(insert(models.Skill).values(name=name))
+        except IntegrityError:
+            pass
+    if len(existing) < len(names):
+        existing = dict(db.execute(select(models.Skill.name, models.Skill.id).where(models.Skill.name.in_(names))).all())
+    return list(existing.values())
+
+
+def index_profile(db: Session, profile: models.CareerProfile):
+    """Refresh a profile's skill links and vector in the caller's transaction.
+
+    Profiles not opted in to search are taken out of the index.
+    """
+    db.flush()
+    db.execute(delete(models.CareerProfileSkill).where(models.CareerProfileSkill.profile_id == profile.id))
+    if not profile.searchable:
+        db.execute(delete(models.CareerProfileEmbedding).where(models.CareerProfileEmbedding.profile_id == profile.id))
+        return
+    names = {normalize_skill(skill) for skill in profile.skills or [] if isinstance(skill, str)} - {""}
+    skill_ids = _skill_ids(db, names)
+    if skill_ids:
+        db.execute(insert(models.CareerProfileSkill), [{"profile_id": profile.id, "skill_id": i} for i in skill_ids])
+
+    vector = embed(profile_text(profile), names)
+    row = db.get(models.CareerProfileEmbedding, profile.id)
+    if vector is None:
+        # Empty profiles have no direction to rank by
+        if row is not None:
+            db.delete(row)
+    elif row is None:
+        db.add(models.CareerProfileEmbedding(profile_id=profile.id, embedding=vector))
+    else:
+        row.embedding = vector
+
+
+def _with_all_skills(names: set):
+    """Subquery of profile ids listing every skill in `names`"""
+    link = models.CareerProfileSkill
+    return (
+        select(link.profile_id)
+        .join(models.Skill, models.Skill.id == link.skill_id)
+        .where(models.Skill.name.in_(names))
+        .group_by(link.profile_id)
+        .having(func.count() == len(names))
+    )
+
+
+def _rank_ann(db: Session, vector: list, candidates, limit: int) -> list:
+    table = models.CareerProfileEmbedding
+    query_vector = cast(vector, models.Embedding(models.EMBEDDING_DIM))
+    distance = table.embedding.op("<=>", return_type=Float)(query_vector)
+    query = select(table.profile_id, distance).order_by(distance).limit(limit)
+    if candidates is not None:
+        query = query.where(table.profile_id.in_(candidates))
+    return [(profile_id, 1.0 - distance) for profile_id, distance in db.execute(query)]
+
+
+def _rank_exact(db: Session, vector: list, candidates, limit: int) -> list:
+    table = models.CareerProfileEmbedding
+    # Read the stored sparse form as-is rather than expanding every row to EMBEDDING_DIM floats
+    query = select(table.profile_id, type_coerce(table.embedding, JSON)).execution_options(yield_per=FETCH_SIZE)
+    if candidates is not None:
+        query = query.where(table.profile_id.in_(candidates))
+    scored = (
+        (sum(vector[i] * x for i, x in zip(stored["index"], stored["value"])), profile_id)
+        for profile_id, stored in db.execute(query)
+    )
+    return [(profile_id, score) for score, profile_id in heapq.nlargest(limit, scored)]
+
+
+def search(db: Session, text: str, skills: Iterable[str] = (), require_skills: bool = False, limit: int = DEFAULT_LIMIT) -> list:
+    """Profiles ranked by cosine similarity to `text` and `skills`.
+
+    With require_skills, only profiles listing every one of `skills` qualify.
+    """
+    wanted = {normalize_skill(skill) for skill in skills} - {""}
+    vector = embed(text, wanted)
+    if vector is None:
+        return []
+    candidates = _with_all_skills(wanted) if wanted and require_skills else None
+    rank = _rank_ann if db.get_bind().dialect.name == "postgresql" else _rank_exact
+    ranked = [(profile_id, score) for profile_id, score in rank(db, vector, candidates, limit) if score > 0]
+    if not ranked:
+        return []
+
+    # Checked again here: a profile may have been made private since it was ranked
+    profiles = {
+        profile.id: profile
+        for profile in db.query(models.CareerProfile).filter(
+            models.CareerProfile.id.in_([p for p, _ in ranked]), models.CareerProfile.searchable.is_(True),
+        )
+    }
+    results = []
+    for profile_id, score in ranked:
+        profile = profiles.get(profile_id)
+        if profile is None:
+            continue
+        skills_listed = [skill for skill in profile.skills or [] if isinstance(skill, str)]
+        results.append({
+            "profile_id": profile.id,
+            "headline": profile.headline,
+            "skills": skills_listed,
+            "matched_skills": [skill for skill in skills_listed if normalize_skill(skill) in wanted],
+            "score": round(score, 4),
+        })
+    return results
+
+
+def known_skills(db: Session, text: str) -> list:
+    """Indexed skill names mentioned in `text` (as one- to three-word phrases)"""
+    words = [word.strip(".") for word in _TOKEN.findall((text or "").lower())]
+    phrases = {" ".join(words[i:i + n]) for n in (1, 2, 3) for i in range(len(words) - n + 1)}
+    phrases.discard("")
+    if not phrases:
+        return []
+    return list(db.execute(select(models.Skill.name).where(models.Skill.name.in_(phrases))).scalars())
+
+
+def match_application(db: Session, application: models.JobApplication, limit: int = DEFAULT_LIMIT) -> list:
+    """Profiles ranked against a job application's position and notes"""
+    text = f"{application.position or ''}\n{application.notes or ''}"
+    return search(db, text, known_skills(db, text), limit=limit)
+
+
+def rebuild(db: Session) -> int:
+    """Reindex every profile; returns how many were indexed"""
+    count, last_id = 0, 0
+    while True:
+        profiles = (
+            db.query(models.CareerProfile)
+            .filter(models.CareerProfile.id > last_id)
+            .order_by(models.CareerProfile.id)
+            .limit(FETCH_SIZE)
+            .all()
+        )
+        if not profiles:
+            return count
+        for profile in profiles:
+            index_profile(db, profile)
+        db.commit()
+        count += len(profiles)
+        last_id = profiles[-1].id
+
+
+def backfill_if_empty(db: Session):
+    """Index profiles for databases that predate the search tables"""
+    has_vectors = db.query(models.CareerProfileEmbedding.profile_id).first() is not None
+    if not has_vectors and db.query(models.CareerProfile.id).filter(models.CareerProfile.searchable.is_(True)).first() is not None:
+        rebuild(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the career search index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    migrate.upgrade(backfill=False)
+    db = database.SessionLocal()
+    try:
+        count = rebuild(db)
+    finally:
+        db.close()
+    print(f"Indexed {count} career profiles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Streaming bulk import for POST /accounting/expenses/bulk.
+
+The request body is read incrementally, on a worker thread, as CSV (header row,
+then one record per row; quoted fields may span lines) or NDJSON (one JSON
+object per line). Rows are validated against schemas.ExpenseCreate and
+written in chunks, one transaction per chunk with a multi-row INSERT plus the
+matching rollup deltas. The import's progress is committed with each chunk, so
+a retry with the same Idempotency-Key resumes after the last committed row
+instead of inserting duplicates.
+
+A request claims the import record with a conditional UPDATE before writing,
+and each chunk renews the claim in its own transaction. A retry that arrives
+while the claim is held gets 409; once the holder finishes, fails or goes
+quiet for EXPENSE_IMPORT_LEASE_SECONDS, the retry takes over.
+"""
+import csv
+import io
+import json
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, BinaryIO, Optional
+from anyio import from_thread
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from . import models, schemas, database, rollups
+
+BATCH_SIZE = int(os.getenv("EXPENSE_IMPORT_BATCH_SIZE", "500"))
+MAX_REPORTED_ERRORS = 1000
+LEASE_SECONDS = int(os.getenv("EXPENSE_IMPORT_LEASE_SECONDS", "300"))
+
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return "csv"
+    if media_type in NDJSON_TYPES:
+        return "ndjson"
+    raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson")
+
+
+class BodyReader(io.RawIOBase):
+    """The request body as a blocking file, read from a worker thread"""
+
+    def __init__(self, stream: AsyncIterator[bytes]):
+        self._chunks = stream.__aiter__()
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        return await anext(self._chunks, None)
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = from_thread.run(self._next_chunk)
+            if chunk is None:
+                return 0
+            self._pending = chunk
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def _csv_records(text):
+    # One reader over the whole body, so a quoted field can hold newlines
+    reader = csv.reader(text)
+    header = None
+    row_number = 0
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            row_number += 1
+            yield row_number, None, f"Malformed row: {e}"
+            continue
+        if not values or (len(values) == 1 and not values[0].strip()):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        # Empty cells fall back to schema defaults
+        yield row_number, {k: v for k, v in zip(header, values) if v != ""}, None
+
+
+def _ndjson_records(text):
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            fields = json.loads(line)
+            if not isinstance(fields, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield row_number, None, f"Malformed row: {e}"
+            continue
+        yield row_number, fields, None
+
+
+def iter_records(body: BinaryIO, fmt: str):
+    """Yield (row_number, fields or None, error or None) for each non-blank data row"""
+    text = io.TextIOWrapper(io.BufferedReader(body), encoding="utf-8-sig", newline="")
+    return _csv_records(text) if fmt == "csv" else _ndjson_records(text)
+
+
+def _lease_end() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)
+
+
+def open_import(db: Session, user_id: int, idempotency_key: Optional[str]):
+    """Claim the import record for this key, creating it on first use.
+
+    Returns (record, claim token); the token is None when the import has
+    already completed and only its result should be replayed.
+    """
+    token = uuid.uuid4().hex
+    if idempotency_key:
+        imports = models.ExpenseImport
+        claimed = db.execute(
+            update(imports)
+            .where(
+                imports.user_id == user_id,
+                imports.idempotency_key == idempotency_key,
+                imports.completed.is_(False),
+                or_(imports.claimed_until.is_(None), imports.claimed_until < datetime.now(timezone.utc)),
+            )
+            .values(claim_token=token, claimed_until=_lease_end())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        record = db.query(imports).filter(
+            imports.user_id == user_id,
+            imports.idempotency_key == idempotency_key
+        ).first()
+        if record:
+            if record.completed:
+                return record, None
+            if not claimed:
+                raise HTTPException(status_code=409, detail="An import with this Idempotency-Key is in progress")
+            return record, token
+    record = models.ExpenseImport(
+        user_id=user_id, idempotency_key=idempotency_key, errors=[], claim_token=token, claimed_until=_lease_end(),
+    )
+    db.add(record)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="An import with this Idempotency-Key is in progress")
+    db.refresh(record)
+    return record, token
+
+
+def _renew_claim(db: Session, record: models.ExpenseImport, token: str, **values):
+    """First statement of each write: fails with 409 if a retry took the import over"""
+    imports = models.ExpenseImport
+    renewed = db.execute(
+        update(imports).where(imports.id == record.id, imports.claim_token == token)
+        .values({"claimed_until": _lease_end(), **values}).execution_options(synchronize_session=False)
+    ).rowcount
+    if not renewed:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="This import was taken over by a retry with the same Idempotency-Key")
+
+
+def _release_claim(db: Session, record_id: int, token: str):
+    imports = models.ExpenseImport
+    db.rollback()
+    db.execute(
+        update(imports).where(imports.id == record_id, imports.claim_token == token)
+        .values(claim_token=None, claimed_until=None).execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _commit_chunk(db: Session, record: models.ExpenseImport, token: str, rows: list, errors: list, processed: int):
+    _renew_claim(db, record, token)
+    if rows:
+        db.execute(insert(models.Expense), rows)
+        deltas = defaultdict(lambda: [0, 0])
+        for row in rows:
+            key = (rollups.month_key(row["date"]), row["category_id"], row["is_income"])
+            deltas[key][0] += row["amount"]
+            deltas[key][1] += 1
+        for (month, category_id, is_income), (total, count) in deltas.items():
+            database.increment(
+                db,
+                models.ExpenseRollup,
+                {"user_id": record.user_id, "month": month, "category_id": category_id, "is_income": is_income},
+                total=total,
+                count=count,
+            )
+    record.inserted += len(rows)
+    record.failed += len(errors)
+    room = MAX_REPORTED_ERRORS - len(record.errors or [])
+    if errors and room > 0:
+        record.errors = (record.errors or []) + errors[:room]
+    record.rows_processed = processed
+    db.commit()
+
+
+def _finish(db: Session, record: models.ExpenseImport, token: str) -> dict:
+    _renew_claim(db, record, token, completed=True, claim_token=None, claimed_until=None)
+    db.commit()
+    return result(record)
+
+
+def _category_ids(db: Session) -> set:
+    return {category_id for (category_id,) in db.query(models.Category.id)}
+
+
+def _run_import(db: Session, record: models.ExpenseImport, token: str, body: BinaryIO, fmt: str) -> dict:
+    category_ids = _category_ids(db)
+    already_processed = record.rows_processed
+    rows, errors = [], []
+    row_number = already_processed
+
+    for row_number, fields, error in iter_records(body, fmt):
+        if row_number <= already_processed:
+            continue # Committed by an earlier attempt with the same key
+        if error is None:
+            try:
+                expense = schemas.ExpenseCreate(**fields)
+                if expense.category_id not in category_ids:
+                    error = f"Unknown category_id {expense.category_id}"
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                )
+        if error is not None:
+            errors.append({"row": row_number, "errors": [error]})
+        else:
+            rows.append({
+                "user_id": record.user_id,
+                "category_id": expense.category_id,
+                "amount": int(expense.amount * 100), # Convert to cents
+                "description": expense.description,
+                "date": expense.date,
+                "is_income": expense.is_income,
+            })
+        if len(rows) + len(errors) >= BATCH_SIZE:
+            _commit_chunk(db, record, token, rows, errors, row_number)
+            rows, errors = [], []
+
+    _commit_chunk(db, record, token, rows, errors, max(row_number, already_processed))
+    return _finish(db, record, token)
+
+
+async def run_import(
+    db: Session, record: models.ExpenseImport, token: str, stream: AsyncIterator[bytes], fmt: str,
+) -> dict:
+    # The CSV reader pulls the body from the thread as it needs it
+    record_id = record.id
+    try:
+        return await run_in_threadpool(_run_import, db, record, token, BodyReader(stream), fmt)
+    except BaseException:
+        # Let a retry resume now rather than after the lease (a no-op if one already took over)
+        await run_in_threadpool(_release_claim, db, record_id, token)
+        raise
+
+
+def result(record: models.ExpenseImport, replayed: bool = False) -> dict:
+    return {
+        "import_id": record.id,
+        "inserted": record.inserted,
+        "failed": record.failed,
+        "rows_processed": record.rows_processed,
+        "errors": record.errors or [],
+        "replayed": replayed,
+    }
@@ -0,0 +1,151 @@
+"""Password hashing off the request threadpool.
+
+Argon2 costs tens of milliseconds of CPU per call. HashingService runs it in a
+dedicated process pool (one worker per core by default) behind a bounded
+queue: once HASH_MAX_PENDING calls are in flight or waiting, new ones get a
+429 instead of piling up and starving other endpoints.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+
+# Argon2 parameters; raising them makes existing hashes "need update" and they
+# are transparently rehashed at the next successful login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536")) # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "process") # process | thread
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 4)))
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def build_context():
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=ARGON2_TIME_COST,
+        argon2__memory_cost=ARGON2_MEMORY_COST,
+        argon2__parallelism=ARGON2_PARALLELISM,
+    )
+
+
+_context = None
+
+
+def get_context():
+    """The shared CryptContext, built on first use: passlib and argon2 slow down imports"""
+    global _context
+    if _context is None:
+        _context = build_context()
+    return _context
+
+
+def __getattr__(name):
+    # hashing.pwd_context keeps working for scripts without an import-time build
+    if name == "pwd_context":
+        return get_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Entry points executed inside the pool workers
+def _hash(password: str) -> str:
+    return get_context().hash(password)
+
+
+def _verify_and_update(password: str, hashed: str):
+    return get_context().verify_and_update(password, hashed)
+
+
+class HashingMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.rejected = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.max_pending = 0
+
+    def observe(self, seconds: float):
+        self.calls += 1
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+class HashingService:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING, kind: str = HASH_EXECUTOR):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self.pending = 0
+        self.metrics = HashingMetrics()
+        self._executor: Executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "thread":
+                # argon2-cffi releases the GIL, so threads also run in parallel
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hashing")
+            else:
+                # spawn: forking a process that already runs threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        # Only touched from the event loop thread, so no lock is needed
+        if self.pending >= self.max_pending:
+            self.metrics.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        self.metrics.max_pending = max(self.metrics.max_pending, self.pending)
+        start = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        finally:
+            self.pending -= 1
+            self.metrics.observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed: str):
+        """Return (valid, new_hash); new_hash is set when the stored hash needs an upgrade"""
+        return await self._run(_verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        m = self.metrics
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "queue_depth": self.pending,
+            "queue_depth_max": m.max_pending,
+            "queue_limit": self.max_pending,
+            "calls": m.calls,
+            "rejected": m.rejected,
+            "latency_seconds_total": round(m.seconds_total, 6),
+            "latency_seconds_max": round(m.seconds_max, 6),
+            "latency_buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS, m.buckets)},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+service = HashingService()
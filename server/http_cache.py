@@ -0,0 +1,20 @@
+"""Entity-tag comparisons for conditional requests (RFC 9110, section 13.1)."""
+from typing import Optional
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when If-None-Match names `etag` or *, so a GET can answer 304"""
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so a W/ prefix is ignored
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def if_match_fails(if_match: Optional[str], current: str) -> bool:
+    """True when an If-Match header is present and names neither `current` nor *"""
+    if not if_match:
+        return False
+    # If-Match uses strong comparison, so weak tags never match
+    candidates = [tag.strip() for tag in if_match.split(",")]
+    return "*" not in candidates and current not in candidates
@@ -0,0 +1,318 @@
+"""Buffered ingestion for public survey submissions.
+
+POST /surveys/{id}/responses validates answers against a cached copy of the
+survey's questions and enqueues them; a background task drains the queue and
+writes each batch (bounded by size and by time) with a single multi-row INSERT
+and one commit. Callers get a receipt id straight away, and the id is stored on
+the response row.
+
+The analytics counters are updated in a second transaction, so a failure there
+cannot lose responses; the affected surveys are rebuilt from their responses on
+a later flush. If the batch INSERT keeps failing, rows are inserted one at a
+time, and any that still fail are appended to SURVEY_INGEST_SPILL_PATH and
+inserted again once writes succeed (receipt ids are unique, so a replay never
+stores a response twice). A batch whose flush fails outright is spilled whole,
+and the flusher carries on; if it is restarted, the queue it left is kept.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+import uuid
+from collections import defaultdict
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from . import models, database, analytics
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("SURVEY_INGEST_BATCH_SIZE", "200"))
+FLUSH_INTERVAL_MS = int(os.getenv("SURVEY_INGEST_FLUSH_MS", "50"))
+QUEUE_SIZE = int(os.getenv("SURVEY_INGEST_QUEUE_SIZE", "10000"))
+SPILL_PATH = os.getenv("SURVEY_INGEST_SPILL_PATH", "./survey_ingest_spill.ndjson")
+
+# survey_id -> {"id", "is_active", "questions"}; short TTL so edits made by
+# other workers are picked up
+survey_schemas = TTLCache(maxsize=1024, ttl=60)
+
+
+def _load_schema(survey_id: int):
+    with database.SessionLocal() as db:
+        survey = db.get(models.Survey, survey_id)
+        if survey is None:
+            return None
+        return {"id": survey.id, "is_active": survey.is_active, "questions": survey.questions or []}
+
+
+async def get_survey_schema(survey_id: int):
+    schema = survey_schemas.get(survey_id)
+    if schema is None:
+        schema = await run_in_threadpool(_load_schema, survey_id)
+        if schema is None:
+            raise HTTPException(status_code=404, detail="Survey not found")
+        survey_schemas.set(survey_id, schema)
+    return schema
+
+
+def validate_answers(questions: list, answers: dict) -> list:
+    """Return a list of problems with `answers`; empty when they are acceptable"""
+    errors = []
+    known = {q["id"] for q in questions}
+    for key in answers:
+        if key not in known:
+            errors.append(f"{key}: unknown question")
+    for question in questions:
+        qid = question["id"]
+        value = answers.get(qid)
+        if value is None or value == "" or value == []:
+            if question.get("required"):
+                errors.append(f"{qid}: answer required")
+            continue
+        kind = question.get("type")
+        options = question.get("options") or []
+        if kind == "multiple_choice":
+            if not isinstance(value, str) or (options and value not in options):
+                errors.append(f"{qid}: expected one of the options")
+        elif kind == "checkbox":
+            if not isinstance(value, list) or (options and any(v not in options for v in value)):
+                errors.append(f"{qid}: expected a list of options")
+        elif kind == "rating":
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                errors.append(f"{qid}: expected a number")
+            else:
+                try:
+                    # float() also takes "nan" and "inf", which no scale holds
+                    if not math.isfinite(float(value)):
+                        raise ValueError(value)
+                except (ValueError, OverflowError):
+                    errors.append(f"{qid}: expected a number")
+    return errors
+
+
+def _rows(batch: list) -> list:
+    return [
+        {"survey_id": survey_id, "answers": answers, "receipt_id": receipt_id}
+        for survey_id, answers, receipt_id in batch
+    ]
+
+
+class ResponseIngestor:
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        queue_size: int = QUEUE_SIZE,
+        spill_path: str = SPILL_PATH,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.queue_size = queue_size
+        self.spill_path = spill_path
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._stale_surveys = set() # Analytics to rebuild after a failed update
+        self.accepted = 0
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the flusher on the running loop; safe to call repeatedly"""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # Everything queued already has a receipt, so it moves to the new loop's queue
+            pending = self._take_queued() if self._queue is not None else []
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            for item in pending:
+                self._queue.put_nowait(item)
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the flusher"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, survey_id: int, answers: dict) -> str:
+        self.start()
+        receipt_id = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait((survey_id, answers, receipt_id))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many submissions, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.accepted += 1
+        return receipt_id
+
+    def _take_queued(self) -> list:
+        items = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                items.append(item)
+        return items
+
+    async def _write(self, batch: list):
+        """Flush one batch; if that fails, spill it, so the flusher keeps going and nothing is lost"""
+        try:
+            await run_in_threadpool(self._flush, batch)
+        except Exception:
+            logger.exception("Failed to flush %d survey responses; spilling them", len(batch))
+            # Rows already stored are skipped on replay by their receipt id
+            await run_in_threadpool(self._spill, _rows(batch))
+
+    async def _run(self):
+        # Responses spilled by an earlier run of this worker
+        try:
+            await run_in_threadpool(self._replay_spill)
+        except Exception:
+            logger.exception("Failed to replay spilled survey responses")
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+        # Drain anything enqueued after the stop marker
+        leftover = self._take_queued()
+        if leftover:
+            await self._write(leftover)
+
+    def _flush(self, batch: list):
+        """Write one batch: the responses first, then their analytics"""
+        written = self._insert(_rows(batch))
+        self._record_analytics(written)
+        if written and os.path.exists(self.spill_path):
+            self._replay_spill()
+
+    def _insert(self, rows: list) -> list:
+        """Insert rows in one statement, else one at a time; spill what fails. Returns the rows stored."""
+        for attempt in (1, 2):
+            with database.SessionLocal() as db:
+                try:
+                    db.execute(insert(models.Response), rows)
+                    db.commit()
+                    self.written += len(rows)
+                    return rows
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to write %d survey responses (attempt %d)", len(rows), attempt)
+        written, failed = [], []
+        with database.SessionLocal() as db:
+            for row in rows:
+                try:
+                    db.execute(insert(models.Response), [row])
+                    db.commit()
+                    written.append(row)
+                except IntegrityError:
+                    # Its receipt id is already stored (a replayed spill), or its survey is gone
+                    db.rollback()
+                    logger.warning("Skipped survey response %s", row["receipt_id"], exc_info=True)
+                except Exception:
+                    db.rollback()
+                    failed.append(row)
+        self.written += len(written)
+        if failed:
+            self._spill(failed)
+        return written
+
+    def _record_analytics(self, rows: list):
+        if not rows and not self._stale_surveys:
+            return
+        by_survey = defaultdict(list)
+        for row in rows:
+            by_survey[row["survey_id"]].append(row["answers"])
+        with database.SessionLocal() as db:
+            # Surveys whose counters missed a batch are recounted from their responses instead
+            stale = set(self._stale_surveys)
+            try:
+                for survey_id in stale:
+                    analytics.rebuild(db, survey_id)
+                    self._stale_surveys.discard(survey_id)
+                for survey_id, answer_sets in by_survey.items():
+                    if survey_id in stale:
+                        continue
+                    schema = survey_schemas.get(survey_id) or _load_schema(survey_id)
+                    if schema is not None:
+                        analytics.record_responses(db, survey_id, schema["questions"], answer_sets)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._stale_surveys.update(by_survey)
+                logger.exception("Failed to update survey analytics for surveys %s; they will be rebuilt", sorted(by_survey))
+
+    def _spill(self, rows: list):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as spill:
+                for row in rows:
+                    spill.write(json.dumps(row) + "\n")
+                spill.flush()
+                os.fsync(spill.fileno())
+            self.spilled += len(rows)
+            logger.error("Spilled %d survey responses to %s", len(rows), self.spill_path)
+        except OSError:
+            self.dropped += len(rows)
+            logger.exception(
+                "Failed to spill survey responses; lost receipts %s", [row["receipt_id"] for row in rows]
+            )
+
+    def _replay_spill(self):
+        """Insert responses spilled by failed writes; rows that fail again are spilled again"""
+        replaying = self.spill_path + ".replay"
+        try:
+            # A leftover .replay file is from a replay that died part way; finish it first
+            if not os.path.exists(replaying):
+                os.replace(self.spill_path, replaying)
+            with open(replaying, encoding="utf-8") as spill:
+                lines = [line for line in spill if line.strip()]
+        except FileNotFoundError:
+            return # Nothing spilled, or another worker took it
+        rows = []
+        for line in lines:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # A torn write; set it aside for a person rather than retrying it forever
+                with open(self.spill_path + ".rejected", "a", encoding="utf-8") as rejected:
+                    rejected.write(line if line.endswith("\n") else line + "\n")
+                logger.error("Moved an unreadable spilled survey response to %s.rejected", self.spill_path)
+        for start in range(0, len(rows), self.batch_size):
+            self._record_analytics(self._insert(rows[start:start + self.batch_size]))
+        try:
+            os.remove(replaying)
+        except FileNotFoundError:
+            pass
+        logger.info("Replayed %d spilled survey responses", len(rows))
+
+
+ingestor = ResponseIngestor()
@@ -1,19 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-try:
-    from .routers import auth, portal, survey, accounting, career, supply
-    from . import models, database
-except ImportError:
-    from routers import auth, portal, survey, accounting, career, supply
-    import models, database
+from .routers import auth, portal, survey, accounting, career, supply, search
+from . import database, ingest, hashing, migrate, ratelimit, observability, querybudget
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
+# Statement timing covers startup work too, but only requests get per-request counts
+observability.instrument_engine(database.engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if migrate.AUTO_MIGRATE:
+        # A no-op once the database is at head, so only the first worker pays for it
+        await run_in_threadpool(migrate.upgrade)
+    # Sampled, so cheap enough for every start; keeps plans right as tables grow
+    await run_in_threadpool(database.analyze)
+    ingest.ingestor.start()
+    yield
+    # Write out survey responses still buffered before the worker exits
+    await ingest.ingestor.stop()
+    hashing.service.shutdown()
 
 app = FastAPI(
     title="cbx.life API",
     description="Backend API for cbx.life platform",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -22,20 +35,41 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
+# Added before CORS so that 429 responses still carry CORS headers
+app.add_middleware(ratelimit.RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", *ratelimit.RESPONSE_HEADERS],
 )
 
+if querybudget.QUERY_BUDGET_MODE != "off":
+    # Development/test only: flag endpoints over budget or running N+1 patterns
+    querybudget.install(app)
+
+# Outermost, so the timing includes rate limiting and CORS handling
+app.add_middleware(observability.MetricsMiddleware)
+
+if database.ASYNC_ENABLED:
+    # Registered first so they take precedence over the sync handlers; kept
+    # out of the schema since they share paths and operation ids with them
+    from .routers.aio import accounting as aio_accounting, career as aio_career
+    from .routers.aio import supply as aio_supply, survey as aio_survey
+    observability.instrument_engine(database.get_async_engine().sync_engine)
+    for aio_router in (aio_survey, aio_accounting, aio_career, aio_supply):
+        app.include_router(aio_router.router, include_in_schema=False)
+
 app.include_router(auth.router)
 app.include_router(portal.router)
 app.include_router(survey.router)
 app.include_router(accounting.router)
 app.include_router(career.router)
 app.include_router(supply.router)
+app.include_router(search.router)
 
 @app.get("/")
 async def root():
@@ -44,3 +78,18 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/health/db")
+def database_health():
+    """Connection pool occupancy and checkout wait statistics"""
+    return database.pool_status()
+
+@app.get("/health/hashing")
+def hashing_health():
+    """Password hashing pool queue depth and latency"""
+    return hashing.service.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(observability.render(), media_type=observability.CONTENT_TYPE)
@@ -0,0 +1,113 @@
+"""Schema migrations, run once per deployment instead of once per worker.
+
+    python -m server.migrate            # upgrade to head, then backfill
+    python -m server.migrate --check    # exit 1 when migrations are pending
+
+Migrations live in server/migrations (Alembic). With DB_AUTO_MIGRATE=1, the
+default for SQLite, the app runs upgrade() from its lifespan. upgrade()
+returns straight away when the database is already at head, and on
+PostgreSQL it holds an advisory lock, so workers starting together do not
+race each other. For PostgreSQL deployments, run this module before starting
+the workers.
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+from sqlalchemy import inspect
+from . import database
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "versions")
+
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1" if database.engine.dialect.name == "sqlite" else "0") == "1"
+
+# Arbitrary key shared by everything that migrates this database
+ADVISORY_LOCK_KEY = 0x63627801
+
+
+def _config(connection=None):
+    from alembic.config import Config
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+_REVISION = re.compile(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision\s*=\s*(.+)$", re.M)
+_QUOTED = re.compile(r"['\"]([^'\"]+)['\"]")
+
+
+def heads() -> set:
+    """Head revisions, read from the migration files.
+
+    Importing alembic costs more than the rest of a no-op startup check, so it
+    is only loaded once there is something to migrate.
+    """
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if name.endswith(".py"):
+            with open(os.path.join(VERSIONS_DIR, name), encoding="utf-8") as f:
+                source = f.read()
+            revisions.update(_REVISION.findall(source))
+            for down in _DOWN_REVISION.findall(source):
+                parents.update(_QUOTED.findall(down))
+    return revisions - parents
+
+
+def current(connection) -> set:
+    if not inspect(connection).has_table("alembic_version"):
+        return set()
+    return {version for (version,) in connection.exec_driver_sql("SELECT version_num FROM alembic_version")}
+
+
+def pending() -> bool:
+    with database.engine.connect() as conn:
+        return current(conn) != heads()
+
+
+def upgrade(backfill: bool = True) -> bool:
+    """Upgrade to head; returns whether any migration ran"""
+    target = heads()
+    with database.engine.connect() as conn:
+        if current(conn) == target:
+            return False
+    with database.engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({ADVISORY_LOCK_KEY})")
+        # Another process may have finished while we waited for the lock
+        if current(conn) == target:
+            return False
+        from alembic import command
+        logger.info("Migrating database to %s", ", ".join(sorted(target)))
+        command.upgrade(_config(conn), "head")
+    if backfill:
+        from . import rollups, analytics, career_search, pipeline
+        with database.SessionLocal() as db:
+            rollups.backfill_if_empty(db)
+            analytics.backfill_if_empty(db)
+            career_search.backfill_if_empty(db)
+            pipeline.backfill_if_empty(db)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade the database schema")
+    parser.add_argument("--check", action="store_true", help="only report whether migrations are pending")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.check:
+        if pending():
+            sys.exit("Migrations pending")
+        print("Database is at head")
+        return
+    print("Migrated" if upgrade() else "Database already at head")
+
+
+if __name__ == "__main__":
+    main()
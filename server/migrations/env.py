@@ -0,0 +1,58 @@
+from logging.config import fileConfig
+from alembic import context
+from server import models, database
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # The full-text index (and SQLite's FTS5 shadow tables) is raw SQL, not in the models
+    if type_ == "table" and reflected and compare_to is None and name.startswith("search_index"):
+        return False
+    # Backend-specific indexes (Index.ddl_if(dialect=...)) only exist on that backend
+    ddl_if = getattr(obj, "_ddl_if", None)
+    dialect = ddl_if.dialect if ddl_if is not None else None
+    if isinstance(dialect, str):
+        dialect = (dialect,)
+    return dialect is None or context.get_context().dialect.name in dialect
+
+
+def run_migrations_offline():
+    context.configure(
+        url=database.engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # server.migrate passes in a connection that already holds the migration lock
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with database.engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    # Batch mode lets ALTERs that SQLite cannot do in place run as table copies
+    context.configure(
+        connection=connection, target_metadata=target_metadata, render_as_batch=True, include_object=include_object
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,207 @@
+"""Baseline schema
+
+Everything that create_all plus upgrade_schema used to build at startup.
+Databases created that way already have most of these tables, so each table,
+column and index is only created when missing; afterwards they are at this
+revision like a fresh database.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _id():
+    return sa.Column("id", sa.Integer(), primary_key=True)
+
+
+def _created_at(name="created_at"):
+    return sa.Column(name, sa.DateTime(timezone=True), server_default=sa.func.now())
+
+
+TABLES = {
+    "users": lambda: (
+        _id(),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        _created_at(),
+        _created_at("updated_at"),
+    ),
+    "categories": lambda: (
+        _id(),
+        sa.Column("name", sa.String()),
+        sa.Column("icon", sa.String(), nullable=True),
+    ),
+    "refresh_tokens": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("family_id", sa.String(32), nullable=False),
+        sa.Column("token_hash", sa.String(64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("used_at", sa.DateTime(), nullable=True),
+        sa.Column("revoked_at", sa.DateTime(), nullable=True),
+        _created_at(),
+    ),
+    "surveys": lambda: (
+        _id(),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("questions", sa.JSON()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        _created_at(),
+    ),
+    "responses": lambda: (
+        _id(),
+        sa.Column("survey_id", sa.Integer(), sa.ForeignKey("surveys.id")),
+        sa.Column("answers", sa.JSON()),
+        sa.Column("receipt_id", sa.String(32), nullable=True),
+        _created_at(),
+    ),
+    "survey_answer_stats": lambda: (
+        _id(),
+        sa.Column("survey_id", sa.Integer(), sa.ForeignKey("surveys.id"), nullable=False),
+        sa.Column("question_id", sa.String(), nullable=False),
+        sa.Column("bucket", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("survey_id", "question_id", "bucket", name="uq_survey_answer_stats_key"),
+    ),
+    "survey_daily_counts": lambda: (
+        _id(),
+        sa.Column("survey_id", sa.Integer(), sa.ForeignKey("surveys.id"), nullable=False),
+        sa.Column("day", sa.String(10), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("survey_id", "day", name="uq_survey_daily_counts_key"),
+    ),
+    "expenses": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id")),
+        sa.Column("amount", sa.Integer()),
+        sa.Column("description", sa.String()),
+        sa.Column("date", sa.DateTime()),
+        sa.Column("is_income", sa.Boolean()),
+        _created_at(),
+    ),
+    "expense_rollups": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("month", sa.String(7), nullable=False),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=True),
+        sa.Column("is_income", sa.Boolean(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("user_id", "month", "category_id", "is_income", name="uq_expense_rollups_key"),
+    ),
+    "expense_imports": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("idempotency_key", sa.String(), nullable=True),
+        sa.Column("rows_processed", sa.Integer(), nullable=False),
+        sa.Column("inserted", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.JSON()),
+        sa.Column("completed", sa.Boolean(), nullable=False),
+        _created_at(),
+        _created_at("updated_at"),
+        sa.UniqueConstraint("user_id", "idempotency_key", name="uq_expense_imports_key"),
+    ),
+    "career_profiles": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+        sa.Column("headline", sa.String(), nullable=True),
+        sa.Column("skills", sa.JSON()),
+        sa.Column("experience", sa.JSON()),
+        sa.Column("education", sa.JSON()),
+        _created_at("updated_at"),
+    ),
+    "job_applications": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("company", sa.String()),
+        sa.Column("position", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("salary_range", sa.String(), nullable=True),
+        sa.Column("notes", sa.String(), nullable=True),
+        _created_at("applied_date"),
+        _created_at("updated_at"),
+    ),
+    "supply_items": lambda: (
+        _id(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("name", sa.String()),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("status", sa.String()),
+        sa.Column("quantity", sa.String(), nullable=True),
+        _created_at(),
+        _created_at("updated_at"),
+    ),
+}
+
+# (name, table, columns, unique)
+INDEXES = [
+    ("ix_users_id", "users", ["id"], False),
+    ("ix_users_email", "users", ["email"], True),
+    ("ix_users_phone", "users", ["phone"], True),
+    ("ix_categories_id", "categories", ["id"], False),
+    ("ix_categories_name", "categories", ["name"], True),
+    ("ix_refresh_tokens_id", "refresh_tokens", ["id"], False),
+    ("ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"], False),
+    ("ix_refresh_tokens_family_id", "refresh_tokens", ["family_id"], False),
+    ("ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], True),
+    ("ix_surveys_id", "surveys", ["id"], False),
+    ("ix_surveys_title", "surveys", ["title"], False),
+    ("ix_responses_id", "responses", ["id"], False),
+    ("ix_responses_receipt_id", "responses", ["receipt_id"], True),
+    ("ix_survey_answer_stats_id", "survey_answer_stats", ["id"], False),
+    ("ix_survey_daily_counts_id", "survey_daily_counts", ["id"], False),
+    ("ix_expenses_id", "expenses", ["id"], False),
+    ("ix_expenses_user_date_id", "expenses", ["user_id", "date", "id"], False),
+    ("ix_expense_rollups_id", "expense_rollups", ["id"], False),
+    ("ix_expense_imports_id", "expense_imports", ["id"], False),
+    ("ix_career_profiles_id", "career_profiles", ["id"], False),
+    ("ix_job_applications_id", "job_applications", ["id"], False),
+    ("ix_supply_items_id", "supply_items", ["id"], False),
+    ("ix_supply_items_name", "supply_items", ["name"], False),
+]
+
+
+def _indexes(inspector, table) -> set:
+    return {index["name"] for index in inspector.get_indexes(table)} if inspector else set()
+
+
+def upgrade():
+    # Offline (--sql) runs have no database to inspect and emit the full schema
+    inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names()) if inspector else set()
+    for name, columns in TABLES.items():
+        if name not in existing:
+            op.create_table(name, *columns())
+            continue
+        # Tables from before upgrade_schema may lack later nullable/defaulted columns
+        present = {column["name"] for column in inspector.get_columns(name)}
+        for column in columns():
+            if isinstance(column, sa.Column) and column.name not in present:
+                op.add_column(name, column)
+
+    if inspector:
+        inspector = sa.inspect(op.get_bind())
+    for name, table, columns, unique in INDEXES:
+        if name not in _indexes(inspector, table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name in reversed(list(TABLES)):
+        op.drop_table(name)
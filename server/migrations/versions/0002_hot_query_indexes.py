@@ -0,0 +1,27 @@
+"""Indexes for the per-user list queries and unindexed foreign keys
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_hot_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_surveys_owner_id", "surveys", ["owner_id"])
+    op.create_index("ix_responses_survey_id_id", "responses", ["survey_id", "id"])
+    op.create_index("ix_job_applications_user_applied", "job_applications", ["user_id", "applied_date"])
+    op.create_index("ix_supply_items_user_status_created", "supply_items", ["user_id", "status", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_supply_items_user_status_created", table_name="supply_items")
+    op.drop_index("ix_job_applications_user_applied", table_name="job_applications")
+    op.drop_index("ix_responses_survey_id_id", table_name="responses")
+    op.drop_index("ix_surveys_owner_id", table_name="surveys")
@@ -0,0 +1,61 @@
+"""Career search: normalized skills and profile vectors
+
+On PostgreSQL the vectors are pgvector columns with an HNSW index (cosine
+distance); other backends store them as JSON and rank by exact scan.
+
+Revision ID: 0003_career_search
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_career_search"
+down_revision = "0002_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIM = 256
+
+
+def upgrade():
+    postgres = op.get_context().dialect.name == "postgresql"
+    if postgres:
+        from pgvector.sqlalchemy import Vector
+        op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        embedding_type = Vector(EMBEDDING_DIM)
+    else:
+        embedding_type = sa.JSON()
+
+    op.create_table(
+        "skills",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+    )
+    op.create_index("ix_skills_id", "skills", ["id"])
+    op.create_index("ix_skills_name", "skills", ["name"], unique=True)
+
+    op.create_table(
+        "career_profile_skills",
+        sa.Column("profile_id", sa.Integer(), sa.ForeignKey("career_profiles.id"), primary_key=True),
+        sa.Column("skill_id", sa.Integer(), sa.ForeignKey("skills.id"), primary_key=True),
+    )
+    op.create_index("ix_career_profile_skills_skill_id", "career_profile_skills", ["skill_id"])
+
+    op.create_table(
+        "career_profile_embeddings",
+        sa.Column("profile_id", sa.Integer(), sa.ForeignKey("career_profiles.id"), primary_key=True),
+        sa.Column("embedding", embedding_type, nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    if postgres:
+        op.create_index(
+            "ix_career_profile_embeddings_hnsw", "career_profile_embeddings", ["embedding"],
+            postgresql_using="hnsw", postgresql_ops={"embedding": "vector_cosine_ops"},
+        )
+
+
+def downgrade():
+    op.drop_table("career_profile_embeddings")
+    op.drop_table("career_profile_skills")
+    op.drop_table("skills")
@@ -0,0 +1,23 @@
+"""Version counter on career profiles for ETags and conditional updates
+
+Revision ID: 0004_career_profile_version
+Revises: 0003_career_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_career_profile_version"
+down_revision = "0003_career_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("career_profiles") as batch:
+        batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("career_profiles") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,55 @@
+"""Application status history and per-user funnel counters
+
+Revision ID: 0005_application_pipeline
+Revises: 0004_career_profile_version
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_application_pipeline"
+down_revision = "0004_career_profile_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job_application_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("application_id", sa.Integer(), sa.ForeignKey("job_applications.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("from_status", sa.String(), nullable=True),
+        sa.Column("to_status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_job_application_events_application_id", "job_application_events", ["application_id", "id"])
+    op.create_index(
+        "ix_job_application_events_user_application", "job_application_events", ["user_id", "application_id", "id"]
+    )
+
+    op.create_table(
+        "application_stage_counts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("current", sa.Integer(), nullable=False),
+        sa.Column("reached", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("user_id", "stage", name="uq_application_stage_counts_key"),
+    )
+
+    op.create_table(
+        "application_stage_durations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("bucket", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("user_id", "stage", "bucket", name="uq_application_stage_durations_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("application_stage_durations")
+    op.drop_table("application_stage_counts")
+    op.drop_table("job_application_events")
@@ -0,0 +1,111 @@
+"""Full-text search index over applications, expenses and supply items
+
+One index for all three sources, kept in sync by triggers so bulk imports and
+raw SQL writes are covered too:
+
+- SQLite: a contentless FTS5 table of (title, body). The rowid packs the
+  owner and kind above the source id, ((user_id * 4 + kind code) << 34) + id,
+  so one user's documents, or one kind of them, are a rowid range that FTS5
+  seeks to instead of a filter term whose doclist bm25 would have to count.
+- PostgreSQL: a search_index table of weighted tsvectors with a GIN index on
+  (user_id, document), via btree_gin.
+
+SQLite drops triggers along with their table, so a later batch migration
+that rebuilds one of these tables must recreate its triggers.
+
+Revision ID: 0006_search_index
+Revises: 0005_application_pipeline
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+KEY_SHIFT = 34
+
+revision = "0006_search_index"
+down_revision = "0005_application_pipeline"
+branch_labels = None
+depends_on = None
+
+# (kind, code, table, indexed columns, title, body); {r} is the row alias.
+# server/search.py's SOURCES must build the same documents.
+SOURCES = (
+    ("application", 1, "job_applications", "user_id, company, position, notes",
+     "coalesce({r}.company, '') || ' ' || coalesce({r}.position, '')", "coalesce({r}.notes, '')"),
+    ("expense", 2, "expenses", "user_id, description", "coalesce({r}.description, '')", "''"),
+    ("supply", 3, "supply_items", "user_id, name, category", "coalesce({r}.name, '')", "coalesce({r}.category, '')"),
+)
+
+
+def _sqlite_upgrade():
+    op.execute(
+        "CREATE VIRTUAL TABLE search_index USING fts5(title, body, content='', "
+        "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    for kind, code, table, columns, title, body in SOURCES:
+        def values(r):
+            rowid = f"((coalesce({r}.user_id, 0) * 4 + {code}) << {KEY_SHIFT}) + {r}.id"
+            return f"{rowid}, {title.format(r=r)}, {body.format(r=r)}"
+
+        insert = f"INSERT INTO search_index (rowid, title, body) VALUES ({values('new')});"
+        # Contentless tables delete by replaying the indexed values
+        delete = f"INSERT INTO search_index (search_index, rowid, title, body) VALUES ('delete', {values('old')});"
+        op.execute(f"CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(f"CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END")
+        op.execute(f"CREATE TRIGGER {table}_search_update AFTER UPDATE OF {columns} ON {table} BEGIN {delete} {insert} END")
+        op.execute(f"INSERT INTO search_index (rowid, title, body) SELECT {values(table)} FROM {table}")
+
+
+def _postgres_upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.execute(
+        "CREATE TABLE search_index (kind smallint NOT NULL, ref_id integer NOT NULL, user_id integer, "
+        "document tsvector NOT NULL, PRIMARY KEY (kind, ref_id))"
+    )
+    op.execute("CREATE INDEX ix_search_index_document ON search_index USING gin (user_id, document)")
+    for kind, code, table, columns, title, body in SOURCES:
+        def document(r):
+            return (
+                f"setweight(to_tsvector('english', {title.format(r=r)}), 'A') || "
+                f"setweight(to_tsvector('english', {body.format(r=r)}), 'B')"
+            )
+
+        op.execute(f"""
+            CREATE FUNCTION {table}_search() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    DELETE FROM search_index WHERE kind = {code} AND ref_id = OLD.id;
+                    RETURN OLD;
+                END IF;
+                INSERT INTO search_index (kind, ref_id, user_id, document)
+                VALUES ({code}, NEW.id, NEW.user_id, {document('NEW')})
+                ON CONFLICT (kind, ref_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+                RETURN NEW;
+            END $$
+        """)
+        op.execute(
+            f"CREATE TRIGGER {table}_search AFTER INSERT OR DELETE OR UPDATE OF {columns} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_search()"
+        )
+        op.execute(
+            f"INSERT INTO search_index (kind, ref_id, user_id, document) "
+            f"SELECT {code}, {table}.id, {table}.user_id, {document(table)} FROM {table}"
+        )
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        _postgres_upgrade()
+    else:
+        _sqlite_upgrade()
+
+
+def downgrade():
+    postgres = op.get_context().dialect.name == "postgresql"
+    for kind, code, table, *_ in SOURCES:
+        if postgres:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_search ON {table}")
+            op.execute(f"DROP FUNCTION IF EXISTS {table}_search()")
+        else:
+            for event in ("insert", "delete", "update"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_search_{event}")
+    op.execute("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,30 @@
+"""Partial index for the supply restock queue (PostgreSQL)
+
+Covers only TO_BUY items, keyed by (user_id, created_at) for the oldest-first
+queue. SQLite's planner always prefers ix_supply_items_user_status_created
+for that query, which needs no sort either, so the index is not created there.
+
+Revision ID: 0007_supply_to_buy_index
+Revises: 0006_search_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_supply_to_buy_index"
+down_revision = "0006_search_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.create_index(
+            "ix_supply_items_to_buy", "supply_items", ["user_id", "created_at"],
+            postgresql_where=sa.text("status = 'TO_BUY'"),
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.drop_index("ix_supply_items_to_buy", table_name="supply_items")
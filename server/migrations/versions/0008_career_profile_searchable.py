@@ -0,0 +1,29 @@
+"""Opt-in flag for career search
+
+Profiles start private, so the vectors and skill links indexed so far are
+removed; owners who set `searchable` are reindexed on that update.
+
+Revision ID: 0008_career_profile_searchable
+Revises: 0007_supply_to_buy_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_career_profile_searchable"
+down_revision = "0007_supply_to_buy_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A plain ADD COLUMN; no table copy needed
+    op.add_column("career_profiles", sa.Column("searchable", sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.execute("DELETE FROM career_profile_embeddings")
+    op.execute("DELETE FROM career_profile_skills")
+
+
+def downgrade():
+    # Run `python -m server.career_search rebuild` afterwards to index every profile again
+    with op.batch_alter_table("career_profiles") as batch:
+        batch.drop_column("searchable")
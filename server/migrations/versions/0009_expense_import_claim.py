@@ -0,0 +1,27 @@
+"""Claim on a bulk expense import
+
+Only the request holding the claim may write chunks, so a concurrent retry
+with the same Idempotency-Key gets 409 instead of inserting the same rows.
+
+Revision ID: 0009_expense_import_claim
+Revises: 0008_career_profile_searchable
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_expense_import_claim"
+down_revision = "0008_career_profile_searchable"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("expense_imports", sa.Column("claim_token", sa.String(), nullable=True))
+    op.add_column("expense_imports", sa.Column("claimed_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("expense_imports") as batch:
+        batch.drop_column("claimed_until")
+        batch.drop_column("claim_token")
@@ -0,0 +1,48 @@
+"""Store every email lowercased
+
+Registration normalizes emails (trimmed, lowercased) and logins look them up
+normalized, so accounts created before that with mixed-case emails could only
+sign in with the exact original spelling. This rewrites them in normalized form. Where two accounts differ
+only in case, or the normalized address already belongs to another account,
+both are left as they are and logged; they keep signing in with their stored
+spelling until someone merges them.
+
+Revision ID: 0010_lowercase_emails
+Revises: 0009_expense_import_claim
+Create Date: 2026-10-18
+"""
+import logging
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_lowercase_emails"
+down_revision = "0009_expense_import_claim"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+users = sa.table("users", sa.column("id", sa.Integer), sa.column("email", sa.String))
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Normalized in Python: SQLite's lower() only folds ASCII
+    stored = conn.execute(sa.select(users.c.id, users.c.email).where(users.c.email.is_not(None))).all()
+    taken = {email for _, email in stored}
+    by_target = defaultdict(list)
+    for user_id, email in stored:
+        target = email.strip().lower()
+        if target != email:
+            by_target[target].append((user_id, email))
+    for target, rows in by_target.items():
+        if len(rows) > 1 or target in taken:
+            logger.warning("Not normalizing %s: %s would collide", [email for _, email in rows], target)
+            continue
+        conn.execute(sa.update(users).where(users.c.id == rows[0][0]).values(email=target))
+
+
+def downgrade():
+    # The original spelling is not kept, and lowercased emails still work
+    pass
@@ -0,0 +1,29 @@
+"""Partial index for the supply restock queue on SQLite too
+
+0007 created ix_supply_items_to_buy on PostgreSQL only. SQLite supports
+partial indexes as well, so every backend now has it.
+
+Revision ID: 0011_supply_to_buy_index_sqlite
+Revises: 0010_lowercase_emails
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_supply_to_buy_index_sqlite"
+down_revision = "0010_lowercase_emails"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name != "postgresql":
+        op.create_index(
+            "ix_supply_items_to_buy", "supply_items", ["user_id", "created_at"],
+            sqlite_where=sa.text("status = 'TO_BUY'"),
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name != "postgresql":
+        op.drop_index("ix_supply_items_to_buy", table_name="supply_items")
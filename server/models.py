@@ -1,5 +1,6 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
-from sqlalchemy.sql import func
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Index, UniqueConstraint, text
+from sqlalchemy.sql import false, func
+from sqlalchemy.types import TypeDecorator
 from .database import Base
 
 class User(Base):
@@ -18,15 +19,29 @@ from sqlalchemy import ForeignKey, JSON
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import relationship
 
+class RefreshToken(Base):
+    """Rotating refresh tokens; only a sha256 digest of each token is stored"""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(String(32), nullable=False, index=True) # Shared by every rotation of one login
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    expires_at = Column(DateTime, nullable=False) # Naive UTC, like the JWT exp
+    used_at = Column(DateTime, nullable=True) # Set once rotated; presenting it again is reuse
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Survey(Base):
     __tablename__ = "surveys"
 
     id = Column(Integer, primary_key=True, index=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     title = Column(String, index=True)
     description = Column(String, nullable=True)
     questions = Column(JSON) # List of questions: {id, type, label, options, required}
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1") # Bumped on every edit
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     owner = relationship("User", back_populates="surveys")
@@ -34,14 +49,48 @@ class Survey(Base):
 
 class Response(Base):
     __tablename__ = "responses"
+    __table_args__ = (
+        # Per-survey exports in id order and analytics rebuilds
+        Index("ix_responses_survey_id_id", "survey_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     survey_id = Column(Integer, ForeignKey("surveys.id"))
     answers = Column(JSON) # Key-value mapping of Question ID -> Answer
+    receipt_id = Column(String(32), unique=True, index=True, nullable=True) # Returned to the submitter at ingestion
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     survey = relationship("Survey", back_populates="responses")
 
+class SurveyAnswerStat(Base):
+    """Running answer counts per (survey, question, bucket).
+
+    Buckets are the chosen option for multiple_choice/checkbox, the rating value
+    for rating questions, and "" (answered) for free text.
+    """
+    __tablename__ = "survey_answer_stats"
+    __table_args__ = (
+        UniqueConstraint("survey_id", "question_id", "bucket", name="uq_survey_answer_stats_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
+    question_id = Column(String, nullable=False)
+    bucket = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+class SurveyDailyCount(Base):
+    """Responses received per survey per UTC day"""
+    __tablename__ = "survey_daily_counts"
+    __table_args__ = (
+        UniqueConstraint("survey_id", "day", name="uq_survey_daily_counts_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
+    day = Column(String(10), nullable=False) # YYYY-MM-DD
+    count = Column(Integer, nullable=False, default=0)
+
 # Update User model to include surveys relationship
 User.surveys = relationship("Survey", back_populates="owner")
 
@@ -54,6 +103,10 @@ class Category(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Keyset pagination of a user's expenses by (date, id)
+        Index("ix_expenses_user_date_id", "user_id", "date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -70,6 +123,42 @@ class Expense(Base):
 
 User.expenses = relationship("Expense", back_populates="user")
 
+class ExpenseRollup(Base):
+    """Per-user, per-month, per-category totals kept in step with Expense writes"""
+    __tablename__ = "expense_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "month", "category_id", "is_income", name="uq_expense_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String(7), nullable=False) # YYYY-MM
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    is_income = Column(Boolean, nullable=False, default=False)
+    total = Column(Integer, nullable=False, default=0) # Cents
+    count = Column(Integer, nullable=False, default=0)
+
+class ExpenseImport(Base):
+    """Progress of a bulk expense import, used to make retries idempotent"""
+    __tablename__ = "expense_imports"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uq_expense_imports_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    idempotency_key = Column(String, nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0) # Rows covered by committed chunks
+    inserted = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON) # [{row, errors}], capped
+    completed = Column(Boolean, nullable=False, default=False)
+    # The request running the import; a retry may take over once the lease lapses
+    claim_token = Column(String, nullable=True)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class CareerProfile(Base):
     __tablename__ = "career_profiles"
 
@@ -80,11 +169,84 @@ class CareerProfile(Base):
     experience = Column(JSON) # List of dicts {company, role, duration, description}
     education = Column(JSON) # List of dicts {school, degree, year}
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1") # ETag; every UPDATE checks and bumps it
+    # Opt-in to career search, which then shows others the headline and skills
+    searchable = Column(Boolean, nullable=False, default=False, server_default=false())
 
     user = relationship("User", back_populates="career_profile")
 
+    __mapper_args__ = {"version_id_col": version}
+
+# Width of the career search vectors; changing it needs a migration and a rebuild
+EMBEDDING_DIM = 256
+
+class Embedding(TypeDecorator):
+    """pgvector `vector(dim)` on PostgreSQL, a JSON array of floats elsewhere"""
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, dim: int):
+        super().__init__()
+        self.dim = dim
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            from pgvector.sqlalchemy import Vector # Only needed (and installed) for PostgreSQL
+            return dialect.type_descriptor(Vector(self.dim))
+        return dialect.type_descriptor(JSON())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        # Hashed vectors are mostly zeros; the JSON fallback keeps only the set buckets
+        index = [i for i, x in enumerate(value) if x]
+        return {"dim": len(value), "index": index, "value": [value[i] for i in index]}
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            dense = [0.0] * value["dim"]
+            for i, x in zip(value["index"], value["value"]):
+                dense[i] = x
+            return dense
+        # pgvector returns numpy arrays
+        return [float(x) for x in value]
+
+class Skill(Base):
+    """Normalized skill names (see career_search.normalize_skill) shared by all profiles"""
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+
+class CareerProfileSkill(Base):
+    __tablename__ = "career_profile_skills"
+
+    profile_id = Column(Integer, ForeignKey("career_profiles.id"), primary_key=True)
+    skill_id = Column(Integer, ForeignKey("skills.id"), primary_key=True, index=True) # Profiles having a skill
+
+class CareerProfileEmbedding(Base):
+    """Hashed term vector of a profile's headline, skills and experience"""
+    __tablename__ = "career_profile_embeddings"
+    __table_args__ = (
+        # Approximate nearest neighbours by cosine distance; SQLite ranks by exact scan
+        Index(
+            "ix_career_profile_embeddings_hnsw", "embedding",
+            postgresql_using="hnsw", postgresql_ops={"embedding": "vector_cosine_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    profile_id = Column(Integer, ForeignKey("career_profiles.id"), primary_key=True)
+    embedding = Column(Embedding(EMBEDDING_DIM), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class JobApplication(Base):
     __tablename__ = "job_applications"
+    __table_args__ = (
+        # A user's applications, newest first
+        Index("ix_job_applications_user_applied", "user_id", "applied_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -98,11 +260,62 @@ class JobApplication(Base):
 
     user = relationship("User", back_populates="job_applications")
 
+class JobApplicationEvent(Base):
+    """Append-only history of application status changes; from_status is null on creation"""
+    __tablename__ = "job_application_events"
+    __table_args__ = (
+        # An application's history in order, and a user's for rebuilds
+        Index("ix_job_application_events_application_id", "application_id", "id"),
+        Index("ix_job_application_events_user_application", "user_id", "application_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    application_id = Column(Integer, ForeignKey("job_applications.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    from_status = Column(String, nullable=True)
+    to_status = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ApplicationStageCount(Base):
+    """Per-user, per-status application counts kept in step with status events"""
+    __tablename__ = "application_stage_counts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "stage", name="uq_application_stage_counts_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    stage = Column(String, nullable=False)
+    current = Column(Integer, nullable=False, default=0) # Applications in this status now
+    reached = Column(Integer, nullable=False, default=0) # Applications that got at least this far
+
+class ApplicationStageDuration(Base):
+    """Per-user histogram of completed stays in each status (see pipeline.DURATION_BUCKETS_HOURS)"""
+    __tablename__ = "application_stage_durations"
+    __table_args__ = (
+        UniqueConstraint("user_id", "stage", "bucket", name="uq_application_stage_durations_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    stage = Column(String, nullable=False)
+    bucket = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
 User.career_profile = relationship("CareerProfile", uselist=False, back_populates="user")
 User.job_applications = relationship("JobApplication", back_populates="user")
 
 class SupplyItem(Base):
     __tablename__ = "supply_items"
+    __table_args__ = (
+        # A user's items grouped by status, newest first within each
+        Index("ix_supply_items_user_status_created", "user_id", "status", "created_at"),
+        # The restock queue: only TO_BUY rows, so it stays small as stock accumulates
+        Index(
+            "ix_supply_items_to_buy", "user_id", "created_at",
+            postgresql_where=text("status = 'TO_BUY'"), sqlite_where=text("status = 'TO_BUY'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -0,0 +1,237 @@
+"""Request timing, SQL statement accounting and Prometheus metrics.
+
+MetricsMiddleware times every request by route template and adds a
+Server-Timing header with app and database time. Engine events count each
+SQL statement towards the request that issued it (tracked through a context
+variable, which the threadpool and greenlet bridges carry over) and log
+statements slower than SLOW_QUERY_MS with their parameters redacted.
+GET /metrics renders everything, plus pool, hashing, ingestion and rate limit
+state, in the Prometheus text format.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+from sqlalchemy import event
+from . import database, hashing, ingest, ratelimit
+
+slow_query_logger = logging.getLogger("server.sql.slow")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4" # Starlette appends the charset
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _quote(value) -> str:
+    return '"' + _escape(value) + '"'
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f"{name}={_quote(value)}" for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {} # labels -> [bucket counts..., sum, count]
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                bounds = [*self.buckets, "+Inf"]
+                for bound, count in zip(bounds, series[:-2] + [series[-1]]):
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, labels, 'le=%s' % _quote(bound))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {series[-1]}")
+        return lines
+
+
+def _gauge(name: str, help: str, value, kind: str = "gauge") -> list:
+    if value is None:
+        return []
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+request_duration = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+request_statements = Histogram(
+    "http_request_db_statements", "SQL statements issued per request", ("method", "route"), STATEMENT_BUCKETS
+)
+statements_total = Counter("db_statements_total", "SQL statements executed", ("operation",))
+statement_duration = Histogram("db_statement_duration_seconds", "SQL statement latency", ("operation",))
+slow_statements_total = Counter("db_slow_statements_total", f"SQL statements slower than {SLOW_QUERY_MS:g} ms")
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def _redact(parameters, executemany: bool) -> str:
+    """Describe bound parameters by type only, so values never reach the logs"""
+    if executemany:
+        return f"{len(parameters)} parameter sets"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - getattr(context, "_query_start", time.perf_counter())
+    operation = _operation(statement)
+    statements_total.inc(operation)
+    statement_duration.observe(elapsed, operation)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_statements_total.inc()
+        slow_query_logger.warning(
+            "Slow query (%.1f ms) params=%s: %s",
+            elapsed * 1000, _redact(parameters, executemany), " ".join(statement.split()),
+        )
+
+
+def instrument_engine(engine):
+    """Attach statement timing to a sync engine (or an AsyncEngine's sync_engine)"""
+    if not event.contains(engine, "after_cursor_execute", _after_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = (
+                    f"app;dur={(time.perf_counter() - start) * 1000:.1f}, "
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"'
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Route templates keep label cardinality bounded; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            requests_total.inc(method, route, str(status_code))
+            request_duration.observe(elapsed, method, route)
+            request_statements.observe(stats.statements, method, route)
+            current_request.reset(token)
+
+
+def render() -> str:
+    lines = []
+    for metric in (requests_total, request_duration, request_statements, statements_total, statement_duration, slow_statements_total):
+        lines += metric.collect()
+
+    pool = database.pool_status()
+    for key in ("size", "checked_in", "checked_out", "overflow", "saturation"):
+        lines += _gauge(f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}", pool.get(key))
+    lines += _gauge("db_pool_checkouts_total", "Connection checkouts", pool["checkouts"], "counter")
+    lines += _gauge("db_pool_checkout_timeouts_total", "Connection checkouts that timed out", pool["checkout_timeouts"], "counter")
+    lines += _gauge("db_pool_checkout_wait_seconds_total", "Time spent waiting for a connection", pool["checkout_wait_seconds_total"], "counter")
+
+    hashing_stats = hashing.service.stats()
+    lines += _gauge("password_hash_queue_depth", "Password hashing calls in flight or waiting", hashing_stats["queue_depth"])
+    lines += _gauge("password_hash_rejected_total", "Password hashing calls rejected with 429", hashing_stats["rejected"], "counter")
+    lines += ["# HELP password_hash_duration_seconds Password hash/verify latency", "# TYPE password_hash_duration_seconds histogram"]
+    for bound, count in hashing_stats["latency_buckets"].items():
+        lines.append(f"password_hash_duration_seconds_bucket{{le={_quote(bound)}}} {count}")
+    lines.append(f"password_hash_duration_seconds_bucket{{le={_quote('+Inf')}}} {hashing_stats['calls']}")
+    lines.append(f"password_hash_duration_seconds_sum {hashing_stats['latency_seconds_total']}")
+    lines.append(f"password_hash_duration_seconds_count {hashing_stats['calls']}")
+
+    lines += _gauge("survey_ingest_queue_depth", "Survey responses waiting to be written", ingest.ingestor.depth())
+    lines += _gauge("survey_ingest_accepted_total", "Survey responses accepted", ingest.ingestor.accepted, "counter")
+    lines += _gauge("survey_ingest_written_total", "Survey responses written", ingest.ingestor.written, "counter")
+    lines += _gauge("survey_ingest_spilled_total", "Survey responses spilled to disk after failed writes", ingest.ingestor.spilled, "counter")
+    lines += _gauge("survey_ingest_dropped_total", "Survey responses lost because spilling them failed too", ingest.ingestor.dropped, "counter")
+
+    lines += ["# HELP ratelimit_limited_total Requests rejected by rate limits", "# TYPE ratelimit_limited_total counter"]
+    for rule, count in sorted(ratelimit.limited.items()):
+        lines.append(f"ratelimit_limited_total{{rule={_quote(rule)}}} {count}")
+    return "\n".join(lines) + "\n"
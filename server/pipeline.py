@@ -0,0 +1,251 @@
+"""Job application funnel statistics.
+
+Every status change appends a row to `job_application_events` and, in the
+same transaction, adjusts per-user counters:
+
+- application_stage_counts: applications currently in each status, and how
+  many ever reached it. Pipeline stages (STAGES) count as reached when an
+  application gets to them or past them, so a jump from Applied straight to
+  Offer still counts as passing Interviewing.
+- application_stage_durations: a histogram of how long applications stayed
+  in a status before moving on, in DURATION_BUCKETS_HOURS buckets.
+
+GET /career/applications/stats reads those two small tables; medians are
+interpolated within the histogram bucket. Backfill or repair with:
+
+    python -m server.pipeline rebuild [--user-id ID]
+
+Applications that predate the event table get a single creation event at
+their applied date; their earlier history is unknown.
+"""
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import exists, func, insert, literal, null, select
+from sqlalchemy.orm import Session
+from . import models, database, migrate
+
+STAGES = ("Applied", "Interviewing", "Offer")
+DEFAULT_STATUS = "Applied"
+# Upper bounds of the time-in-status buckets; the last bucket is open-ended
+DURATION_BUCKETS_HOURS = (1, 6, 12, 24, 48, 72, 120, 168, 240, 336, 504, 720, 1080, 1440, 2160, 4320, 8760)
+REBUILD_FETCH_SIZE = 1000
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything stored is UTC
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def duration_bucket(hours: float) -> int:
+    for index, bound in enumerate(DURATION_BUCKETS_HOURS):
+        if hours <= bound:
+            return index
+    return len(DURATION_BUCKETS_HOURS)
+
+
+def implied_stages(status: str) -> set:
+    """The status itself plus the pipeline stages it implies were passed"""
+    if status in STAGES:
+        return set(STAGES[:STAGES.index(status) + 1])
+    return {status}
+
+
+def _count(db: Session, user_id: int, stage: str, current: int = 0, reached: int = 0):
+    database.increment(db, models.ApplicationStageCount, {"user_id": user_id, "stage": stage}, current=current, reached=reached)
+
+
+def record_created(db: Session, application: models.JobApplication, at: Optional[datetime] = None):
+    """Log a new application's first status and count it (caller commits)"""
+    db.flush()
+    status = application.status or DEFAULT_STATUS
+    db.add(models.JobApplicationEvent(
+        application_id=application.id, user_id=application.user_id, to_status=status,
+        created_at=at or datetime.now(timezone.utc),
+    ))
+    for stage in implied_stages(status):
+        _count(db, application.user_id, stage, current=int(stage == status), reached=1)
+
+
+def record_transition(db: Session, application: models.JobApplication, status: str, at: Optional[datetime] = None) -> bool:
+    """Move an application to `status`, logging the event and updating the counters.
+
+    Returns False (and writes nothing) when the status does not change.
+    """
+    previous = application.status or DEFAULT_STATUS
+    if status == previous:
+        return False
+    at = at or datetime.now(timezone.utc)
+    history = db.execute(
+        select(models.JobApplicationEvent.to_status, models.JobApplicationEvent.created_at)
+        .where(models.JobApplicationEvent.application_id == application.id)
+        .order_by(models.JobApplicationEvent.id)
+    ).all()
+    reached = set().union(*(implied_stages(to_status) for to_status, _ in history)) if history else implied_stages(previous)
+    entered_at = _utc(history[-1][1] if history else application.applied_date)
+
+    db.add(models.JobApplicationEvent(
+        application_id=application.id, user_id=application.user_id,
+        from_status=previous, to_status=status, created_at=at,
+    ))
+    application.status = status
+    _count(db, application.user_id, previous, current=-1)
+    for stage in implied_stages(status):
+        _count(db, application.user_id, stage, current=int(stage == status), reached=int(stage not in reached))
+    if entered_at is not None:
+        hours = max((at - entered_at).total_seconds(), 0) / 3600
+        database.increment(
+            db, models.ApplicationStageDuration,
+            {"user_id": application.user_id, "stage": previous, "bucket": duration_bucket(hours)},
+            count=1,
+        )
+    return True
+
+
+def median_hours(histogram: dict) -> Optional[float]:
+    """Median of a {bucket: count} histogram, interpolated within its bucket"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    half, seen = total / 2, 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if count and seen + count >= half:
+            lower = DURATION_BUCKETS_HOURS[bucket - 1] if bucket else 0
+            if bucket >= len(DURATION_BUCKETS_HOURS):
+                return float(lower)
+            return lower + (DURATION_BUCKETS_HOURS[bucket] - lower) * (half - seen) / count
+        seen += count
+    return None
+
+
+def _stage_order(stage: str):
+    if stage in STAGES:
+        return (0, STAGES.index(stage), stage)
+    return (1, 0, stage)
+
+
+def stats(db: Session, user_id: int) -> dict:
+    """Stage counts, conversion between pipeline stages and median time in each status"""
+    counts = {
+        stage: (current, reached)
+        for stage, current, reached in db.execute(
+            select(models.ApplicationStageCount.stage, models.ApplicationStageCount.current, models.ApplicationStageCount.reached)
+            .where(models.ApplicationStageCount.user_id == user_id)
+        )
+    }
+    histograms = {}
+    for stage, bucket, count in db.execute(
+        select(models.ApplicationStageDuration.stage, models.ApplicationStageDuration.bucket, models.ApplicationStageDuration.count)
+        .where(models.ApplicationStageDuration.user_id == user_id)
+    ):
+        histograms.setdefault(stage, {})[bucket] = count
+
+    stages = []
+    for stage in sorted(set(counts) | set(histograms) | set(STAGES), key=_stage_order):
+        current, reached = counts.get(stage, (0, 0))
+        conversion = None
+        if stage in STAGES and stage != STAGES[0]:
+            before = counts.get(STAGES[STAGES.index(stage) - 1], (0, 0))[1]
+            conversion = round(reached / before, 4) if before else None
+        median = median_hours(histograms.get(stage, {}))
+        stages.append({
+            "stage": stage,
+            "current": current,
+            "reached": reached,
+            "conversion_rate": conversion,
+            "completed_stays": sum(histograms.get(stage, {}).values()),
+            "median_days": round(median / 24, 2) if median is not None else None,
+        })
+    return {"total": sum(current for current, _ in counts.values()), "stages": stages}
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the counters by replaying the events; returns how many were replayed.
+
+    Applications without any events first get a creation event at their
+    applied date.
+    """
+    event = models.JobApplicationEvent
+    application = models.JobApplication
+    for model in (models.ApplicationStageCount, models.ApplicationStageDuration):
+        delete = db.query(model)
+        if user_id is not None:
+            delete = delete.filter(model.user_id == user_id)
+        delete.delete(synchronize_session=False)
+
+    missing = select(
+        application.id, application.user_id, null(),
+        func.coalesce(application.status, literal(DEFAULT_STATUS)), application.applied_date,
+    ).where(~exists().where(event.application_id == application.id), application.user_id.is_not(None))
+    if user_id is not None:
+        missing = missing.where(application.user_id == user_id)
+    db.execute(insert(event).from_select(["application_id", "user_id", "from_status", "to_status", "created_at"], missing))
+
+    query = select(event.application_id, event.user_id, event.to_status, event.created_at)
+    if user_id is not None:
+        query = query.where(event.user_id == user_id)
+    query = query.order_by(event.application_id, event.id).execution_options(yield_per=REBUILD_FETCH_SIZE)
+
+    counts, durations = Counter(), Counter()
+    replayed, last = 0, None # last: (application_id, user_id, status, entered_at, reached)
+    for application_id, owner_id, status, created_at in db.execute(query):
+        created_at = _utc(created_at)
+        if last is not None and last[0] == application_id:
+            _, _, previous, entered_at, reached = last
+            if entered_at is not None and created_at is not None:
+                hours = max((created_at - entered_at).total_seconds(), 0) / 3600
+                durations[(owner_id, previous, duration_bucket(hours))] += 1
+        else:
+            if last is not None:
+                counts[(last[1], last[2], "current")] += 1
+            reached = set()
+        for stage in implied_stages(status) - reached:
+            counts[(owner_id, stage, "reached")] += 1
+        reached |= implied_stages(status)
+        last = (application_id, owner_id, status, created_at, reached)
+        replayed += 1
+    if last is not None:
+        counts[(last[1], last[2], "current")] += 1
+
+    rows = {}
+    for (owner_id, stage, kind), count in counts.items():
+        rows.setdefault((owner_id, stage), {"user_id": owner_id, "stage": stage, "current": 0, "reached": 0})[kind] = count
+    if rows:
+        db.execute(insert(models.ApplicationStageCount), list(rows.values()))
+    if durations:
+        db.execute(insert(models.ApplicationStageDuration), [
+            {"user_id": owner_id, "stage": stage, "bucket": bucket, "count": count}
+            for (owner_id, stage, bucket), count in durations.items()
+        ])
+    db.commit()
+    return replayed
+
+
+def backfill_if_empty(db: Session):
+    """Populate the events and counters for databases that predate them"""
+    has_events = db.query(models.JobApplicationEvent.id).first() is not None
+    if not has_events and db.query(models.JobApplication.id).first() is not None:
+        rebuild(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain job application funnel counters")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    migrate.upgrade(backfill=False)
+    db = database.SessionLocal()
+    try:
+        events = rebuild(db, args.user_id)
+    finally:
+        db.close()
+    print(f"Replayed {events} application events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Partial career profile updates with optimistic concurrency.
+
+`PATCH /career/profile` takes either a JSON Merge Patch (RFC 7396,
+application/merge-patch+json, also the default for plain JSON) or a JSON
+Patch (RFC 6902, application/json-patch+json) against the profile document
+{headline, skills, experience, education,
+searchable}. Only fields whose value actually
+changes are assigned, so the UPDATE writes just those columns and an
+unchanged autosave writes nothing.
+
+CareerProfile.version is the mapper's version counter: every UPDATE is
+conditional on the version that was read, and the ETag is built from it.
+"""
+import copy
+import json
+from datetime import datetime, timezone
+from typing import Any, Optional
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from . import models, schemas, career_search
+
+MERGE_PATCH = "application/merge-patch+json"
+JSON_PATCH = "application/json-patch+json"
+# Plain JSON, or no Content-Type at all, is read as a merge patch
+PATCH_TYPES = frozenset((MERGE_PATCH, JSON_PATCH, "application/json", ""))
+
+FIELDS = ("headline", "skills", "experience", "education", "searchable")
+# Fields career search reads; education-only edits skip the reindex
+INDEXED_FIELDS = frozenset(("headline", "skills", "experience", "searchable"))
+
+
+class PatchError(ValueError):
+    """A patch that cannot be applied: 422 malformed, 409 conflicts with the profile, 415 unknown type"""
+
+    def __init__(self, detail: Any, status_code: int = 422):
+        super().__init__(str(detail))
+        self.detail = detail
+        self.status_code = status_code
+
+
+def etag(profile: models.CareerProfile) -> str:
+    return f'"{profile.id}-{profile.version}"'
+
+
+def document(profile: models.CareerProfile) -> dict:
+    return {
+        "headline": profile.headline,
+        "skills": profile.skills or [],
+        "experience": profile.experience or [],
+        "education": profile.education or [],
+        "searchable": bool(profile.searchable),
+    }
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """RFC 7396: objects merge recursively, null removes a member, anything else replaces"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _pointer(path) -> list:
+    if not isinstance(path, str) or (path and not path.startswith("/")):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path.split("/")[1:]]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {index}", 409)
+    return index
+
+
+def _parent(doc, tokens: list):
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, list):
+            node = node[_index(node, token)]
+        elif isinstance(node, dict) and token in node:
+            node = node[token]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}", 409)
+    return node
+
+
+def _get(doc, tokens: list):
+    if not tokens:
+        return doc
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        return parent[_index(parent, token)]
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    raise PatchError(f"Path not found: /{'/'.join(tokens)}", 409)
+
+
+def _remove(doc, tokens: list):
+    value = _get(doc, tokens)
+    parent = _parent(doc, tokens)
+    if isinstance(parent, list):
+        del parent[_index(parent, tokens[-1])]
+    else:
+        del parent[tokens[-1]]
+    return value
+
+
+def _add(doc, tokens: list, value):
+    if not tokens:
+        return value
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise PatchError(f"Path not found: /{'/'.join(tokens)}", 409)
+    return doc
+
+
+def json_patch(doc: Any, operations: Any) -> Any:
+    """RFC 6902 add/remove/replace/move/copy/test; all or nothing"""
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch is an array of operations")
+    doc = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict) or "path" not in operation:
+            raise PatchError(f"Invalid operation: {operation!r}")
+        op, path = operation.get("op"), _pointer(operation["path"])
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"{op} needs a value")
+        if op == "add":
+            doc = _add(doc, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(doc, path)
+        elif op == "replace":
+            _get(doc, path)
+            if path:
+                _remove(doc, path)
+            doc = _add(doc, path, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            source = _pointer(operation.get("from"))
+            if op == "move" and path[:len(source)] == source and path != source:
+                raise PatchError("Cannot move a value into itself")
+            value = _remove(doc, source) if op == "move" else copy.deepcopy(_get(doc, source))
+            doc = _add(doc, path, value)
+        elif op == "test":
+            if _get(doc, path) != operation["value"]:
+                raise PatchError(f"Test failed at {operation['path']}", 409)
+        else:
+            raise PatchError(f"Unsupported op: {op!r}")
+    return doc
+
+
+def parse(content_type: Optional[str], body: bytes):
+    """(media type, decoded patch); the type is checked before the body is parsed"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in PATCH_TYPES:
+        raise PatchError(f"Unsupported patch type: {media_type}", 415)
+    try:
+        return media_type, json.loads(body)
+    except ValueError as exc:
+        raise PatchError(f"Malformed JSON: {exc}") from exc
+
+
+def apply(profile: models.CareerProfile, media_type: str, patch: Any) -> dict:
+    """The profile document after `patch`, validated like a PUT body"""
+    current = document(profile)
+    if media_type == JSON_PATCH:
+        patched = json_patch(current, patch)
+    else:
+        if not isinstance(patch, dict):
+            raise PatchError("A merge patch is a JSON object")
+        patched = merge_patch(current, patch)
+    if not isinstance(patched, dict):
+        raise PatchError("The patched profile must be an object")
+    unknown = set(patched) - set(FIELDS)
+    if unknown:
+        raise PatchError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+    try:
+        return schemas.CareerProfileCreate.model_validate(patched).model_dump()
+    except ValidationError as exc:
+        raise PatchError(exc.errors(include_url=False, include_context=False)) from exc
+
+
+def save(db: Session, profile: models.CareerProfile, data: dict) -> bool:
+    """Assign the fields of `data` that differ and reindex if search reads them.
+
+    Flushes, so a concurrent edit raises StaleDataError here or at commit.
+    Returns False when nothing changed and nothing was written.
+    """
+    current = document(profile)
+    changed = {field for field in FIELDS if field in data and data[field] != current[field]}
+    if not changed:
+        return False
+    for field in changed:
+        setattr(profile, field, data[field])
+    # Set here rather than by onupdate, so the response needs no reload
+    profile.updated_at = datetime.now(timezone.utc)
+    if changed & INDEXED_FIELDS:
+        career_search.index_profile(db, profile)
+    else:
+        db.flush()
+    return True
@@ -0,0 +1,160 @@
+"""Query budgets and N+1 detection for development and tests.
+
+With QUERY_BUDGET_MODE=warn (or raise) every request counts its SQL
+statements. It is flagged when it issues more than its endpoint's budget
+(QUERY_BUDGET, or the limit given with @query_budget) or when the same
+statement shape runs N_PLUS_ONE_THRESHOLD times, the usual sign of a lazy
+load per row. INSERTs are exempt from the repeat check, and a batch that
+insertmanyvalues sends in several chunks counts once. "warn" logs the
+problem; "raise" fails the statement with QueryBudgetExceeded so tests
+notice. Off by default, in which case nothing is installed.
+"""
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from . import database
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off") # off | warn | raise
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+# Expanded IN lists differ only in their placeholder count
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)*\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit: int):
+    """Set the statement budget for one endpoint (place under the route decorator)"""
+    def decorator(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+    return decorator
+
+
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(...)", " ".join(statement.split()))
+
+
+def counts_toward_n_plus_one(shape: str) -> bool:
+    # A flush of many new rows repeats its INSERT; that is a batch, not a lazy load
+    return not shape.startswith("INSERT")
+
+
+class QueryTracker:
+    def __init__(self, scope):
+        self.scope = scope
+        self.count = 0
+        self.shapes = Counter()
+        self.context = None
+
+    @property
+    def route(self) -> str:
+        return getattr(self.scope.get("route"), "path", None) or self.scope.get("path", "?")
+
+    @property
+    def budget(self) -> int:
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        return getattr(endpoint, "query_budget", QUERY_BUDGET)
+
+    def record(self, statement: str, context=None):
+        # insertmanyvalues runs one executemany() as several cursor executions
+        # sharing a context; they are one statement
+        if context is not None and context is self.context:
+            return
+        self.context = context
+        self.count += 1
+        shape = statement_shape(statement)
+        if counts_toward_n_plus_one(shape):
+            self.shapes[shape] += 1
+        # Report each problem once, when its threshold is crossed
+        if self.count == self.budget + 1:
+            report(f"{self.scope['method']} {self.route} exceeded its budget of {self.budget} queries")
+        if self.shapes[shape] == N_PLUS_ONE_THRESHOLD:
+            report(
+                f"{self.scope['method']} {self.route} ran the same statement {N_PLUS_ONE_THRESHOLD} times "
+                f"(possible N+1): {shape[:300]}"
+            )
+
+
+current_tracker: ContextVar[Optional[QueryTracker]] = ContextVar("current_tracker", default=None)
+
+
+def report(message: str):
+    if QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement, context)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_tracker.set(QueryTracker(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tracker.reset(token)
+
+
+def install(app):
+    """Track every request on `app` (sync and, if enabled, async engine)"""
+    engines = [database.engine]
+    if database.ASYNC_ENABLED:
+        engines.append(database.get_async_engine().sync_engine)
+    for engine in engines:
+        if not event.contains(engine, "after_cursor_execute", _after_execute):
+            event.listen(engine, "after_cursor_execute", _after_execute)
+    app.add_middleware(QueryBudgetMiddleware)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict:
+        shapes = Counter(statement_shape(s) for s in self.statements)
+        return {shape: n for shape, n in shapes.items() if n >= threshold and counts_toward_n_plus_one(shape)}
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Collect every statement run on `engine` inside the block, from any thread"""
+    engine = engine if engine is not None else database.engine
+    counter = QueryCounter()
+    last = [None]  # context of the previous statement, to count an insertmanyvalues batch once
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and context is last[0]:
+            return
+        last[0] = context
+        counter.statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", collect)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "after_cursor_execute", collect)
@@ -0,0 +1,256 @@
+"""Request rate limiting.
+
+RateLimitMiddleware applies token buckets per client IP and, for requests
+with a valid bearer token, per user. Limits are configured per path prefix
+(the longest matching prefix wins for each scope) and reported with the
+RateLimit-Limit / -Remaining / -Reset headers.
+
+Buckets live in a store. MemoryStore keeps them in process as one small entry
+per active key, dropped once the bucket has refilled; a shared backend only
+needs the same async ``hit`` method.
+"""
+import json
+import math
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from . import auth
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Only behind a proxy that sets X-Forwarded-For; otherwise clients can spoof it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW_SECONDS = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "900"))
+
+EXEMPT_PREFIXES = ("/health", "/metrics")
+
+RESPONSE_HEADERS = ["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"]
+
+
+class Rule:
+    """`limit` requests per `window` seconds for each IP or user under `prefix`"""
+
+    def __init__(self, prefix: str, limit: int, window: float, scope: str = "ip", methods=None):
+        if scope not in ("ip", "user"):
+            raise ValueError(f"Unknown rate limit scope: {scope}")
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self.scope = scope
+        self.methods = {m.upper() for m in methods} if methods else None
+
+    def matches(self, path: str, method: str) -> bool:
+        return path.startswith(self.prefix) and (self.methods is None or method in self.methods)
+
+    def key(self, identity) -> str:
+        methods = ",".join(sorted(self.methods)) if self.methods else "*"
+        return f"{self.scope}:{methods}:{self.prefix}:{identity}"
+
+
+DEFAULT_RULES = [
+    Rule("/", 1200, 60, scope="ip"),
+    Rule("/", 600, 60, scope="user"),
+    # Argon2 endpoints are the expensive ones
+    Rule("/auth/login", 10, 60, scope="ip", methods=["POST"]),
+    Rule("/auth/register", 5, 60, scope="ip", methods=["POST"]),
+    Rule("/auth/me/password", 5, 60, scope="user", methods=["POST"]),
+    Rule("/auth/refresh", 30, 60, scope="ip", methods=["POST"]),
+    # Public survey submissions
+    Rule("/surveys", 60, 60, scope="ip", methods=["POST"]),
+]
+
+
+def load_rules() -> list:
+    """DEFAULT_RULES, or RATE_LIMIT_RULES as a JSON list of Rule keyword arguments"""
+    raw = os.getenv("RATE_LIMIT_RULES")
+    if not raw:
+        return list(DEFAULT_RULES)
+    return [Rule(**rule) for rule in json.loads(raw)]
+
+
+class MemoryStore:
+    """In-process token buckets: key -> (tokens, updated_at, full_at)"""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float, cost: int = 1):
+        """Take `cost` tokens; return (allowed, remaining, reset_seconds).
+
+        cost=0 only checks whether a request would be allowed.
+        """
+        now = time.monotonic()
+        rate = limit / window
+        entry = self._buckets.get(key)
+        if entry is None:
+            if cost == 0:
+                return True, limit, 0
+            tokens = float(limit)
+        else:
+            tokens = min(float(limit), entry[0] + (now - entry[1]) * rate)
+
+        allowed = tokens >= max(cost, 1)
+        if allowed:
+            tokens -= cost
+        if cost or entry is not None:
+            self._buckets[key] = (tokens, now, now + (limit - tokens) / rate)
+            self._buckets.move_to_end(key)
+            self._evict(now)
+        reset = (limit - tokens) / rate if allowed else (1 - tokens) / rate
+        return allowed, int(tokens), math.ceil(reset)
+
+    def _evict(self, now: float):
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        # A bucket that has refilled is equivalent to no bucket; checking the
+        # least recently used end keeps this O(1) amortized
+        while self._buckets:
+            _, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now:
+                break
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+store = MemoryStore()
+limited = Counter() # Rejected requests by rule prefix
+
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user_identity(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                # Served from the verified-token cache after the first request
+                claims = auth.decode_token(token)
+            except Exception:
+                return None
+            uid = claims.get("uid")
+            return str(uid) if uid is not None else claims.get("sub")
+    return None
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, rules: Optional[list] = None, store=store, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.store = store
+        self.enabled = enabled
+        # Longest prefix first, so the first match per scope is the most specific
+        self.rules = sorted(load_rules() if rules is None else rules, key=lambda r: len(r.prefix), reverse=True)
+
+    def _rules_for(self, path: str, method: str) -> list:
+        chosen = {}
+        for rule in self.rules:
+            if rule.scope not in chosen and rule.matches(path, method):
+                chosen[rule.scope] = rule
+        return list(chosen.values())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        rules = self._rules_for(scope["path"], scope["method"])
+        identities = {}
+        if any(rule.scope == "ip" for rule in rules):
+            identities["ip"] = client_ip(scope)
+        if any(rule.scope == "user" for rule in rules):
+            identities["user"] = _user_identity(scope)
+
+        tightest = None
+        for rule in rules:
+            identity = identities.get(rule.scope)
+            if identity is None:
+                continue
+            allowed, remaining, reset = await self.store.hit(rule.key(identity), rule.limit, rule.window)
+            result = (allowed, remaining, rule.limit, reset, rule)
+            if tightest is None or (allowed, remaining) < (tightest[0], tightest[1]):
+                tightest = result
+            if not allowed:
+                break
+
+        if tightest is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, remaining, limit, reset, rule = tightest
+        headers = {
+            "RateLimit-Limit": str(limit),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(reset),
+        }
+        if not allowed:
+            limited[rule.prefix] += 1
+            headers["Retry-After"] = str(reset)
+            response = JSONResponse({"detail": "Too many requests"}, status_code=429, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class LoginThrottle:
+    """Blocks an identifier after LOGIN_MAX_FAILURES failed logins per window.
+
+    Keyed by identifier and client IP, so guessing from one address is slowed
+    without letting anyone lock a user out from elsewhere.
+    """
+
+    def __init__(
+        self,
+        store=store,
+        max_failures: int = LOGIN_MAX_FAILURES,
+        window: float = LOGIN_FAILURE_WINDOW_SECONDS,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.store = store
+        self.max_failures = max_failures
+        self.window = window
+        self.enabled = enabled
+
+    def _key(self, identifier: str, ip: str) -> str:
+        return f"login:{ip}:{identifier.strip().lower()}"
+
+    async def check(self, identifier: str, ip: str):
+        if not self.enabled:
+            return
+        allowed, _, reset = await self.store.hit(self._key(identifier, ip), self.max_failures, self.window, cost=0)
+        if not allowed:
+            limited["login"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many failed login attempts, retry later",
+                headers={"Retry-After": str(reset)},
+            )
+
+    async def failed(self, identifier: str, ip: str):
+        if self.enabled:
+            await self.store.hit(self._key(identifier, ip), self.max_failures, self.window)
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,147 @@
+"""Per-user monthly expense rollups.
+
+`expense_rollups` holds one row per (user, month, category, is_income) with the
+summed amount and row count. The accounting handlers apply deltas in the same
+transaction as the expense write, so `/accounting/summary` reads a handful of
+rollup rows instead of every expense.
+
+Backfill or repair with:
+
+    python -m server.rollups rebuild [--user-id ID]
+"""
+import argparse
+from typing import Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from . import models, database, migrate
+
+
+def month_key(value) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def apply_expense(db: Session, expense: models.Expense, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) an expense's contribution to its rollup row"""
+    if expense.date is None or expense.amount is None:
+        return
+    database.increment(
+        db,
+        models.ExpenseRollup,
+        {
+            "user_id": expense.user_id,
+            "month": month_key(expense.date),
+            "category_id": expense.category_id,
+            "is_income": bool(expense.is_income),
+        },
+        total=sign * expense.amount,
+        count=sign,
+    )
+
+
+def summarize(
+    db: Session,
+    user_id: int,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    by_category: bool = False,
+) -> dict:
+    """Income/expense totals (in currency units) over an inclusive YYYY-MM range"""
+    rollup = models.ExpenseRollup
+    filters = [rollup.user_id == user_id]
+    if from_month:
+        filters.append(rollup.month >= from_month)
+    if to_month:
+        filters.append(rollup.month <= to_month)
+
+    group_by = [rollup.is_income]
+    if by_category:
+        group_by.insert(0, rollup.category_id)
+    rows = db.execute(
+        select(*group_by, func.sum(rollup.total)).where(*filters).group_by(*group_by)
+    ).all()
+
+    income = expense = 0
+    categories = {}
+    for row in rows:
+        *key, total = row
+        is_income = key[-1]
+        total = total or 0
+        if is_income:
+            income += total
+        else:
+            expense += total
+        if by_category:
+            entry = categories.setdefault(key[0], {"category_id": key[0], "income": 0.0, "expense": 0.0})
+            entry["income" if is_income else "expense"] += total / 100.0
+
+    summary = {
+        "income": income / 100.0,
+        "expense": expense / 100.0,
+        "balance": (income - expense) / 100.0,
+    }
+    if by_category:
+        summary["categories"] = list(categories.values())
+    return summary
+
+
+def _month_expr(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+
+def rebuild_expense_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from the expenses table with one INSERT ... SELECT"""
+    expense = models.Expense
+    rollup = models.ExpenseRollup
+    delete = db.query(rollup)
+    if user_id is not None:
+        delete = delete.filter(rollup.user_id == user_id)
+    delete.delete(synchronize_session=False)
+
+    month = _month_expr(db, expense.date)
+    source = select(
+        expense.user_id,
+        month,
+        expense.category_id,
+        func.coalesce(expense.is_income, False),
+        func.sum(expense.amount),
+        func.count(expense.id),
+    ).where(expense.date.is_not(None))
+    if user_id is not None:
+        source = source.where(expense.user_id == user_id)
+    source = source.group_by(expense.user_id, month, expense.category_id, func.coalesce(expense.is_income, False))
+
+    result = db.execute(
+        insert(rollup).from_select(
+            ["user_id", "month", "category_id", "is_income", "total", "count"], source
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def backfill_if_empty(db: Session):
+    """Populate rollups for databases that predate the rollup table"""
+    has_rollups = db.query(models.ExpenseRollup.id).first() is not None
+    if not has_rollups and db.query(models.Expense.id).first() is not None:
+        rebuild_expense_rollups(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain expense rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    migrate.upgrade(backfill=False)
+    db = database.SessionLocal()
+    try:
+        rows = rebuild_expense_rollups(db, args.user_id)
+    finally:
+        db.close()
+    print(f"Rebuilt {rows} rollup rows")
+
+
+if __name__ == "__main__":
+    main()
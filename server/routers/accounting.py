@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from datetime import datetime
-from .. import models, schemas, auth, database
+from .. import models, schemas, auth, database, rollups, pagination, expense_import
+from ..querybudget import query_budget
 
 router = APIRouter(
     prefix="/accounting",
@@ -32,27 +35,77 @@ def get_categories(db: Session = Depends(database.get_db)):
         cats = db.query(models.Category).all()
     return cats
 
+def expenses_query(
+    user_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    is_income: Optional[bool] = None,
+):
+    """Newest-first page of a user's expenses, keyset-paginated on (date, id).
+
+    Fetches one row past `limit` so the caller can tell whether a next page exists.
+    """
+    expense = models.Expense
+    query = (
+        select(expense)
+        .options(joinedload(expense.category))
+        .where(expense.user_id == user_id)
+        .order_by(expense.date.desc(), expense.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        last_date, last_id = pagination.decode_cursor(cursor)
+        query = query.where(or_(
+            expense.date < last_date,
+            and_(expense.date == last_date, expense.id < last_id),
+        ))
+    if date_from is not None:
+        query = query.where(expense.date >= date_from)
+    if date_to is not None:
+        query = query.where(expense.date <= date_to)
+    if category_id is not None:
+        query = query.where(expense.category_id == category_id)
+    if is_income is not None:
+        query = query.where(expense.is_income == is_income)
+    return query
+
+def paginate_expenses(rows, limit: int, response: Response):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(last.date, last.id)
+    return rows
+
 @router.get("/expenses", response_model=List[schemas.Expense])
+@query_budget(3)
 def get_expenses(
-    current_user: dict = Depends(auth.get_current_user),
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    category_id: Optional[int] = None,
+    is_income: Optional[bool] = None,
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    return db.query(models.Expense).filter(models.Expense.user_id == user.id).order_by(models.Expense.date.desc()).all()
+    query = expenses_query(current_user["id"], limit, cursor, date_from, date_to, category_id, is_income)
+    return paginate_expenses(db.execute(query).scalars().all(), limit, response)
 
 @router.post("/expenses", response_model=schemas.Expense)
 def create_expense(
     expense: schemas.ExpenseCreate,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    
     # Store amount in cents if receiving float dollars (handled in frontend usually, but good to be consistent)
     # Here we assume schema input is direct amount
     
     db_expense = models.Expense(
-        user_id=user.id,
+        user_id=current_user["id"],
         category_id=expense.category_id,
         amount=int(expense.amount * 100), # Convert to cents
         description=expense.description,
@@ -60,49 +113,66 @@ def create_expense(
         is_income=expense.is_income
     )
     db.add(db_expense)
+    rollups.apply_expense(db, db_expense)
     db.commit()
     db.refresh(db_expense)
     return db_expense
 
+@router.post("/expenses/bulk", response_model=schemas.ExpenseImportResult)
+async def bulk_import_expenses(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Stream-import expenses from a CSV or NDJSON body.
+
+    Rows are committed in chunks; invalid rows are reported, not fatal.
+    Retrying with the same Idempotency-Key resumes after the last committed
+    chunk, and replays the stored result once the import has completed. A
+    retry that arrives while the import is still running gets 409.
+    """
+    fmt = expense_import.detect_format(request.headers.get("content-type"))
+    record, token = await run_in_threadpool(expense_import.open_import, db, current_user["id"], idempotency_key)
+    if token is None:
+        return expense_import.result(record, replayed=True)
+    return await expense_import.run_import(db, record, token, request.stream(), fmt)
+
 @router.get("/summary")
+@query_budget(3)
 def get_summary(
-    current_user: dict = Depends(auth.get_current_user),
+    from_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="First month (YYYY-MM), inclusive"),
+    to_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Last month (YYYY-MM), inclusive"),
+    by_category: bool = False,
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    expenses = db.query(models.Expense).filter(models.Expense.user_id == user.id).all()
-    
-    total_income = sum(e.amount for e in expenses if e.is_income) / 100.0
-    total_expense = sum(e.amount for e in expenses if not e.is_income) / 100.0
-    balance = total_income - total_expense
-    
-    return {
-        "income": total_income,
-        "expense": total_expense,
-        "balance": balance
-    }
+    # Served from the per-month rollups rather than the expense rows
+    return rollups.summarize(db, current_user["id"], from_month, to_month, by_category)
+
 @router.patch("/expenses/{expense_id}", response_model=schemas.Expense)
 def update_expense(
     expense_id: int,
     expense_update: schemas.ExpenseCreate,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
     expense = db.query(models.Expense).filter(
         models.Expense.id == expense_id,
-        models.Expense.user_id == user.id
+        models.Expense.user_id == current_user["id"]
     ).first()
     
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
-    # Update expense fields
+    # Update expense fields, moving its contribution between rollup rows
+    rollups.apply_expense(db, expense, -1)
     expense.category_id = expense_update.category_id
     expense.amount = int(expense_update.amount * 100)
     expense.description = expense_update.description
     expense.date = expense_update.date
     expense.is_income = expense_update.is_income
+    rollups.apply_expense(db, expense)
     
     db.commit()
     db.refresh(expense)
@@ -111,18 +181,18 @@ def update_expense(
 @router.delete("/expenses/{expense_id}")
 def delete_expense(
     expense_id: int,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
     expense = db.query(models.Expense).filter(
         models.Expense.id == expense_id,
-        models.Expense.user_id == user.id
+        models.Expense.user_id == current_user["id"]
     ).first()
     
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    rollups.apply_expense(db, expense, -1)
     db.delete(expense)
     db.commit()
     
@@ -0,0 +1,22 @@
+# Async variants of the CRUD routers, mounted ahead of the sync ones when
+# DATABASE_ASYNC=1. Routes without an async variant fall through to the
+# sync routers registered after them.
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from ... import models, auth, database
+
+async def get_current_active_user(
+    current_user: dict = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Async counterpart of auth.get_current_active_user, sharing its identity cache"""
+    key = auth.identity_key(current_user)
+    identity = auth.identity_cache.get(key)
+    if identity is None:
+        if current_user["id"] is not None:
+            user = await db.get(models.User, current_user["id"])
+        else:
+            # Same normalizing lookup as the sync path, so a token resolves alike in both
+            user = await db.run_sync(auth.find_user_by_identifier, key)
+        identity = auth.cache_identity(key, user)
+    return identity
@@ -0,0 +1,131 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import datetime
+from ... import models, schemas, database, rollups
+from . import get_current_active_user
+from ..accounting import expenses_query, paginate_expenses
+
+router = APIRouter(
+    prefix="/accounting",
+    tags=["accounting"],
+)
+
+DEFAULT_CATEGORIES = [
+    {"name": "Food", "icon": "Utensils"},
+    {"name": "Transport", "icon": "Car"},
+    {"name": "Housing", "icon": "Home"},
+    {"name": "Salary", "icon": "Banknote"},
+    {"name": "Entertainment", "icon": "Film"},
+    {"name": "Utilities", "icon": "Zap"},
+    {"name": "Shopping", "icon": "ShoppingBag"},
+    {"name": "Health", "icon": "Heart"},
+    {"name": "Other", "icon": "MoreHorizontal"},
+]
+
+async def _get_user_expense(db: AsyncSession, expense_id: int, user_id: int):
+    # The response model nests `category`; lazy loads are not possible on an
+    # AsyncSession, so it is always loaded eagerly.
+    result = await db.execute(
+        select(models.Expense)
+        .options(selectinload(models.Expense.category))
+        .where(models.Expense.id == expense_id, models.Expense.user_id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+@router.get("/categories", response_model=List[schemas.Category])
+async def get_categories(db: AsyncSession = Depends(database.get_async_db)):
+    cats = (await db.execute(select(models.Category))).scalars().all()
+    # Seed default categories if empty
+    if not cats:
+        db.add_all([models.Category(name=c["name"], icon=c["icon"]) for c in DEFAULT_CATEGORIES])
+        await db.commit()
+        cats = (await db.execute(select(models.Category))).scalars().all()
+    return cats
+
+@router.get("/expenses", response_model=List[schemas.Expense])
+async def get_expenses(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    category_id: Optional[int] = None,
+    is_income: Optional[bool] = None,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    query = expenses_query(current_user["id"], limit, cursor, date_from, date_to, category_id, is_income)
+    return paginate_expenses((await db.execute(query)).scalars().all(), limit, response)
+
+@router.post("/expenses", response_model=schemas.Expense)
+async def create_expense(
+    expense: schemas.ExpenseCreate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    db_expense = models.Expense(
+        user_id=current_user["id"],
+        category_id=expense.category_id,
+        amount=int(expense.amount * 100), # Convert to cents
+        description=expense.description,
+        date=expense.date,
+        is_income=expense.is_income
+    )
+    db.add(db_expense)
+    await db.run_sync(lambda session: rollups.apply_expense(session, db_expense))
+    await db.commit()
+    return await _get_user_expense(db, db_expense.id, current_user["id"])
+
+@router.get("/summary")
+async def get_summary(
+    from_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    to_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    by_category: bool = False,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    return await db.run_sync(
+        lambda session: rollups.summarize(session, current_user["id"], from_month, to_month, by_category)
+    )
+
+@router.patch("/expenses/{expense_id}", response_model=schemas.Expense)
+async def update_expense(
+    expense_id: int,
+    expense_update: schemas.ExpenseCreate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    expense = await _get_user_expense(db, expense_id, current_user["id"])
+    if not expense:
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+    await db.run_sync(lambda session: rollups.apply_expense(session, expense, -1))
+    expense.category_id = expense_update.category_id
+    expense.amount = int(expense_update.amount * 100)
+    expense.description = expense_update.description
+    expense.date = expense_update.date
+    expense.is_income = expense_update.is_income
+    await db.run_sync(lambda session: rollups.apply_expense(session, expense))
+
+    await db.commit()
+    return await _get_user_expense(db, expense_id, current_user["id"])
+
+@router.delete("/expenses/{expense_id}")
+async def delete_expense(
+    expense_id: int,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    expense = await _get_user_expense(db, expense_id, current_user["id"])
+    if not expense:
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+    await db.run_sync(lambda session: rollups.apply_expense(session, expense, -1))
+    await db.delete(expense)
+    await db.commit()
+
+    return {"message": "Expense deleted successfully"}
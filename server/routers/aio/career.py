@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Any, List, Optional, Tuple
+from ... import models, schemas, database, profile_patch, http_cache, pipeline
+from . import get_current_active_user
+from ..career import PATCH_OPENAPI, read_patch
+
+router = APIRouter(
+    prefix="/career",
+    tags=["career"],
+)
+
+async def _get_profile(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.CareerProfile).where(models.CareerProfile.user_id == user_id)
+    )
+    return result.scalars().first()
+
+async def _load_profile(db: AsyncSession, user_id: int):
+    profile = await _get_profile(db, user_id)
+    if not profile:
+        # Create empty profile if none exists
+        profile = models.CareerProfile(user_id=user_id, skills=[], experience=[], education=[])
+        db.add(profile)
+        await db.commit()
+        await db.refresh(profile)
+    return profile
+
+async def _save(db: AsyncSession, profile, data: dict, if_match: Optional[str], response: Response):
+    if http_cache.if_match_fails(if_match, profile_patch.etag(profile)):
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Profile has changed; fetch it again")
+    try:
+        await db.run_sync(lambda session: profile_patch.save(session, profile, data))
+        await db.commit()
+    except StaleDataError:
+        # Another request updated the profile since it was read
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Profile has changed; fetch it again")
+    response.headers["ETag"] = profile_patch.etag(profile)
+    return profile
+
+@router.get("/profile", response_model=schemas.CareerProfile)
+async def get_profile(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    profile = await _load_profile(db, current_user["id"])
+    etag = profile_patch.etag(profile)
+    if http_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return profile
+
+@router.put("/profile", response_model=schemas.CareerProfile)
+async def update_profile(
+    profile_data: schemas.CareerProfileCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    profile = await _load_profile(db, current_user["id"])
+    return await _save(db, profile, profile_data.model_dump(), if_match, response)
+
+@router.patch("/profile", response_model=schemas.CareerProfile, openapi_extra=PATCH_OPENAPI)
+async def patch_profile(
+    response: Response,
+    patch: Tuple[str, Any] = Depends(read_patch),
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    profile = await _load_profile(db, current_user["id"])
+    try:
+        data = profile_patch.apply(profile, *patch)
+    except profile_patch.PatchError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    return await _save(db, profile, data, if_match, response)
+
+@router.get("/applications", response_model=List[schemas.JobApplication])
+async def get_applications(
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    result = await db.execute(
+        select(models.JobApplication)
+        .where(models.JobApplication.user_id == current_user["id"])
+        .order_by(models.JobApplication.applied_date.desc())
+    )
+    return result.scalars().all()
+
+@router.post("/applications", response_model=schemas.JobApplication)
+async def create_application(
+    app_data: schemas.JobApplicationCreate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    db_app = models.JobApplication(
+        user_id=current_user["id"],
+        company=app_data.company,
+        position=app_data.position,
+        status=app_data.status,
+        salary_range=app_data.salary_range,
+        notes=app_data.notes
+    )
+    db.add(db_app)
+    await db.run_sync(lambda session: pipeline.record_created(session, db_app))
+    await db.commit()
+    await db.refresh(db_app)
+    return db_app
+
+@router.patch("/applications/{app_id}", response_model=schemas.JobApplication)
+async def update_application_status(
+    app_id: int,
+    status: str,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    result = await db.execute(
+        select(models.JobApplication).where(
+            models.JobApplication.id == app_id,
+            models.JobApplication.user_id == current_user["id"]
+        )
+    )
+    app = result.scalars().first()
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    await db.run_sync(lambda session: pipeline.record_transition(session, app, status))
+    await db.commit()
+    await db.refresh(app)
+    return app
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ... import models, schemas, database
+from . import get_current_active_user
+from ..supply import (
+    insert_items, set_status, set_item_status, delete_items, status_counts, newest_per_status, to_buy_queue,
+    group_items, serialize,
+)
+
+router = APIRouter(
+    prefix="/supply",
+    tags=["supply"],
+)
+
+@router.get("/items", response_model=List[schemas.SupplyItem])
+async def get_items(
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    result = await db.execute(
+        select(models.SupplyItem)
+        .where(models.SupplyItem.user_id == current_user["id"])
+        .order_by(models.SupplyItem.status.desc(), models.SupplyItem.created_at.desc())
+    )
+    return result.scalars().all()
+
+@router.get("/items/grouped", response_model=List[schemas.SupplyItemGroup])
+async def get_items_grouped(
+    per_status: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    counts = (await db.execute(status_counts(current_user["id"]))).all()
+    if not counts:
+        return []
+    items = (await db.scalars(newest_per_status(current_user["id"], [status for status, _ in counts], per_status))).all()
+    return group_items(counts, items)
+
+@router.get("/items/to-buy", response_model=List[schemas.SupplyItem])
+async def get_to_buy(
+    limit: int = Query(100, ge=1, le=500),
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    return (await db.scalars(to_buy_queue(current_user["id"], limit))).all()
+
+@router.post("/items", response_model=schemas.SupplyItem)
+async def create_item(
+    item: schemas.SupplyItemCreate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    statement, rows = insert_items(current_user["id"], [item])
+    created = serialize((await db.scalars(statement, rows)).all())[0]
+    await db.commit()
+    return created
+
+@router.post("/items/batch", response_model=List[schemas.SupplyItem])
+async def create_items(
+    batch: schemas.SupplyItemBatchCreate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    statement, rows = insert_items(current_user["id"], batch.items)
+    created = serialize((await db.scalars(statement, rows)).all())
+    await db.commit()
+    return created
+
+@router.patch("/items/batch", response_model=schemas.SupplyBatchResult)
+async def update_items_status(
+    change: schemas.SupplyItemStatusUpdate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    ids = (await db.scalars(set_status(current_user["id"], change))).all()
+    await db.commit()
+    return {"count": len(ids), "ids": ids}
+
+@router.delete("/items/batch", response_model=schemas.SupplyBatchResult)
+async def delete_items_batch(
+    selection: schemas.SupplyItemSelection,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    ids = (await db.scalars(delete_items(current_user["id"], selection))).all()
+    await db.commit()
+    return {"count": len(ids), "ids": ids}
+
+@router.patch("/items/{item_id}", response_model=schemas.SupplyItem)
+async def update_item_status(
+    item_id: int,
+    status: str,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    updated = (await db.scalars(set_item_status(current_user["id"], item_id, status))).first()
+    if not updated:
+        raise HTTPException(status_code=404, detail="Item not found")
+    updated = schemas.SupplyItem.model_validate(updated)
+    await db.commit()
+    return updated
+
+@router.delete("/items/{item_id}")
+async def delete_item(
+    item_id: int,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    deleted = (await db.scalars(delete_items(current_user["id"], schemas.SupplyItemSelection(ids=[item_id])))).first()
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    await db.commit()
+    return {"ok": True}
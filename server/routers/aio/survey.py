@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ... import models, schemas, database
+from . import get_current_active_user
+
+router = APIRouter(
+    prefix="/surveys",
+    tags=["surveys"],
+)
+
+@router.post("/", response_model=schemas.Survey)
+async def create_survey(
+    survey: schemas.SurveyCreate,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    db_survey = models.Survey(
+        title=survey.title,
+        description=survey.description,
+        questions=[q.model_dump() for q in survey.questions],
+        owner_id=current_user["id"]
+    )
+    db.add(db_survey)
+    await db.commit()
+    await db.refresh(db_survey)
+    return db_survey
+
+@router.get("/", response_model=List[schemas.Survey])
+async def list_my_surveys(
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    result = await db.execute(
+        select(models.Survey).where(models.Survey.owner_id == current_user["id"])
+    )
+    return result.scalars().all()
@@ -1,26 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import Annotated
-from datetime import timedelta
-from .. import models, schemas, auth, database
+from typing import Annotated, Optional
+from starlette.concurrency import run_in_threadpool
+from .. import models, schemas, auth, database, hashing, ratelimit
 
 router = APIRouter(
     prefix="/auth",
     tags=["authentication"],
 )
 
-@router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    # Check if user exists
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    hashed_password = auth.get_password_hash(user.password)
+def _create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     db_user = models.User(
-        email=user.email,
-        phone=user.phone,
+        email=auth.normalize_email(user.email),
+        phone=auth.normalize_phone(user.phone),
         full_name=user.full_name,
         hashed_password=hashed_password
     )
@@ -29,33 +22,99 @@ def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     db.refresh(db_user)
     return db_user
 
+def _store_rehash(db: Session, user: models.User, new_hash: str):
+    user.hashed_password = new_hash
+    db.commit()
+
+# Async handlers: argon2 runs in the hashing pool and the few queries go to the
+# threadpool, so a login burst does not hold threadpool slots while hashing.
+@router.post("/register", response_model=schemas.User)
+async def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    # Check if the email or phone is taken
+    taken = await run_in_threadpool(auth.find_identifier_conflict, db, user.email, user.phone)
+    if taken:
+        raise HTTPException(status_code=400, detail=f"{taken} already registered")
+
+    hashed_password = await hashing.service.hash(user.password)
+    return await run_in_threadpool(_create_user, db, user, hashed_password)
+
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: Session = Depends(database.get_db)):
+async def login(
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: Session = Depends(database.get_db)
+):
+    ip = ratelimit.client_ip(request.scope)
+    await ratelimit.login_throttle.check(form_data.username, ip)
     # Username in form_data can be email or phone
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user:
-        # Try phone
-        user = db.query(models.User).filter(models.User.phone == form_data.username).first()
-    
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(auth.find_user_by_identifier, db, form_data.username)
+
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await hashing.service.verify(form_data.password, user.hashed_password)
+    if not valid:
+        await ratelimit.login_throttle.failed(form_data.username, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email or user.phone}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    if new_hash:
+        # Argon2 parameters changed since this hash was made
+        await run_in_threadpool(_store_rehash, db, user, new_hash)
+
+    return await run_in_threadpool(auth.issue_tokens, db, user)
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh(body: schemas.RefreshRequest, db: Session = Depends(database.get_db)):
+    """Trade a refresh token for a new access/refresh pair without re-entering the password"""
+    return auth.rotate_refresh_token(db, body.refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[schemas.RefreshRequest] = None,
+    token: str = Depends(auth.oauth2_scheme),
+    current_user: dict = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Revoke the bearer token used for this request and, if given, its refresh token"""
+    auth.revoke_token(token)
+    if body is not None and current_user["id"] is not None:
+        auth.revoke_refresh_token_family(db, body.refresh_token, current_user["id"])
+
+def _store_password(db: Session, user_id: int, hashed_password: str):
+    user = db.get(models.User, user_id)
+    user.hashed_password = hashed_password
+    auth.revoke_refresh_tokens(db, user_id=user_id)
+    db.commit()
+    return user
+
+@router.post("/me/password", response_model=schemas.Token)
+async def change_password(
+    password_change: schemas.PasswordChange,
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Change the password, revoke every token issued so far and return a fresh pair"""
+    user = await run_in_threadpool(db.get, models.User, current_user["id"])
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    valid, _ = await hashing.service.verify(password_change.current_password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Current password is incorrect")
+
+    hashed_password = await hashing.service.hash(password_change.new_password)
+    user = await run_in_threadpool(_store_password, db, user.id, hashed_password)
+    auth.revoke_user_tokens(user.id)
+    return await run_in_threadpool(auth.issue_tokens, db, user)
+
 @router.get("/me", response_model=schemas.User)
 def get_current_user_info(
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
     """Get current authenticated user's information"""
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
+    user = db.get(models.User, current_user["id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -63,27 +122,26 @@ def get_current_user_info(
 @router.patch("/me", response_model=schemas.User)
 def update_current_user(
     user_update: schemas.UserUpdate,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
     """Update current user's information"""
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
+    user = db.get(models.User, current_user["id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    # Evict under the old email/phone too, since legacy tokens are keyed by subject
+    auth.invalidate_identity(user)
     
     # Only update provided fields
     if user_update.full_name:
         user.full_name = user_update.full_name
     if user_update.phone:
         # Check if phone is already taken
-        existing = db.query(models.User).filter(
-            models.User.phone == user_update.phone,
-            models.User.id != user.id
-        ).first()
-        if existing:
+        if auth.find_identifier_conflict(db, None, user_update.phone, exclude_id=user.id):
             raise HTTPException(status_code=400, detail="Phone already registered")
-        user.phone = user_update.phone
+        user.phone = auth.normalize_phone(user_update.phone)
     
     db.commit()
     db.refresh(user)
+    auth.invalidate_identity(user)
     return user
\ No newline at end of file
@@ -1,66 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, auth, database
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Any, List, Optional, Tuple
+from .. import models, schemas, auth, database, career_search, profile_patch, http_cache, pipeline
+from ..querybudget import query_budget
 
 router = APIRouter(
     prefix="/career",
     tags=["career"],
 )
 
-@router.get("/profile", response_model=schemas.CareerProfile)
-def get_profile(
-    current_user: dict = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
-):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    profile = db.query(models.CareerProfile).filter(models.CareerProfile.user_id == user.id).first()
+def _load_profile(db: Session, user_id: int) -> models.CareerProfile:
+    profile = db.query(models.CareerProfile).filter(models.CareerProfile.user_id == user_id).first()
     if not profile:
         # Create empty profile if none exists
-        profile = models.CareerProfile(user_id=user.id, skills=[], experience=[], education=[])
+        profile = models.CareerProfile(user_id=user_id, skills=[], experience=[], education=[])
         db.add(profile)
         db.commit()
         db.refresh(profile)
     return profile
 
+def _save(db: Session, profile: models.CareerProfile, data: dict, if_match: Optional[str], response: Response):
+    if http_cache.if_match_fails(if_match, profile_patch.etag(profile)):
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Profile has changed; fetch it again")
+    try:
+        profile_patch.save(db, profile, data)
+        # Serialized before commit, which would expire the instance and cost a reload
+        body = schemas.CareerProfile.model_validate(profile)
+        db.commit()
+    except StaleDataError:
+        # Another request updated the profile since it was read
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Profile has changed; fetch it again")
+    response.headers["ETag"] = profile_patch.etag(body)
+    return body
+
+@router.get("/profile", response_model=schemas.CareerProfile)
+def get_profile(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    profile = _load_profile(db, current_user["id"])
+    body = schemas.CareerProfile.model_validate(profile)
+    etag = profile_patch.etag(body)
+    if http_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return body
+
 @router.put("/profile", response_model=schemas.CareerProfile)
 def update_profile(
     profile_data: schemas.CareerProfileCreate,
-    current_user: dict = Depends(auth.get_current_user),
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    profile = db.query(models.CareerProfile).filter(models.CareerProfile.user_id == user.id).first()
-    
-    profile.headline = profile_data.headline
-    profile.skills = profile_data.skills
-    profile.experience = profile_data.experience
-    profile.education = profile_data.education
-    
-    db.commit()
-    db.refresh(profile)
-    return profile
+    """Replace the profile; only fields that differ are written. Honours If-Match."""
+    profile = _load_profile(db, current_user["id"])
+    return _save(db, profile, profile_data.model_dump(), if_match, response)
+
+# The body is read raw, so document the patch types by hand
+PATCH_OPENAPI = {"requestBody": {"required": True, "content": {
+    profile_patch.MERGE_PATCH: {"schema": {"type": "object"}},
+    profile_patch.JSON_PATCH: {"schema": {"type": "array", "items": {"type": "object"}}},
+}}}
+
+async def read_patch(request: Request, content_type: Optional[str] = Header(None)) -> Tuple[str, Any]:
+    """The PATCH body as (media type, patch): 415 for other types before any JSON is parsed"""
+    try:
+        return profile_patch.parse(content_type, await request.body())
+    except profile_patch.PatchError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+@router.patch("/profile", response_model=schemas.CareerProfile, openapi_extra=PATCH_OPENAPI)
+def patch_profile(
+    response: Response,
+    patch: Tuple[str, Any] = Depends(read_patch),
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Merge patch (application/merge-patch+json) or JSON Patch (application/json-patch+json)"""
+    profile = _load_profile(db, current_user["id"])
+    try:
+        data = profile_patch.apply(profile, *patch)
+    except profile_patch.PatchError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    return _save(db, profile, data, if_match, response)
+
+@router.get("/search", response_model=List[schemas.CareerMatch])
+@query_budget(4)
+def search_profiles(
+    q: Optional[str] = Query(None, max_length=500),
+    skills: List[str] = Query([]),
+    limit: int = Query(career_search.DEFAULT_LIMIT, ge=1, le=career_search.MAX_LIMIT),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Profiles ranked by similarity to `q`; each `skills` entry must be listed on the profile"""
+    if not (q and q.strip()) and not skills:
+        raise HTTPException(status_code=422, detail="Provide q or skills")
+    return career_search.search(db, q or "", skills, require_skills=True, limit=limit)
 
 @router.get("/applications", response_model=List[schemas.JobApplication])
+@query_budget(2)
 def get_applications(
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    return db.query(models.JobApplication).filter(models.JobApplication.user_id == current_user["id"]).order_by(models.JobApplication.applied_date.desc()).all()
+
+@router.get("/applications/stats", response_model=schemas.ApplicationStats)
+@query_budget(2)
+def get_application_stats(
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    return db.query(models.JobApplication).filter(models.JobApplication.user_id == user.id).order_by(models.JobApplication.applied_date.desc()).all()
+    """Funnel counts, stage conversion and median days in each status, from the precomputed counters"""
+    return pipeline.stats(db, current_user["id"])
 
 @router.post("/applications", response_model=schemas.JobApplication)
 def create_application(
     app_data: schemas.JobApplicationCreate,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     db_app = models.JobApplication(
-        user_id=user.id,
+        user_id=current_user["id"],
         company=app_data.company,
         position=app_data.position,
         status=app_data.status,
@@ -68,6 +137,7 @@ def create_application(
         notes=app_data.notes
     )
     db.add(db_app)
+    pipeline.record_created(db, db_app)
     db.commit()
     db.refresh(db_app)
     return db_app
@@ -76,15 +146,28 @@ def create_application(
 def update_application_status(
     app_id: int,
     status: str,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    app = db.query(models.JobApplication).filter(models.JobApplication.id == app_id, models.JobApplication.user_id == user.id).first()
+    app = db.query(models.JobApplication).filter(models.JobApplication.id == app_id, models.JobApplication.user_id == current_user["id"]).first()
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    app.status = status
+    pipeline.record_transition(db, app, status)
     db.commit()
     db.refresh(app)
     return app
+
+@router.get("/applications/{app_id}/match", response_model=List[schemas.CareerMatch])
+@query_budget(4)
+def match_application(
+    app_id: int,
+    limit: int = Query(career_search.DEFAULT_LIMIT, ge=1, le=career_search.MAX_LIMIT),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Profiles ranked against the application's position and notes"""
+    app = db.query(models.JobApplication).filter(models.JobApplication.id == app_id, models.JobApplication.user_id == current_user["id"]).first()
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    return career_search.match_application(db, app, limit)
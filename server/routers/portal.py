@@ -9,7 +9,7 @@ router = APIRouter(
 @router.get("/stats")
 def get_portal_stats(current_user: dict = Depends(auth.get_current_user)):
     return {
-        "greeting": f"Hello, {current_user.email}",
+        "greeting": f"Hello, {current_user['email']}",
         "modules": [
             {"id": "survey", "name": "SurveyStar", "status": "active", "notifications": 2},
             {"id": "accounting", "name": "Accounting", "status": "active", "notifications": 0},
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from .. import schemas, auth, database, search as search_index, pagination
+from ..querybudget import query_budget
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+)
+
+@router.get("", response_model=List[schemas.SearchHit])
+@query_budget(5)
+def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kinds: List[str] = Query([], description="application, expense or supply; all when omitted"),
+    limit: int = Query(search_index.DEFAULT_LIMIT, ge=1, le=search_index.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Your applications, expenses and supply items matching every word of `q`, best first"""
+    unknown = set(kinds) - set(search_index.SOURCES)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown kinds: {', '.join(sorted(unknown))}")
+    offset = pagination.decode_offset_cursor(cursor) if cursor else 0
+    # One extra row tells whether another page exists
+    hits = search_index.search(db, current_user["id"], q, kinds, limit + 1, offset)
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_offset_cursor(offset + limit)
+    return hits
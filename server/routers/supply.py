@@ -1,69 +1,193 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session, aliased
 from typing import List
 from .. import models, schemas, auth, database
+from ..querybudget import query_budget
 
 router = APIRouter(
     prefix="/supply",
     tags=["supply"],
 )
 
+TO_BUY = "TO_BUY"
+
+# Statements shared with the async router. Each batch is one set-based
+# statement scoped to the user; RETURNING hands back what it touched.
+
+def insert_items(user_id: int, items: List[schemas.SupplyItemCreate]):
+    """INSERT ... RETURNING for (db.scalars(statement, rows), rows)"""
+    rows = [{"user_id": user_id, **item.model_dump()} for item in items]
+    return insert(models.SupplyItem).returning(models.SupplyItem), rows
+
+def selected(user_id: int, selection: schemas.SupplyItemSelection) -> list:
+    """WHERE clauses for the user's items picked by ids or by filter"""
+    item = models.SupplyItem
+    if selection.ids is not None:
+        return [item.id.in_(selection.ids), item.user_id == user_id]
+    clauses = [item.user_id == user_id]
+    if selection.filter.status is not None:
+        clauses.append(item.status == selection.filter.status)
+    if selection.filter.category is not None:
+        clauses.append(item.category == selection.filter.category)
+    return clauses
+
+def set_status(user_id: int, change: schemas.SupplyItemStatusUpdate):
+    """Move the selected items to a status; rows already there are left alone"""
+    item = models.SupplyItem
+    return (
+        update(item).where(*selected(user_id, change), item.status != change.status)
+        .values(status=change.status).returning(item.id)
+        .execution_options(synchronize_session=False)
+    )
+
+def set_item_status(user_id: int, item_id: int, status: str):
+    item = models.SupplyItem
+    return (
+        update(item).where(item.id == item_id, item.user_id == user_id)
+        .values(status=status).returning(item).execution_options(synchronize_session=False)
+    )
+
+def delete_items(user_id: int, selection: schemas.SupplyItemSelection):
+    item = models.SupplyItem
+    return delete(item).where(*selected(user_id, selection)).returning(item.id).execution_options(synchronize_session=False)
+
+def status_counts(user_id: int):
+    # Read in (user_id, status) index order, so grouping needs no sort
+    item = models.SupplyItem
+    return select(item.status, func.count()).where(item.user_id == user_id).group_by(item.status)
+
+def newest_per_status(user_id: int, statuses: List[str], per_status: int):
+    """The newest `per_status` items of each status as one UNION ALL of index range reads"""
+    item = models.SupplyItem
+    branches = [
+        select(item).where(item.user_id == user_id, item.status == status)
+        .order_by(item.created_at.desc(), item.id.desc()).limit(per_status).subquery().select()
+        for status in statuses
+    ]
+    return select(aliased(item, union_all(*branches).subquery()))
+
+def to_buy_queue(user_id: int, limit: int):
+    # Inlined so PostgreSQL can match the partial index ix_supply_items_to_buy even in generic plans
+    item = models.SupplyItem
+    return (
+        select(item).where(item.user_id == user_id, item.status == literal(TO_BUY, literal_execute=True))
+        .order_by(item.created_at, item.id).limit(limit)
+    )
+
+def group_items(counts, items) -> List[schemas.SupplyItemGroup]:
+    groups = {status: schemas.SupplyItemGroup(status=status, count=count, items=[]) for status, count in counts}
+    # UNION ALL keeps no order across branches; each branch is small
+    for row in sorted(items, key=lambda row: (row.created_at, row.id), reverse=True):
+        groups[row.status].items.append(schemas.SupplyItem.model_validate(row))
+    # Same group order as the flat list: status descending, so TO_BUY before IN_STOCK
+    return [groups[status] for status in sorted(groups, reverse=True)]
+
+def serialize(items) -> List[schemas.SupplyItem]:
+    # Before commit, which would expire the rows and reload each one
+    return [schemas.SupplyItem.model_validate(row) for row in items]
+
 @router.get("/items", response_model=List[schemas.SupplyItem])
+@query_budget(2)
 def get_items(
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    return db.query(models.SupplyItem).filter(models.SupplyItem.user_id == current_user["id"]).order_by(models.SupplyItem.status.desc(), models.SupplyItem.created_at.desc()).all()
+
+@router.get("/items/grouped", response_model=List[schemas.SupplyItemGroup])
+@query_budget(3)
+def get_items_grouped(
+    per_status: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    return db.query(models.SupplyItem).filter(models.SupplyItem.user_id == user.id).order_by(models.SupplyItem.status.desc(), models.SupplyItem.created_at.desc()).all()
+    counts = db.execute(status_counts(current_user["id"])).all()
+    if not counts:
+        return []
+    items = db.scalars(newest_per_status(current_user["id"], [status for status, _ in counts], per_status)).all()
+    return group_items(counts, items)
+
+@router.get("/items/to-buy", response_model=List[schemas.SupplyItem])
+@query_budget(2)
+def get_to_buy(
+    limit: int = Query(100, ge=1, le=500),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """The restock queue: TO_BUY items, oldest first"""
+    return db.scalars(to_buy_queue(current_user["id"], limit)).all()
 
 @router.post("/items", response_model=schemas.SupplyItem)
+@query_budget(2)
 def create_item(
     item: schemas.SupplyItemCreate,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    
-    db_item = models.SupplyItem(
-        user_id=user.id,
-        name=item.name,
-        category=item.category,
-        status=item.status,
-        quantity=item.quantity
-    )
-    db.add(db_item)
+    statement, rows = insert_items(current_user["id"], [item])
+    created = serialize(db.scalars(statement, rows).all())[0]
+    db.commit()
+    return created
+
+@router.post("/items/batch", response_model=List[schemas.SupplyItem])
+@query_budget(2)
+def create_items(
+    batch: schemas.SupplyItemBatchCreate,
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    statement, rows = insert_items(current_user["id"], batch.items)
+    created = serialize(db.scalars(statement, rows).all())
+    db.commit()
+    return created
+
+@router.patch("/items/batch", response_model=schemas.SupplyBatchResult)
+@query_budget(2)
+def update_items_status(
+    change: schemas.SupplyItemStatusUpdate,
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    ids = db.scalars(set_status(current_user["id"], change)).all()
+    db.commit()
+    return {"count": len(ids), "ids": ids}
+
+@router.delete("/items/batch", response_model=schemas.SupplyBatchResult)
+@query_budget(2)
+def delete_items_batch(
+    selection: schemas.SupplyItemSelection,
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    ids = db.scalars(delete_items(current_user["id"], selection)).all()
     db.commit()
-    db.refresh(db_item)
-    return db_item
+    return {"count": len(ids), "ids": ids}
 
 @router.patch("/items/{item_id}", response_model=schemas.SupplyItem)
+@query_budget(2)
 def update_item_status(
     item_id: int,
     status: str,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    item = db.query(models.SupplyItem).filter(models.SupplyItem.id == item_id, models.SupplyItem.user_id == user.id).first()
-    if not item:
+    updated = db.scalars(set_item_status(current_user["id"], item_id, status)).first()
+    if not updated:
         raise HTTPException(status_code=404, detail="Item not found")
-    
-    item.status = status
+    updated = schemas.SupplyItem.model_validate(updated)
     db.commit()
-    db.refresh(item)
-    return item
+    return updated
 
 @router.delete("/items/{item_id}")
+@query_budget(2)
 def delete_item(
     item_id: int,
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    item = db.query(models.SupplyItem).filter(models.SupplyItem.id == item_id, models.SupplyItem.user_id == user.id).first()
-    if not item:
+    deleted = db.scalars(delete_items(current_user["id"], schemas.SupplyItemSelection(ids=[item_id]))).first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    
-    db.delete(item)
     db.commit()
     return {"ok": True}
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, auth, database
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from .. import models, schemas, auth, database, survey_export, analytics, ingest, survey_cache, http_cache
+from ..querybudget import query_budget
 
 router = APIRouter(
     prefix="/surveys",
@@ -11,20 +14,17 @@ router = APIRouter(
 @router.post("/", response_model=schemas.Survey)
 def create_survey(
     survey: schemas.SurveyCreate, 
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    # Find user id
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    
     # Convert Pydantic list of models to JSON-compatible list of dicts
-    questions_json = [q.dict() for q in survey.questions]
+    questions_json = [q.model_dump() for q in survey.questions]
 
     db_survey = models.Survey(
         title=survey.title,
         description=survey.description,
         questions=questions_json,
-        owner_id=user.id
+        owner_id=current_user["id"]
     )
     db.add(db_survey)
     db.commit()
@@ -32,36 +32,105 @@ def create_survey(
     return db_survey
 
 @router.get("/", response_model=List[schemas.Survey])
+@query_budget(2)
 def list_my_surveys(
-    current_user: dict = Depends(auth.get_current_user),
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == current_user["email"]).first()
-    return db.query(models.Survey).filter(models.Survey.owner_id == user.id).all()
+    return db.query(models.Survey).filter(models.Survey.owner_id == current_user["id"]).all()
 
 @router.get("/{survey_id}", response_model=schemas.Survey)
-def get_survey(survey_id: int, db: Session = Depends(database.get_db)):
-    # Public access allowed for taking the survey
-    survey = db.query(models.Survey).filter(models.Survey.id == survey_id).first()
+async def get_survey(survey_id: int, if_none_match: Optional[str] = Header(None)):
+    # Public access allowed for taking the survey. Served from the definition
+    # cache with a strong ETag so repeat visits and proxies can revalidate.
+    entry = survey_cache.definitions.get(survey_id)
+    if entry is None:
+        entry = await run_in_threadpool(survey_cache.load, survey_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Survey not found")
+
+    headers = {"ETag": entry["etag"], "Cache-Control": survey_cache.CACHE_CONTROL}
+    if http_cache.etag_matches(if_none_match, entry["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+@router.patch("/{survey_id}", response_model=schemas.Survey)
+def update_survey(
+    survey_id: int,
+    survey_update: schemas.SurveyUpdate,
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Edit or (de)activate a survey; bumps its version and drops cached copies"""
+    survey = db.query(models.Survey).filter(
+        models.Survey.id == survey_id,
+        models.Survey.owner_id == current_user["id"]
+    ).first()
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
+
+    # Only update provided fields
+    if survey_update.title is not None:
+        survey.title = survey_update.title
+    if survey_update.description is not None:
+        survey.description = survey_update.description
+    if survey_update.questions is not None:
+        survey.questions = [q.model_dump() for q in survey_update.questions]
+    if survey_update.is_active is not None:
+        survey.is_active = survey_update.is_active
+    survey.version = models.Survey.version + 1
+
+    db.commit()
+    db.refresh(survey)
+    survey_cache.invalidate(survey_id)
+    ingest.survey_schemas.invalidate(survey_id)
     return survey
 
-@router.post("/{survey_id}/responses", response_model=schemas.Response)
-def submit_response(
-    survey_id: int, 
-    response: schemas.ResponseCreate, 
+@router.post("/{survey_id}/responses", response_model=schemas.ResponseReceipt, status_code=status.HTTP_202_ACCEPTED)
+async def submit_response(survey_id: int, response: schemas.ResponseCreate):
+    """Validate against the cached question schema and enqueue for a batched write"""
+    survey = await ingest.get_survey_schema(survey_id)
+    if not survey["is_active"]:
+        raise HTTPException(status_code=403, detail="Survey is closed")
+    errors = ingest.validate_answers(survey["questions"], response.answers)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return {"receipt_id": ingest.ingestor.submit(survey_id, response.answers)}
+
+@router.get("/{survey_id}/analytics")
+@query_budget(4)
+def get_survey_analytics(
+    survey_id: int,
+    current_user: dict = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
 ):
-    survey = db.query(models.Survey).filter(models.Survey.id == survey_id).first()
+    """Per-question aggregates and daily response counts (owner only)"""
+    survey = db.query(models.Survey).filter(
+        models.Survey.id == survey_id,
+        models.Survey.owner_id == current_user["id"]
+    ).first()
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
-    
-    db_response = models.Response(
-        survey_id=survey_id,
-        answers=response.answers
+    return analytics.survey_analytics(db, survey)
+
+@router.get("/{survey_id}/responses/export")
+def export_responses(
+    survey_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: dict = Depends(auth.get_current_active_user),
+    db: Session = Depends(database.get_db)
+):
+    """Stream all responses with one column per question id (owner only)"""
+    survey = db.query(models.Survey).filter(
+        models.Survey.id == survey_id,
+        models.Survey.owner_id == current_user["id"]
+    ).first()
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
+
+    question_ids = [q["id"] for q in survey.questions or []]
+    return StreamingResponse(
+        survey_export.stream_responses(survey_id, question_ids, format),
+        media_type=survey_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="survey-{survey_id}-responses.{format}"'},
     )
-    db.add(db_response)
-    db.commit()
-    db.refresh(db_response)
-    return db_response
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, model_validator
 from typing import Optional
 from datetime import datetime
 
@@ -26,9 +26,18 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     phone: Optional[str] = None
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None # Access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 from typing import List, Any, Dict
 
@@ -47,10 +56,17 @@ class SurveyBase(BaseModel):
 class SurveyCreate(SurveyBase):
     pass
 
+class SurveyUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    questions: Optional[List[Question]] = None
+    is_active: Optional[bool] = None
+
 class Survey(SurveyBase):
     id: int
     owner_id: int
     is_active: bool
+    version: int = 1
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -58,6 +74,10 @@ class Survey(SurveyBase):
 class ResponseCreate(BaseModel):
     answers: Dict[str, Any]
 
+class ResponseReceipt(BaseModel):
+    receipt_id: str
+    status: str = "accepted"
+
 class Response(ResponseCreate):
     id: int
     survey_id: int
@@ -92,12 +112,25 @@ class Expense(ExpenseBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ExpenseImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ExpenseImportResult(BaseModel):
+    import_id: int
+    inserted: int
+    failed: int
+    rows_processed: int
+    errors: List[ExpenseImportError] = []
+    replayed: bool = False
+
 # Career Models
 class CareerProfileBase(BaseModel):
     headline: Optional[str] = None
     skills: List[str] = []
     experience: List[Dict[str, Any]] = []
     education: List[Dict[str, Any]] = []
+    searchable: bool = False # Listed in career search; matches show the headline and skills only
 
 class CareerProfileCreate(CareerProfileBase):
     pass
@@ -106,9 +139,17 @@ class CareerProfile(CareerProfileBase):
     id: int
     user_id: int
     updated_at: datetime
+    version: int = 1 # Also sent as the ETag; echo it in If-Match to update
     
     model_config = ConfigDict(from_attributes=True)
 
+class CareerMatch(BaseModel):
+    profile_id: int
+    headline: Optional[str] = None
+    skills: List[str] = []
+    matched_skills: List[str] = [] # Skills searched for (or named in the application) that the profile lists
+    score: float # Cosine similarity, 0..1
+
 class JobApplicationBase(BaseModel):
     company: str
     position: str
@@ -127,6 +168,18 @@ class JobApplication(JobApplicationBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ApplicationStageStats(BaseModel):
+    stage: str
+    current: int # Applications in this status now
+    reached: int # Applications that got this far (pipeline stages count skipped ones as passed)
+    conversion_rate: Optional[float] = None # reached / reached of the previous pipeline stage
+    completed_stays: int # Moves out of this status, which the median covers
+    median_days: Optional[float] = None
+
+class ApplicationStats(BaseModel):
+    total: int
+    stages: List[ApplicationStageStats]
+
 # Supply Models
 class SupplyItemBase(BaseModel):
     name: str
@@ -145,3 +198,43 @@ class SupplyItem(SupplyItemBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class SupplyItemGroup(BaseModel):
+    status: str
+    count: int
+    items: List[SupplyItem] # newest first, at most per_status of them
+
+SUPPLY_BATCH_MAX = 500
+
+class SupplyItemBatchCreate(BaseModel):
+    items: List[SupplyItemCreate] = Field(min_length=1, max_length=SUPPLY_BATCH_MAX)
+
+class SupplyItemFilter(BaseModel):
+    status: Optional[str] = None
+    category: Optional[str] = None
+
+class SupplyItemSelection(BaseModel):
+    """Items by id, or every item matching filter ({} selects them all)"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=SUPPLY_BATCH_MAX)
+    filter: Optional[SupplyItemFilter] = None
+
+    @model_validator(mode="after")
+    def one_selector(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Give either ids or filter")
+        return self
+
+class SupplyItemStatusUpdate(SupplyItemSelection):
+    status: str
+
+class SupplyBatchResult(BaseModel):
+    count: int
+    ids: List[int] # the items changed or deleted
+
+
+# Search Models
+class SearchHit(BaseModel):
+    kind: str # application, expense or supply
+    id: int
+    title: str
+    detail: Optional[str] = None # Status, amount and date, or category
+    score: float # Higher is more relevant; only comparable within one search
@@ -0,0 +1,189 @@
+"""Full-text search across job applications, expenses and supply items.
+
+Migration 0006 builds one index over all three (SQLite FTS5, or a tsvector
+table with a GIN index on PostgreSQL) and the triggers that keep it in step
+with every write. Titles (company and position, expense description, item
+name) weigh more than bodies (application notes, item category). Every query
+word matches as a prefix, so "interv" finds "interview".
+
+Hits come back best first: bm25 on SQLite, ts_rank on PostgreSQL. Only the
+MAX_CANDIDATES newest matches are ranked, which is exact for all but the
+broadest queries over the largest accounts. Then each module's rows are
+loaded with one query.
+
+Repair the index with:
+
+    python -m server.search rebuild
+"""
+import argparse
+import re
+from typing import Iterable
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.orm import Session
+from . import models, database, migrate
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8
+# Only this many matches, those with the highest ids (roughly the newest), are
+# ranked, so a word in thousands of a user's rows costs no more than a rarer one
+MAX_CANDIDATES = 2000
+# bm25 column weights for (title, body)
+SQLITE_WEIGHTS = (2.0, 1.0)
+# SQLite rowids are ((user_id * 4 + kind code) << KEY_SHIFT) + id, as in migration 0006
+KEY_SHIFT = 34
+ID_MASK = (1 << KEY_SHIFT) - 1
+
+# kind -> (code, model, title, body), matching the documents of migration 0006
+SOURCES = {
+    "application": (1, models.JobApplication, "coalesce({r}.company, '') || ' ' || coalesce({r}.position, '')", "coalesce({r}.notes, '')"),
+    "expense": (2, models.Expense, "coalesce({r}.description, '')", "''"),
+    "supply": (3, models.SupplyItem, "coalesce({r}.name, '')", "coalesce({r}.category, '')"),
+}
+# Columns a hit shows; plain rows load several times faster than ORM instances
+HIT_COLUMNS = {
+    "application": ("company", "position", "status"),
+    "expense": ("description", "amount", "date"),
+    "supply": ("name", "category", "status"),
+}
+KINDS = {code: kind for kind, (code, *_) in SOURCES.items()}
+
+_TERM = re.compile(r"\w+")
+
+
+def terms(q: str) -> list:
+    return _TERM.findall((q or "").lower())[:MAX_TERMS]
+
+
+def _key(user_id: int, code: int) -> int:
+    return (user_id * 4 + code) << KEY_SHIFT
+
+
+def _sqlite_hits(db: Session, user_id: int, words: list, kinds: list, limit: int, offset: int) -> list:
+    match = "{title body} : (" + " AND ".join(f'"{word}"*' for word in words) + ")"
+    codes = [SOURCES[kind][0] for kind in kinds] or sorted(KINDS)
+    # The user's documents of the wanted kinds lie in one rowid range; FTS5
+    # seeks within it, and only a non-contiguous kind set needs a filter
+    filters = "search_index MATCH :match AND rowid BETWEEN :low AND :high"
+    if len(codes) != max(codes) - min(codes) + 1:
+        filters += f" AND (rowid >> {KEY_SHIFT}) % 4 IN ({', '.join(str(code) for code in codes)})"
+    weights = ", ".join(str(weight) for weight in SQLITE_WEIGHTS)
+    # FTS5 walks the matches in rowid order, so bm25 is only computed for the candidates
+    rows = db.execute(
+        text(
+            f"SELECT rowid, score FROM (SELECT rowid, bm25(search_index, {weights}) AS score FROM search_index "
+            f"WHERE {filters} ORDER BY rowid DESC LIMIT :candidates) "
+            "ORDER BY score, rowid DESC LIMIT :limit OFFSET :offset"
+        ),
+        {
+            "match": match, "low": _key(user_id, min(codes)), "high": _key(user_id, max(codes) + 1) - 1,
+            "candidates": MAX_CANDIDATES, "limit": limit, "offset": offset,
+        },
+    )
+    # bm25 is lower-is-better; flip it so scores rise with relevance on both backends
+    return [(KINDS[(rowid >> KEY_SHIFT) % 4], rowid & ID_MASK, -score) for rowid, score in rows]
+
+
+def _postgres_hits(db: Session, user_id: int, words: list, kinds: list, limit: int, offset: int) -> list:
+    filters = "user_id = :user_id AND document @@ query"
+    params = {
+        "query": " & ".join(f"'{word}':*" for word in words), "user_id": user_id,
+        "candidates": MAX_CANDIDATES, "limit": limit, "offset": offset,
+    }
+    if kinds:
+        filters += " AND kind IN :kinds"
+        params["kinds"] = [SOURCES[kind][0] for kind in kinds]
+    # Ranked outside the CTE so ts_rank only runs on the candidates
+    statement = text(
+        "WITH candidates AS ("
+        f"SELECT kind, ref_id, document FROM search_index, to_tsquery('english', :query) AS query WHERE {filters} "
+        "ORDER BY ref_id DESC LIMIT :candidates) "
+        "SELECT kind, ref_id, ts_rank(document, to_tsquery('english', :query)) AS score FROM candidates "
+        "ORDER BY score DESC, ref_id DESC LIMIT :limit OFFSET :offset"
+    )
+    if kinds:
+        statement = statement.bindparams(bindparam("kinds", expanding=True))
+    return [(KINDS[code], ref_id, score) for code, ref_id, score in db.execute(statement, params)]
+
+
+def _describe(kind: str, row) -> tuple:
+    if kind == "application":
+        return f"{row.position} at {row.company}", row.status
+    if kind == "expense":
+        amount = f"{row.amount / 100:.2f}" if row.amount is not None else None
+        return row.description, " on ".join(filter(None, [amount, row.date.strftime("%Y-%m-%d") if row.date else None]))
+    return row.name, ", ".join(filter(None, [row.category, row.status]))
+
+
+def search(
+    db: Session, user_id: int, q: str, kinds: Iterable[str] = (), limit: int = DEFAULT_LIMIT, offset: int = 0,
+) -> list:
+    """One page of the user's hits for `q`, best first, optionally limited to some kinds"""
+    words = terms(q)
+    if not words:
+        return []
+    kinds = sorted(set(kinds))
+    rank = _postgres_hits if db.get_bind().dialect.name == "postgresql" else _sqlite_hits
+    ranked = rank(db, user_id, words, kinds, limit, offset)
+
+    rows = {}
+    for kind in {kind for kind, _, _ in ranked}:
+        model = SOURCES[kind][1]
+        ids = [ref_id for hit_kind, ref_id, _ in ranked if hit_kind == kind]
+        columns = [getattr(model, column) for column in HIT_COLUMNS[kind]]
+        # By primary key alone: with user_id in the WHERE, SQLite prefers the
+        # (user_id, ...) list indexes and walks all of the user's rows
+        for row in db.execute(select(model.id, model.user_id, *columns).where(model.id.in_(ids))):
+            if row.user_id == user_id:
+                rows[(kind, row.id)] = row
+
+    hits = []
+    for kind, ref_id, score in ranked:
+        row = rows.get((kind, ref_id))
+        if row is None:
+            continue
+        title, detail = _describe(kind, row)
+        hits.append({"kind": kind, "id": ref_id, "title": title or "", "detail": detail or None, "score": round(score, 4)})
+    return hits
+
+
+def rebuild(db: Session):
+    """Empty the index and refill it from the source tables"""
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        db.execute(text("TRUNCATE search_index"))
+    else:
+        db.execute(text("INSERT INTO search_index (search_index) VALUES ('delete-all')"))
+    for kind, (code, model, title, body) in SOURCES.items():
+        table = model.__tablename__
+        title, body = title.format(r=table), body.format(r=table)
+        if postgres:
+            db.execute(text(
+                f"INSERT INTO search_index (kind, ref_id, user_id, document) "
+                f"SELECT {code}, id, user_id, setweight(to_tsvector('english', {title}), 'A') || "
+                f"setweight(to_tsvector('english', {body}), 'B') FROM {table}"
+            ))
+        else:
+            db.execute(text(
+                f"INSERT INTO search_index (rowid, title, body) "
+                f"SELECT ((coalesce(user_id, 0) * 4 + {code}) << {KEY_SHIFT}) + id, {title}, {body} FROM {table}"
+            ))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the full-text search index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    migrate.upgrade(backfill=False)
+    db = database.SessionLocal()
+    try:
+        rebuild(db)
+    finally:
+        db.close()
+    print("Rebuilt the search index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import hashlib
+import os
+from typing import Optional
+from . import models, schemas, database
+from .cache import TTLCache
+
+# Serialized public survey payloads: survey_id -> {"version", "body", "etag"}.
+# Edits through this process invalidate immediately; the TTL bounds how long
+# another worker can serve a definition edited elsewhere.
+SURVEY_CACHE_SIZE = int(os.getenv("SURVEY_CACHE_SIZE", "2048"))
+SURVEY_CACHE_TTL_SECONDS = float(os.getenv("SURVEY_CACHE_TTL_SECONDS", "30"))
+SURVEY_MAX_AGE_SECONDS = int(os.getenv("SURVEY_MAX_AGE_SECONDS", "60"))
+
+CACHE_CONTROL = f"public, max-age={SURVEY_MAX_AGE_SECONDS}, stale-while-revalidate={SURVEY_MAX_AGE_SECONDS * 5}"
+
+definitions = TTLCache(maxsize=SURVEY_CACHE_SIZE, ttl=SURVEY_CACHE_TTL_SECONDS)
+
+
+def _entry(survey: models.Survey) -> dict:
+    body = schemas.Survey.model_validate(survey).model_dump_json().encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return {
+        "version": survey.version,
+        "body": body,
+        "etag": f'"{survey.id}-{survey.version}-{digest}"',
+    }
+
+
+def load(survey_id: int) -> Optional[dict]:
+    """Serialize a survey from the database and cache it (runs in the threadpool)"""
+    with database.SessionLocal() as db:
+        survey = db.get(models.Survey, survey_id)
+        if survey is None:
+            return None
+        entry = _entry(survey)
+    definitions.set(survey_id, entry)
+    return entry
+
+
+def invalidate(survey_id: int):
+    definitions.invalidate(survey_id)
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from . import models, database
+
+# Rows fetched per round trip and approximate bytes per streamed chunk
+FETCH_SIZE = 500
+CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _cell(value):
+    # Checkbox answers are lists; anything else structured is kept as JSON
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "; ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def stream_responses(survey_id: int, question_ids: list, fmt: str):
+    """Yield the survey's responses as CSV or NDJSON byte chunks.
+
+    Opens its own session: the request-scoped one is closed before a
+    StreamingResponse body is iterated. Rows are fetched with yield_per so
+    memory stays flat however many responses the survey has.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(["response_id", "submitted_at", *question_ids])
+
+    query = (
+        select(models.Response.id, models.Response.created_at, models.Response.answers)
+        .where(models.Response.survey_id == survey_id)
+        .order_by(models.Response.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    with database.SessionLocal() as db:
+        for response_id, created_at, answers in db.execute(query):
+            answers = answers or {}
+            submitted_at = created_at.isoformat() if created_at else None
+            if writer:
+                writer.writerow([response_id, submitted_at, *(_cell(answers.get(q)) for q in question_ids)])
+            else:
+                row = {"response_id": response_id, "submitted_at": submitted_at}
+                row.update((q, answers.get(q)) for q in question_ids)
+                buffer.write(json.dumps(row, ensure_ascii=False, default=str))
+                buffer.write("\n")
+            if buffer.tell() >= CHUNK_BYTES:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,52 @@
+"""pytest plugin with query-count helpers.
+
+Enable it from a conftest.py with ``pytest_plugins = ["server.testing"]``.
+Unless QUERY_BUDGET_MODE is already set, the app is then imported with
+budgets enforced ("raise"), so an endpoint that goes over its budget or runs
+an N+1 pattern fails the test that calls it.
+
+    def test_list_expenses(client, auth_headers, assert_max_queries):
+        with assert_max_queries(3):
+            client.get("/accounting/expenses", headers=auth_headers)
+"""
+import os
+from contextlib import contextmanager
+import pytest
+
+
+def pytest_configure(config):
+    # Before server.main is imported, so the budget middleware is installed
+    os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Context manager failing when the block runs more than `limit` statements"""
+    from . import querybudget
+
+    @contextmanager
+    def check(limit: int, engine=None):
+        with querybudget.count_queries(engine) as counter:
+            yield counter
+        assert counter.count <= limit, (
+            f"expected at most {limit} queries, ran {counter.count}:\n" + "\n".join(counter.statements)
+        )
+
+    return check
+
+
+@pytest.fixture
+def assert_no_repeated_queries():
+    """Context manager failing when one statement shape repeats `threshold` times"""
+    from . import querybudget
+
+    @contextmanager
+    def check(threshold: int = querybudget.N_PLUS_ONE_THRESHOLD, engine=None):
+        with querybudget.count_queries(engine) as counter:
+            yield counter
+        repeated = counter.repeated(threshold)
+        assert not repeated, "repeated statements (possible N+1):\n" + "\n".join(
+            f"{n}x {shape}" for shape, n in repeated.items()
+        )
+
+    return check
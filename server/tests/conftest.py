@@ -0,0 +1,70 @@
+"""Fixtures for the app's pytest suite: a client on a throwaway SQLite
+database, a logged-in user and a few rows of each kind to address."""
+import os
+import tempfile
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="cbx-tests-")
+# Before server.* is imported: settings are read at import time
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("HASH_EXECUTOR", "thread")
+# Survey responses then wait for shutdown (or a full batch) instead of
+# flushing in the background while another request is being counted
+os.environ.setdefault("SURVEY_INGEST_FLUSH_MS", "600000")
+os.environ.setdefault("SURVEY_INGEST_SPILL_PATH", os.path.join(_workdir, "spill.ndjson"))
+
+pytest_plugins = ["server.testing"]
+
+PASSWORD = "correct horse"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from server.main import app
+    # The lifespan migrates the database
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def make_user(client):
+    """Register an account and log it in; returns its tokens plus ready headers"""
+    def make(email: str) -> dict:
+        response = client.post("/auth/register", json={"email": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        tokens = client.post("/auth/login", data={"username": email, "password": PASSWORD}).json()
+        tokens["headers"] = {"Authorization": f"Bearer {tokens['access_token']}"}
+        return tokens
+    return make
+
+
+@pytest.fixture(scope="session")
+def auth_headers(make_user):
+    return make_user("owner@example.com")["headers"]
+
+
+@pytest.fixture(scope="session")
+def ids(client, auth_headers):
+    """Ids of rows owned by the auth_headers user, created through the API"""
+    def post(path: str, body: dict) -> dict:
+        response = client.post(path, json=body, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    category_id = client.get("/accounting/categories").json()[0]["id"]
+    expense = {"amount": 12.5, "description": "Coffee beans", "date": "2026-01-01T00:00:00", "category_id": category_id, "is_income": False}
+    survey = post("/surveys/", {"title": "Budget survey", "questions": [
+        {"id": "q1", "type": "rating", "label": "How was it?", "required": True},
+        {"id": "q2", "type": "text", "label": "Anything else?"},
+    ]})
+    return {
+        "category_id": category_id,
+        "survey_id": survey["id"],
+        "expense_id": post("/accounting/expenses", expense)["id"],
+        "doomed_expense_id": post("/accounting/expenses", expense)["id"],
+        "app_id": post("/career/applications", {"company": "Acme", "position": "Backend engineer", "notes": "Python"})["id"],
+        "item_id": post("/supply/items", {"name": "Coffee filters", "status": "TO_BUY"})["id"],
+        "doomed_item_id": post("/supply/items", {"name": "Batteries", "status": "TO_BUY"})["id"],
+    }
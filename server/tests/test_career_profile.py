@@ -0,0 +1,38 @@
+"""PATCH /career/profile: media types, body parsing and If-Match"""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def profile_user(make_user):
+    return make_user("profile-patch@example.com")["headers"]
+
+
+def _patch(client, headers, body, content_type, **extra):
+    return client.patch("/career/profile", content=body, headers={**headers, "Content-Type": content_type, **extra})
+
+
+def test_unsupported_type_is_415_before_parsing(client, profile_user):
+    # Not JSON either; the media type is what gets rejected
+    assert _patch(client, profile_user, "skills=Go", "text/plain").status_code == 415
+
+
+def test_malformed_json_is_422(client, profile_user):
+    assert _patch(client, profile_user, "{", "application/merge-patch+json").status_code == 422
+
+
+def test_patch_types_and_if_match(client, profile_user):
+    etag = client.get("/career/profile", headers=profile_user).headers["ETag"]
+    merged = _patch(client, profile_user, '{"headline": "Engineer"}', "application/merge-patch+json", **{"If-Match": etag})
+    assert merged.status_code == 200, merged.text
+
+    # The tag read before the merge is stale now
+    stale = _patch(client, profile_user, '[{"op": "add", "path": "/skills/-", "value": "Go"}]', "application/json-patch+json", **{"If-Match": etag})
+    assert stale.status_code == 412
+
+    patched = _patch(
+        client, profile_user, '[{"op": "add", "path": "/skills/-", "value": "Go"}]', "application/json-patch+json",
+        **{"If-Match": merged.headers["ETag"]},
+    )
+    assert patched.status_code == 200, patched.text
+    assert patched.json()["headline"] == "Engineer" and patched.json()["skills"] == ["Go"]
+    assert client.get("/career/profile", headers={**profile_user, "If-None-Match": patched.headers["ETag"]}).status_code == 304
@@ -0,0 +1,54 @@
+"""POST /accounting/expenses/bulk"""
+import uuid
+
+
+def _import(client, headers, body, content_type="text/csv", key=None):
+    headers = {**headers, "Content-Type": content_type, "Idempotency-Key": key or uuid.uuid4().hex}
+    return client.post("/accounting/expenses/bulk", headers=headers, content=body)
+
+
+def test_csv_quoted_field_spans_lines_and_chunks(client, auth_headers, ids):
+    body = (
+        "amount,description,date,category_id\r\n"
+        f'4.5,"Lunch, with\nthe team",2026-04-01T00:00:00,{ids["category_id"]}\r\n'
+        "\r\n"
+        f'2,Bus ticket,2026-04-02T00:00:00,{ids["category_id"]}\r\n'
+    ).encode()
+    # Split mid-field, so the newline inside quotes arrives in a chunk of its own
+    chunks = iter([body[i:i + 7] for i in range(0, len(body), 7)])
+
+    response = _import(client, auth_headers, chunks)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+    assert response.json()["errors"] == []
+    descriptions = [e["description"] for e in client.get("/accounting/expenses", headers=auth_headers).json()]
+    assert "Lunch, with\nthe team" in descriptions
+
+
+def test_replay_returns_stored_result(client, auth_headers, ids):
+    body = f'{{"amount": 3, "description": "Tea", "date": "2026-04-03T00:00:00", "category_id": {ids["category_id"]}}}\nnot json\n'
+    first = _import(client, auth_headers, body, "application/x-ndjson", key="replay")
+    again = _import(client, auth_headers, body, "application/x-ndjson", key="replay")
+
+    assert first.json()["inserted"] == 1
+    assert [error["row"] for error in first.json()["errors"]] == [2]
+    assert again.json() == {**first.json(), "replayed": True}
+
+
+def test_retry_while_running_gets_409(client, auth_headers, ids):
+    from server import database, expense_import
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+    body = f'{{"amount": 7, "description": "Train", "date": "2026-04-04T00:00:00", "category_id": {ids["category_id"]}}}\n'
+    with database.SessionLocal() as db:
+        # Another request holds the import
+        record, token = expense_import.open_import(db, user_id, "in-flight")
+        record_id = record.id
+
+    assert _import(client, auth_headers, body, "application/x-ndjson", key="in-flight").status_code == 409
+
+    with database.SessionLocal() as db:
+        expense_import._release_claim(db, record_id, token)
+    response = _import(client, auth_headers, body, "application/x-ndjson", key="in-flight")
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 1
@@ -0,0 +1,106 @@
+"""Survey response ingestion when writes fail"""
+import uuid
+import pytest
+from server import analytics, database, ingest, models
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    return ingest.ResponseIngestor(spill_path=str(tmp_path / "spill.ndjson"))
+
+
+def _batch(survey_id, n):
+    return [(survey_id, {"q1": 5, "q2": "ok"}, uuid.uuid4().hex) for _ in range(n)]
+
+
+def _stored(receipts):
+    with database.SessionLocal() as db:
+        return db.query(models.Response).filter(models.Response.receipt_id.in_(receipts)).count()
+
+
+def test_analytics_failure_keeps_responses(ingestor, ids, monkeypatch):
+    batch = _batch(ids["survey_id"], 3)
+    with monkeypatch.context() as patch:
+        patch.setattr(analytics, "record_responses", lambda *args: 1 / 0)
+        ingestor._flush(batch)
+
+    assert _stored([receipt for *_, receipt in batch]) == 3
+    assert ingestor._stale_surveys == {ids["survey_id"]}
+
+    ingestor._flush(_batch(ids["survey_id"], 1))
+    assert ingestor._stale_surveys == set()
+    with database.SessionLocal() as db:
+        counted = db.query(models.SurveyDailyCount).filter(models.SurveyDailyCount.survey_id == ids["survey_id"]).all()
+        stored = db.query(models.Response).filter(models.Response.survey_id == ids["survey_id"]).count()
+    assert sum(day.count for day in counted) == stored
+
+
+def test_failed_insert_spills_then_replays(ingestor, ids, monkeypatch):
+    batch = _batch(ids["survey_id"], 2)
+    with monkeypatch.context() as patch:
+        patch.setattr(ingest, "insert", lambda *args: 1 / 0)
+        ingestor._flush(batch)
+
+    assert ingestor.spilled == 2 and ingestor.dropped == 0
+    assert _stored([receipt for *_, receipt in batch]) == 0
+
+    later = _batch(ids["survey_id"], 1)
+    ingestor._flush(later)
+    assert _stored([receipt for *_, receipt in batch + later]) == 3
+    # Replaying again finds nothing, and a receipt already stored is not stored twice
+    ingestor._spill([{"survey_id": ids["survey_id"], "answers": {}, "receipt_id": later[0][2]}])
+    ingestor._replay_spill()
+    assert _stored([later[0][2]]) == 1
+
+
+def test_corrupt_spill_line_is_set_aside(ingestor, ids):
+    good = _batch(ids["survey_id"], 1)[0]
+    with open(ingestor.spill_path, "w", encoding="utf-8") as spill:
+        spill.write('{"survey_id": 1, "answ\n')
+        spill.write(f'{{"survey_id": {good[0]}, "answers": {{}}, "receipt_id": "{good[2]}"}}\n')
+
+    ingestor._replay_spill()
+
+    assert _stored([good[2]]) == 1
+    with open(ingestor.spill_path + ".rejected", encoding="utf-8") as rejected:
+        assert rejected.read() == '{"survey_id": 1, "answ\n'
+
+
+def test_flusher_survives_a_failed_batch(tmp_path, ids, monkeypatch):
+    import asyncio
+    ingestor = ingest.ResponseIngestor(flush_interval_ms=10, spill_path=str(tmp_path / "spill.ndjson"))
+    first, second = _batch(ids["survey_id"], 1), _batch(ids["survey_id"], 1)
+    flush = ingestor._flush
+
+    def fail_once(batch):
+        monkeypatch.setattr(ingestor, "_flush", flush)
+        raise RuntimeError("boom")
+
+    async def run():
+        monkeypatch.setattr(ingestor, "_flush", fail_once)
+        ingestor.submit(*first[0][:2])
+        await asyncio.sleep(0.05)
+        assert not ingestor._task.done()
+        ingestor.submit(*second[0][:2])
+        await ingestor.stop()
+
+    asyncio.run(run())
+    # The failed batch was spilled, then replayed after the next write
+    assert ingestor.spilled == 1 and ingestor.written == 2
+
+
+def test_restart_keeps_queued_responses(ingestor, ids):
+    import asyncio
+
+    async def accept():
+        ingestor.submit(ids["survey_id"], {"q1": 3})
+        # The loop (and its flusher) goes away with the response still queued
+        ingestor._task.cancel()
+
+    async def restart():
+        ingestor.start()
+        await ingestor.stop()
+
+    asyncio.run(accept())
+    asyncio.run(restart())
+    assert ingestor.written == 1
@@ -0,0 +1,118 @@
+"""Every router endpoint, run once within its query budget.
+
+server.testing sets QUERY_BUDGET_MODE=raise, so the app itself fails a
+request that goes over its budget (@query_budget, else QUERY_BUDGET) or
+repeats a statement; the fixtures check the same from outside the request.
+A new route fails test_every_route_has_a_case until it gets a case here.
+"""
+import pytest
+from fastapi.routing import APIRoute
+
+EXPENSE = {"amount": 20, "description": "Groceries", "date": "2026-02-01T00:00:00", "is_income": False}
+
+
+def _spare_user(email: str):
+    """Request builder for routes that spend or revoke the caller's tokens"""
+    def build(ctx):
+        tokens = ctx["make_user"](email)
+        return {"headers": tokens["headers"], "json": ctx["body"](tokens)}
+    return build
+
+
+# (method, route path, build(ctx) -> request kwargs). Path parameters come
+# from the ids fixture, or from "path" in the kwargs; requests go as the
+# auth_headers user unless the kwargs carry their own headers. Routes that
+# delete run last.
+CASES = [
+    ("GET", "/", lambda ctx: {}),
+    ("GET", "/health", lambda ctx: {}),
+    ("GET", "/health/db", lambda ctx: {}),
+    ("GET", "/health/hashing", lambda ctx: {}),
+    ("GET", "/metrics", lambda ctx: {}),
+    ("POST", "/auth/register", lambda ctx: {"json": {"email": "budget-register@example.com", "password": "pw"}}),
+    ("POST", "/auth/login", lambda ctx: {"data": {"username": "owner@example.com", "password": "correct horse"}}),
+    ("POST", "/auth/refresh", lambda ctx: {"json": {"refresh_token": ctx["make_user"]("budget-refresh@example.com")["refresh_token"]}}),
+    ("GET", "/auth/me", lambda ctx: {}),
+    ("PATCH", "/auth/me", lambda ctx: {"json": {"full_name": "Budget Owner"}}),
+    ("GET", "/portal/stats", lambda ctx: {}),
+    ("POST", "/surveys/", lambda ctx: {"json": {"title": "Another", "questions": [{"id": "q1", "type": "text", "label": "Why?"}]}}),
+    ("GET", "/surveys/", lambda ctx: {}),
+    ("GET", "/surveys/{survey_id}", lambda ctx: {"headers": {}}),
+    ("PATCH", "/surveys/{survey_id}", lambda ctx: {"json": {"title": "Budget survey, edited"}}),
+    ("POST", "/surveys/{survey_id}/responses", lambda ctx: {"headers": {}, "json": {"answers": {"q1": 4, "q2": "fine"}}}),
+    ("GET", "/surveys/{survey_id}/analytics", lambda ctx: {}),
+    ("GET", "/surveys/{survey_id}/responses/export", lambda ctx: {"params": {"format": "ndjson"}}),
+    ("GET", "/accounting/categories", lambda ctx: {"headers": {}}),
+    ("GET", "/accounting/expenses", lambda ctx: {"params": {"limit": 50}}),
+    ("POST", "/accounting/expenses", lambda ctx: {"json": {**EXPENSE, "category_id": ctx["ids"]["category_id"]}}),
+    ("POST", "/accounting/expenses/bulk", lambda ctx: {
+        "headers": {**ctx["auth_headers"], "Content-Type": "application/x-ndjson", "Idempotency-Key": "budget-import"},
+        "content": "\n".join(
+            f'{{"amount": {n}, "description": "Imported {n}", "date": "2026-03-01T00:00:00", "category_id": {ctx["ids"]["category_id"]}}}'
+            for n in range(1, 21)
+        ),
+    }),
+    ("GET", "/accounting/summary", lambda ctx: {"params": {"by_category": "true"}}),
+    ("PATCH", "/accounting/expenses/{expense_id}", lambda ctx: {"json": {**EXPENSE, "amount": 25, "category_id": ctx["ids"]["category_id"]}}),
+    ("GET", "/career/profile", lambda ctx: {}),
+    ("PUT", "/career/profile", lambda ctx: {"json": {
+        "headline": "Backend engineer", "skills": ["Python", "SQL"], "experience": [], "education": [], "searchable": True,
+    }}),
+    ("PATCH", "/career/profile", lambda ctx: {"json": {"skills": ["Python", "SQL", "Go"]}}),
+    ("GET", "/career/search", lambda ctx: {"params": {"q": "python backend", "skills": ["python"]}}),
+    ("GET", "/career/applications", lambda ctx: {}),
+    ("GET", "/career/applications/stats", lambda ctx: {}),
+    ("POST", "/career/applications", lambda ctx: {"json": {"company": "Initech", "position": "Engineer"}}),
+    ("PATCH", "/career/applications/{app_id}", lambda ctx: {"params": {"status": "Interviewing"}}),
+    ("GET", "/career/applications/{app_id}/match", lambda ctx: {}),
+    ("GET", "/supply/items", lambda ctx: {}),
+    ("GET", "/supply/items/grouped", lambda ctx: {}),
+    ("GET", "/supply/items/to-buy", lambda ctx: {}),
+    ("POST", "/supply/items", lambda ctx: {"json": {"name": "Rice", "status": "TO_BUY"}}),
+    ("POST", "/supply/items/batch", lambda ctx: {"json": {"items": [{"name": f"Item {n}", "status": "TO_BUY"} for n in range(40)]}}),
+    ("PATCH", "/supply/items/batch", lambda ctx: {"json": {"filter": {"status": "TO_BUY"}, "status": "IN_STOCK"}}),
+    ("PATCH", "/supply/items/{item_id}", lambda ctx: {"params": {"status": "TO_BUY"}}),
+    ("GET", "/search", lambda ctx: {"params": {"q": "coffee"}}),
+    ("POST", "/auth/me/password", _spare_user("budget-password@example.com")),
+    ("POST", "/auth/logout", _spare_user("budget-logout@example.com")),
+    ("DELETE", "/accounting/expenses/{expense_id}", lambda ctx: {"path": {"expense_id": ctx["ids"]["doomed_expense_id"]}}),
+    ("DELETE", "/supply/items/{item_id}", lambda ctx: {"path": {"item_id": ctx["ids"]["doomed_item_id"]}}),
+    ("DELETE", "/supply/items/batch", lambda ctx: {"json": {"filter": {"status": "IN_STOCK"}}}),
+]
+
+# Bodies for the _spare_user routes, built from the spare account's tokens
+SPARE_BODIES = {
+    "/auth/me/password": lambda tokens: {"current_password": "correct horse", "new_password": "battery staple"},
+    "/auth/logout": lambda tokens: {"refresh_token": tokens["refresh_token"]},
+}
+
+
+def _routes():
+    from server.main import app
+    return {
+        (method, route.path): route
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+
+
+def test_every_route_has_a_case():
+    cases = {(method, path) for method, path, _ in CASES}
+    missing = set(_routes()) - cases
+    assert not missing, f"routes without a query budget case: {sorted(missing)}"
+
+
+@pytest.mark.parametrize("method,path,build", CASES, ids=[f"{method} {path}" for method, path, _ in CASES])
+def test_within_query_budget(
+    method, path, build, client, make_user, auth_headers, ids, assert_max_queries, assert_no_repeated_queries,
+):
+    from server import querybudget
+    budget = getattr(_routes()[(method, path)].endpoint, "query_budget", querybudget.QUERY_BUDGET)
+    ctx = {"make_user": make_user, "auth_headers": auth_headers, "ids": ids, "body": SPARE_BODIES.get(path)}
+    kwargs = build(ctx)
+    kwargs.setdefault("headers", auth_headers)
+    url = path.format(**{**ids, **kwargs.pop("path", {})})
+
+    with assert_max_queries(budget), assert_no_repeated_queries():
+        response = client.request(method, url, **kwargs)
+    assert response.status_code < 400, response.text
@@ -0,0 +1,27 @@
+"""Query plans for the supply batch statements"""
+from sqlalchemy import insert
+from server import database, models, schemas
+from server.routers import supply
+
+
+def _plan(statement) -> str:
+    sql = statement.compile(database.engine, compile_kwargs={"literal_binds": True})
+    with database.engine.connect() as conn:
+        return " ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def test_batch_by_ids_uses_primary_key_once_analyzed(client, make_user):
+    user_id = client.get("/auth/me", headers=make_user("planner@example.com")["headers"]).json()["id"]
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.SupplyItem), [
+            {"user_id": user_id, "name": f"Item {n}", "status": "TO_BUY" if n % 5 == 0 else "IN_STOCK"}
+            for n in range(500)
+        ])
+    selection = schemas.SupplyItemSelection(ids=[1, 2, 3])
+    change = schemas.SupplyItemStatusUpdate(ids=[1, 2, 3], status="IN_STOCK")
+
+    database.analyze()
+
+    # Without statistics SQLite picks the user_id index and reads every one of the user's items
+    for statement in (supply.set_status(user_id, change), supply.delete_items(user_id, selection)):
+        assert "INTEGER PRIMARY KEY" in _plan(statement)
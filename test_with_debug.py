@@ -5,9 +5,13 @@ import sys
 import time
 import os
 
-print("Killing existing Python processes...")
-os.system("taskkill /F /IM python.exe 2>nul")
-time.sleep(1)
+# Repository root, so the script works from any checkout and working directory
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+if os.name == "nt":
+    print("Killing existing Python processes...")
+    os.system("taskkill /F /IM python.exe 2>nul")
+    time.sleep(1)
 
 print("\nStarting server with detailed logging...")
 print("=" * 80)
@@ -27,7 +31,7 @@ process = subprocess.Popen(
     stderr=subprocess.STDOUT,
     universal_newlines=True,
     bufsize=1,
-    cwd=r"C:\Users\ThinkPad\git-cbx"
+    cwd=ROOT
 )
 
 time.sleep(2)
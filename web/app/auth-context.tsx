@@ -2,6 +2,7 @@
 
 import React, { createContext, useState, useContext, useEffect } from "react";
 import { useRouter } from "next/navigation";
+import { apiClient } from "@/lib/api";
 
 interface User {
     email?: string;
@@ -11,7 +12,7 @@ interface User {
 
 interface AuthContextType {
     user: User | null;
-    login: (token: string) => void;
+    login: (token: string, refreshToken?: string) => void;
     logout: () => void;
     isAuthenticated: boolean;
 }
@@ -26,35 +27,25 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
         // Check for token in localStorage on mount
         const token = localStorage.getItem("cbx_token");
         if (token) {
-            // Validate token with the backend
-            const baseUrl = typeof window !== 'undefined' ?
-                `http://${window.location.hostname}:8000` :
-                'http://localhost:8000';
-            
-            fetch(`${baseUrl}/auth/me`, {
-                headers: {
-                    "Authorization": `Bearer ${token}`
-                }
-            })
-                .then(res => {
-                    if (res.ok) {
-                        return res.json();
-                    }
-                    throw new Error("Token validation failed");
-                })
+            // Validate token with the backend; apiClient renews an expired access token
+            apiClient.get("/auth/me")
                 .then(userData => {
                     setUser(userData);
                 })
                 .catch(err => {
                     console.error("Token validation failed:", err);
                     localStorage.removeItem("cbx_token");
+                    localStorage.removeItem("cbx_refresh_token");
                     setUser(null);
                 });
         }
     }, []);
 
-    const login = (token: string) => {
+    const login = (token: string, refreshToken?: string) => {
         localStorage.setItem("cbx_token", token);
+        if (refreshToken) {
+            localStorage.setItem("cbx_refresh_token", refreshToken);
+        }
         // Fetch actual user data to validate token
         const baseUrl = typeof window !== 'undefined' ?
             `http://${window.location.hostname}:8000` :
@@ -79,7 +70,24 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
     };
 
     const logout = () => {
+        const token = localStorage.getItem("cbx_token");
+        if (token) {
+            // Revoke the token server-side; the local session ends regardless
+            const baseUrl = typeof window !== 'undefined' ?
+                `http://${window.location.hostname}:8000` :
+                'http://localhost:8000';
+            const refreshToken = localStorage.getItem("cbx_refresh_token");
+            fetch(`${baseUrl}/auth/logout`, {
+                method: "POST",
+                headers: {
+                    "Authorization": `Bearer ${token}`,
+                    "Content-Type": "application/json"
+                },
+                body: refreshToken ? JSON.stringify({ refresh_token: refreshToken }) : undefined
+            }).catch(err => console.error("Logout request failed:", err));
+        }
         localStorage.removeItem("cbx_token");
+        localStorage.removeItem("cbx_refresh_token");
         setUser(null);
         router.push("/login");
     };
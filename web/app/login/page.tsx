@@ -41,7 +41,7 @@ export default function LoginPage() {
             }
 
             const data = await res.json();
-            login(data.access_token);
+            login(data.access_token, data.refresh_token);
         } catch (err) {
             setError("Login failed. Please check your credentials.");
         } finally {
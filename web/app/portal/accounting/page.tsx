@@ -43,15 +43,18 @@ export default function AccountingPage() {
     const [transactions, setTransactions] = useState<Transaction[]>([]);
     const [summary, setSummary] = useState<Summary>({ income: 0, expense: 0, balance: 0 });
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [txRes, sumRes] = await Promise.all([
-                    apiClient.get("/accounting/expenses"),
+                const [txPage, sumRes] = await Promise.all([
+                    apiClient.getPage<Transaction>("/accounting/expenses"),
                     apiClient.get("/accounting/summary")
                 ]);
-                setTransactions(txRes);
+                setTransactions(txPage.items);
+                setNextCursor(txPage.nextCursor);
                 setSummary(sumRes);
             } catch (err) {
                 console.error("Failed to load accounting data", err);
@@ -62,6 +65,20 @@ export default function AccountingPage() {
         fetchData();
     }, []);
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await apiClient.getPage<Transaction>(`/accounting/expenses?cursor=${encodeURIComponent(nextCursor)}`);
+            setTransactions(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (err) {
+            console.error("Failed to load more transactions", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const formatMoney = (amount: number) => {
         // Amount is in dollars (float) from summary, but cents (int) from transactions
         // The backend sends summary as float dollars, but transaction list amount as cents
@@ -171,6 +188,17 @@ export default function AccountingPage() {
                                     </div>
                                 </div>
                             ))}
+                            {nextCursor && (
+                                <div className="p-4 text-center">
+                                    <button
+                                        onClick={loadMore}
+                                        disabled={loadingMore}
+                                        className="text-sm font-medium text-primary hover:underline disabled:opacity-50"
+                                    >
+                                        {loadingMore ? "Loading..." : "Load more"}
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
@@ -17,6 +17,7 @@ interface Profile {
     skills: string[];
     experience: Experience[];
     education: any[];
+    searchable: boolean;
 }
 
 export default function EditProfilePage() {
@@ -24,6 +25,7 @@ export default function EditProfilePage() {
     const [headline, setHeadline] = useState("");
     const [skills, setSkills] = useState<string[]>([]);
     const [experience, setExperience] = useState<Experience[]>([]);
+    const [searchable, setSearchable] = useState(false);
     const [isSubmitting, setIsSubmitting] = useState(false);
     const [newSkill, setNewSkill] = useState("");
 
@@ -34,6 +36,7 @@ export default function EditProfilePage() {
                 setHeadline(data.headline || "");
                 setSkills(data.skills || []);
                 setExperience(data.experience || []);
+                setSearchable(!!data.searchable);
             } catch (err) {
                 console.error(err);
             }
@@ -48,7 +51,8 @@ export default function EditProfilePage() {
                 headline,
                 skills,
                 experience,
-                education: [] // Simplified for now
+                education: [], // Simplified for now
+                searchable
             });
             router.push("/portal/career");
         } catch (err) {
@@ -121,6 +125,17 @@ export default function EditProfilePage() {
                             <button onClick={addSkill} className="px-4 bg-gray-100 rounded-lg hover:bg-gray-200 font-medium">Add</button>
                         </div>
                     </div>
+
+                    <div className="card bg-white p-6 rounded-xl shadow-sm border border-gray-100">
+                        <label className="flex items-center gap-3 cursor-pointer">
+                            <input
+                                type="checkbox"
+                                checked={searchable}
+                                onChange={e => setSearchable(e.target.checked)}
+                            />
+                            <span className="form-label mb-0">Show my headline and skills in career search</span>
+                        </label>
+                    </div>
                 </div>
             </div>
         </div>
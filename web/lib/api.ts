@@ -14,6 +14,55 @@ export const getApiUrl = () => {
     return `${protocol}//${hostname}:8000`;
 };
 
+let refreshInFlight: Promise<boolean> | null = null;
+
+// Trade the stored refresh token for a new pair. Concurrent callers share one
+// request: refresh tokens are single-use and a replay revokes the session.
+export const refreshAccessToken = (): Promise<boolean> => {
+    if (!refreshInFlight) {
+        refreshInFlight = (async () => {
+            const refreshToken = localStorage.getItem("cbx_refresh_token");
+            if (!refreshToken) {
+                return false;
+            }
+            const res = await fetch(`${getApiUrl()}/auth/refresh`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+            });
+            if (!res.ok) {
+                localStorage.removeItem("cbx_token");
+                localStorage.removeItem("cbx_refresh_token");
+                return false;
+            }
+            const data = await res.json();
+            localStorage.setItem("cbx_token", data.access_token);
+            localStorage.setItem("cbx_refresh_token", data.refresh_token);
+            return true;
+        })().catch(() => false).finally(() => {
+            refreshInFlight = null;
+        });
+    }
+    return refreshInFlight;
+};
+
+// fetch with the stored bearer token, retried once after a refresh on 401
+const authorizedFetch = async (url: string, init: RequestInit): Promise<Response> => {
+    const send = () => {
+        const headers = new Headers(init.headers);
+        const token = localStorage.getItem("cbx_token");
+        if (token) {
+            headers.set("Authorization", `Bearer ${token}`);
+        }
+        return fetch(url, { ...init, headers });
+    };
+    const res = await send();
+    if (res.status === 401 && localStorage.getItem("cbx_refresh_token") && await refreshAccessToken()) {
+        return send();
+    }
+    return res;
+};
+
 export const apiClient = {
     async post(endpoint: string, data: any, isJson = true) {
         const baseUrl = getApiUrl();
@@ -22,19 +71,13 @@ export const apiClient = {
             headers["Content-Type"] = "application/json";
         }
 
-        // Add auth token if exists
-        const token = localStorage.getItem("cbx_token");
-        if (token) {
-            headers["Authorization"] = `Bearer ${token}`;
-        }
-
         const config: RequestInit = {
             method: "POST",
             headers,
             body: isJson ? JSON.stringify(data) : data,
         };
 
-        const res = await fetch(`${baseUrl}${endpoint}`, config);
+        const res = await authorizedFetch(`${baseUrl}${endpoint}`, config);
         if (!res.ok) {
             const errorData = await res.json().catch(() => ({ detail: res.statusText }));
             throw new Error(errorData.detail || `Request failed: ${res.status}`);
@@ -48,12 +91,7 @@ export const apiClient = {
             "Content-Type": "application/json",
         };
 
-        const token = localStorage.getItem("cbx_token");
-        if (token) {
-            headers["Authorization"] = `Bearer ${token}`;
-        }
-
-        const res = await fetch(`${baseUrl}${endpoint}`, { headers });
+        const res = await authorizedFetch(`${baseUrl}${endpoint}`, { headers });
         if (!res.ok) {
             const errorData = await res.json().catch(() => ({ detail: res.statusText }));
             throw new Error(errorData.detail || `Request failed: ${res.status}`);
@@ -61,18 +99,28 @@ export const apiClient = {
         return res.json();
     },
 
-    async put(endpoint: string, data: any) {
+    // For keyset-paginated lists: the page plus the X-Next-Cursor to pass back as ?cursor=
+    async getPage<T = any>(endpoint: string): Promise<{ items: T[]; nextCursor: string | null }> {
         const baseUrl = getApiUrl();
         const headers: HeadersInit = {
             "Content-Type": "application/json",
         };
 
-        const token = localStorage.getItem("cbx_token");
-        if (token) {
-            headers["Authorization"] = `Bearer ${token}`;
+        const res = await authorizedFetch(`${baseUrl}${endpoint}`, { headers });
+        if (!res.ok) {
+            const errorData = await res.json().catch(() => ({ detail: res.statusText }));
+            throw new Error(errorData.detail || `Request failed: ${res.status}`);
         }
+        return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+    },
 
-        const res = await fetch(`${baseUrl}${endpoint}`, {
+    async put(endpoint: string, data: any) {
+        const baseUrl = getApiUrl();
+        const headers: HeadersInit = {
+            "Content-Type": "application/json",
+        };
+
+        const res = await authorizedFetch(`${baseUrl}${endpoint}`, {
             method: "PUT",
             headers,
             body: JSON.stringify(data),
@@ -90,12 +138,7 @@ export const apiClient = {
             "Content-Type": "application/json",
         };
 
-        const token = localStorage.getItem("cbx_token");
-        if (token) {
-            headers["Authorization"] = `Bearer ${token}`;
-        }
-
-        const res = await fetch(`${baseUrl}${endpoint}`, {
+        const res = await authorizedFetch(`${baseUrl}${endpoint}`, {
             method: "PATCH",
             headers,
             body: JSON.stringify(data),
@@ -113,12 +156,7 @@ export const apiClient = {
             "Content-Type": "application/json",
         };
 
-        const token = localStorage.getItem("cbx_token");
-        if (token) {
-            headers["Authorization"] = `Bearer ${token}`;
-        }
-
-        const res = await fetch(`${baseUrl}${endpoint}`, {
+        const res = await authorizedFetch(`${baseUrl}${endpoint}`, {
             method: "DELETE",
             headers,
         });